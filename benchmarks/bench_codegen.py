@@ -0,0 +1,78 @@
+"""
+Time and retained memory of parsing a large result into the classes pkl-gen-python
+generates for ``tests/Fixtures/Poly.pkl``: as it generates them by default, with
+``--slots``, and with ``--slots --frozen``. Run from the repository root:
+
+    python -m benchmarks.bench_codegen -n 50000
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import msgpack
+
+from pkl.parser import Parser
+from tests.Fixtures.Generated import pkl_python_example_Poly_pkl as default
+from tests.Fixtures.GeneratedFrozen import pkl_python_example_Poly_pkl as frozen
+from tests.Fixtures.GeneratedSlots import pkl_python_example_Poly_pkl as slots
+
+
+def beings(n):
+    """A listing of `n` Animals, Dogs and Birds."""
+
+    def obj(class_name, **properties):
+        members = [[0x10, k, v] for k, v in properties.items()]
+        return [
+            0x1,
+            f"pkl.python.example.Poly#{class_name}",
+            "file:///Poly.pkl",
+            members,
+        ]
+
+    def being(i):
+        name = f"being-{i}"
+        if i % 3 == 0:
+            return obj("Animal", exists=True, name=name)
+        if i % 3 == 1:
+            hates = obj("Animal", exists=True, name="cat")
+            return obj("Dog", exists=True, name=name, barks=i % 2 == 0, hates=hates)
+        return obj("Bird", exists=i % 2 == 0, name=name, flies=True)
+
+    return msgpack.packb([0x5, [being(i) for i in range(n)]])
+
+
+def measure(parser, data, repeat=3):
+    parser.parse_bytes(data)
+    elapsed = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser.parse_bytes(data)
+        elapsed = min(elapsed, time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = parser.parse_bytes(data)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, retained
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=50000, help="objects in the result")
+    args = parser.parse_args()
+
+    data = beings(args.n)
+    print(f"{len(data) / 1e6:.1f} MB of msgpack")
+    for name, p in [
+        ("default", Parser(namespace=vars(default))),
+        ("--slots", Parser(namespace=vars(slots))),
+        ("--slots --frozen", Parser(namespace=vars(frozen), frozen=True)),
+    ]:
+        elapsed, retained = measure(p, data)
+        print(f"{name:>16}: {elapsed * 1e3:8.1f} ms  retained {retained / 1e6:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Time and retained memory of a large result with repetitive content, parsed with
+and without ``Parser(intern=True)``.
+
+    python benchmarks/bench_intern.py -n 50000
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import msgpack
+
+from pkl.parser import Parser, ResultType
+
+
+def repetitive(n):
+    """A listing of `n` objects that repeat a few strings, numbers and sub-objects."""
+
+    def server(i):
+        limits = [[0x10, "cpu", 2.0], [0x10, "memoryClass", "large"]]
+        return [
+            0x1,
+            "Server",
+            "file:///bench.pkl",
+            [
+                [0x10, "region", ["eu-west-1", "us-east-1", "ap-south-1"][i % 3]],
+                [0x10, "tier", "production"],
+                [0x10, "weight", 0.25],
+                [0x10, "port", 8000 + i % 4],
+                [0x10, "limits", [0x1, "Limits", "file:///bench.pkl", limits]],
+            ],
+        ]
+
+    return msgpack.packb([0x5, [server(i) for i in range(n)]])
+
+
+def measure(parser, data):
+    parser.parse_bytes(data)  # create the result classes
+    start = time.perf_counter()
+    parser.parse_bytes(data)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    result = parser.parse_bytes(data)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, retained
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=50000, help="objects in the result")
+    args = parser.parse_args()
+
+    data = repetitive(args.n)
+    print(f"{len(data) / 1e6:.1f} MB of msgpack")
+    for object_type in (
+        ResultType.DATACLASS,
+        ResultType.NAMEDTUPLE,
+        ResultType.DICTIONARY,
+    ):
+        for intern in False, True:
+            name = f"{object_type.name.lower()}{', interned' if intern else ''}"
+            p = Parser(object_type=object_type, intern=intern, single_pass=True)
+            elapsed, retained = measure(p, data)
+            print(
+                f"{name:>21}: {elapsed * 1e3:8.1f} ms  retained {retained / 1e6:7.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
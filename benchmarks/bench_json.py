@@ -0,0 +1,65 @@
+"""
+Time and peak memory of turning a large evaluation result into JSON: parsed,
+converted with `dataclasses.asdict` and dumped, against `JsonRenderer`, which
+transcodes the msgpack bytes directly.
+
+    python benchmarks/bench_json.py -n 20000
+"""
+
+import argparse
+import dataclasses
+import json
+import time
+import tracemalloc
+
+from bench_parser import synthetic
+
+from pkl.json_renderer import JsonRenderer
+from pkl.parser import Parser
+
+
+def to_json_types(value):
+    if dataclasses.is_dataclass(value):
+        return dataclasses.asdict(value)
+    if isinstance(value, dict):
+        return {k: to_json_types(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [to_json_types(v) for v in value]
+    return value
+
+
+def via_parser(data):
+    result = Parser().parse_bytes(data)
+    return json.dumps(to_json_types(result), separators=(",", ":")).encode()
+
+
+def measure(render, data):
+    start = time.perf_counter()
+    render(data)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    render(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=20000, help="objects in the result")
+    args = parser.parse_args()
+
+    data = synthetic(args.n)
+    assert via_parser(data) == JsonRenderer().render(data)
+    print(f"{len(data) / 1e6:.1f} MB of msgpack")
+    for name, render in [
+        ("parse + asdict + dumps", via_parser),
+        ("JsonRenderer", JsonRenderer().render),
+    ]:
+        elapsed, peak = measure(render, data)
+        print(f"{name:>22}: {elapsed * 1e3:8.1f} ms  peak {peak / 1e6:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Latency and memory of reading a few fields from a large result, parsed eagerly
+and with ``Parser(lazy=True)``.
+
+    python benchmarks/bench_lazy.py -n 50000 -k 10
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from bench_parser import synthetic
+
+from pkl.parser import Parser
+
+
+def sparse_reads(result, indices):
+    return [(result.people[i].name, result.people[i].limits["cpu"]) for i in indices]
+
+
+def measure(parser, data, indices):
+    parser.parse_bytes(data)  # create the result classes
+    start = time.perf_counter()
+    result = parser.parse_bytes(data)
+    ready = time.perf_counter() - start
+    sparse_reads(result, indices)
+    total = time.perf_counter() - start
+    del result
+
+    tracemalloc.start()
+    result = parser.parse_bytes(data)
+    sparse_reads(result, indices)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return ready, total, retained, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=50000, help="objects in the result")
+    parser.add_argument("-k", type=int, default=10, help="objects read")
+    args = parser.parse_args()
+
+    data = synthetic(args.n)
+    indices = random.Random(0).sample(range(args.n), args.k)
+    print(f"{len(data) / 1e6:.1f} MB of msgpack, reading {args.k} of {args.n} objects")
+    for name, p in [
+        ("eager", Parser()),
+        ("eager single pass", Parser(single_pass=True)),
+        ("lazy", Parser(lazy=True)),
+    ]:
+        ready, total, retained, peak = measure(p, data, indices)
+        print(
+            f"{name:>17}: parsed {ready * 1e3:8.1f} ms  with reads {total * 1e3:8.1f} ms"
+            f"  retained {retained / 1e6:7.1f} MB  peak {peak / 1e6:7.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
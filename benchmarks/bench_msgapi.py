@@ -0,0 +1,82 @@
+"""
+Time spent encoding outgoing messages, for the legacy
+``dataclasses.asdict`` + ``msgpack.packb`` path and for `OutgoingMessage.to_json`
+with a reused ``msgpack.Packer``.
+
+    python benchmarks/bench_msgapi.py -n 20000
+"""
+
+import argparse
+import time
+from dataclasses import asdict
+
+import msgpack
+
+from pkl.evaluator_options import ClientResourceReader, Project
+from pkl.msgapi import (
+    CloseEvaluator,
+    CreateEvaluator,
+    EvaluateRequest,
+    EvaluatorListResourcesResponse,
+    EvaluatorReadResourceResponse,
+)
+from pkl.reader import PathElement
+
+
+def legacy_encode(msg):
+    """The encoding as it was before."""
+
+    def dict_factory(items):
+        return {k: v for k, v in items if v is not None}
+
+    return msgpack.packb([msg.CODE, asdict(msg, dict_factory=dict_factory)])
+
+
+def messages():
+    big_text = "x" * (1 << 20)
+    big_bytes = b"x" * (1 << 20)
+    return {
+        "CreateEvaluator": CreateEvaluator(
+            requestId=1,
+            allowedModules=["pkl:", "file:", "https:"],
+            allowedResources=["env:", "prop:", "file:"],
+            clientResourceReaders=[ClientResourceReader("foo", False, True)],
+            env={"HOME": "/root"},
+            project=Project("file:///tmp/PklProject"),
+        ),
+        "CloseEvaluator": CloseEvaluator(1),
+        "EvaluateRequest": EvaluateRequest(1, 2, "repl:text", "foo = 1", "foo"),
+        "EvaluateRequest 1MiB": EvaluateRequest(1, 2, "repl:text", big_text),
+        "ReadResourceResponse 1MiB": EvaluatorReadResourceResponse(1, 2, big_bytes),
+        "ListResourcesResponse": EvaluatorListResourcesResponse(
+            1, 2, [PathElement(f"file{i}", i % 2 == 0) for i in range(100)]
+        ),
+    }
+
+
+def bench(fn, msg, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn(msg)
+    return (time.perf_counter() - start) / n
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=20000)
+    args = parser.parse_args()
+
+    packer = msgpack.Packer()
+    for name, msg in messages().items():
+        assert legacy_encode(msg) == packer.pack(msg.to_json()), name
+        n = args.n if "MiB" not in name else max(args.n // 100, 10)
+        before = bench(legacy_encode, msg, n)
+        after = bench(lambda m: packer.pack(m.to_json()), msg, n)
+        print(
+            f"{name:>26}: before {before * 1e6:10.2f} us  "
+            f"after {after * 1e6:10.2f} us  ({before / after:5.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
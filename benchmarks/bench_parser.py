@@ -0,0 +1,127 @@
+"""
+Time and peak memory of the parser on a large evaluation result:
+
+- recursive: ``msgpack.unpackb`` followed by the recursive `Parser.handle_type`
+- iterative: ``msgpack.unpackb`` followed by `Parser.parse` (explicit stack)
+- single pass: `Parser.parse_bytes` with ``single_pass=True``
+
+By default the result is synthetic. With ``--fixture``, the module is evaluated
+once (this needs the pkl binary) and its result is repeated ``-n`` times in a
+Listing.
+
+    python benchmarks/bench_parser.py -n 20000
+    python benchmarks/bench_parser.py -n 5000 --fixture tests/_pkl/classes.pkl
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+
+import msgpack
+
+from pkl.parser import Parser
+
+
+def synthetic(n):
+    """A module with a listing of `n` typed objects, encoded as the server does."""
+
+    def person(i):
+        return [
+            0x1,
+            "Person",
+            "file:///bench.pkl",
+            [
+                [0x10, "name", f"person{i}"],
+                [0x10, "age", i],
+                [0x10, "tags", [0x5, ["a", "b", "c"]]],
+                [0x10, "timeout", [0x7, 1.5, "s"]],
+                [0x10, "limits", [0x3, {"mem": [0x8, 512, "mb"], "cpu": 2}]],
+            ],
+        ]
+
+    people = [0x5, [person(i) for i in range(n)]]
+    return msgpack.packb(
+        [0x1, "bench", "file:///bench.pkl", [[0x10, "people", people]]]
+    )
+
+
+def from_fixture(path, n, pkl_command=None):
+    import pkl
+
+    with pkl.EvaluatorManager(pkl_command) as manager:
+        evaluator = manager.new_evaluator(pkl.PreconfiguredOptions())
+        raw = evaluator._evaluate_expression_raw(pkl.ModuleSource.from_path(path), None)
+    value = msgpack.unpackb(raw, strict_map_key=False)
+    return msgpack.packb([0x5, [value] * n])
+
+
+def nested(depth):
+    """A Listing nested `depth` levels deep."""
+    value = 0
+    for _ in range(depth):
+        value = [0x5, [value]]
+    return msgpack.packb(value)
+
+
+MODES = {
+    "recursive": lambda data: Parser().handle_type(
+        msgpack.unpackb(data, strict_map_key=False)
+    ),
+    "iterative": lambda data: Parser().parse(
+        msgpack.unpackb(data, strict_map_key=False)
+    ),
+    "single pass": lambda data: Parser(single_pass=True).parse_bytes(data),
+}
+
+
+def measure(parse, data):
+    parse(data)  # create the result classes
+    start = time.perf_counter()
+    parse(data)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    parse(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=20000)
+    parser.add_argument("--fixture", help="Pkl module whose result is repeated")
+    parser.add_argument("--pkl-command", nargs="+", default=None)
+    parser.add_argument(
+        "--depth", type=int, default=400, help="nesting depth for the deep test"
+    )
+    args = parser.parse_args()
+
+    if args.fixture:
+        data = from_fixture(args.fixture, args.n, args.pkl_command)
+    else:
+        data = synthetic(args.n)
+    print(f"{len(data) / 1e6:.1f} MB of msgpack")
+    for name, parse in MODES.items():
+        elapsed, peak = measure(parse, data)
+        print(f"{name:>12}: {elapsed * 1e3:9.1f} ms  peak {peak / 1e6:8.1f} MB")
+
+    # msgpack itself cannot pack values nested deeper than 512 levels
+    data = nested(args.depth)
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(args.depth)
+    try:
+        print(f"nested {args.depth} deep, recursion limit {args.depth}:")
+        for name, parse in MODES.items():
+            try:
+                parse(data)
+                print(f"{name:>12}: ok")
+            except RecursionError:
+                print(f"{name:>12}: RecursionError")
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Time to parse a large result into the classes of a namespace (as generated by
+pkl-gen-python), with the generic parser and with ``Parser(compiled=True)``.
+
+    python benchmarks/bench_schema.py -n 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import msgpack
+
+import pkl
+from pkl.parser import Parser
+
+
+@dataclass
+class Limits:
+    cpu: float
+
+    memory: pkl.DataSize
+
+    _registered_identifier = "bench#Limits"
+
+
+@dataclass
+class Server:
+    name: str
+
+    port: int
+
+    tags: List[str]
+
+    timeout: pkl.Duration
+
+    limits: Limits
+
+    backup: Optional[Server]
+
+    labels: Dict[str, str]
+
+    _registered_identifier = "bench#Server"
+
+
+@dataclass
+class bench:
+    servers: List[Server]
+
+    _registered_identifier = "bench"
+
+
+def servers(n):
+    def obj(name, members):
+        return [0x1, name, "file:///bench.pkl", [[0x10, k, v] for k, v in members]]
+
+    def server(i):
+        limits = obj("bench#Limits", [("cpu", 2.0), ("memory", [0x8, 512, "mb"])])
+        return obj(
+            "bench#Server",
+            [
+                ("name", f"server{i}"),
+                ("port", 8000 + i),
+                ("tags", [0x5, ["a", "b"]]),
+                ("timeout", [0x7, 1.5, "s"]),
+                ("limits", limits),
+                ("backup", None),
+                ("labels", [0x3, {"env": "prod"}]),
+            ],
+        )
+
+    return msgpack.packb(
+        obj("bench", [("servers", [0x5, [server(i) for i in range(n)]])])
+    )
+
+
+def measure(parse, data, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(data)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=50000, help="objects in the result")
+    args = parser.parse_args()
+
+    data = servers(args.n)
+    decoded = msgpack.unpackb(data, strict_map_key=False)
+    namespace = globals()
+    generic = Parser(namespace=namespace).parse_bytes(data)
+    assert Parser(namespace=namespace, compiled=True).parse_bytes(data) == generic
+    print(
+        f"{len(data) / 1e6:.1f} MB of msgpack; parse_bytes, and parse of decoded msgpack"
+    )
+    for name, p in [
+        ("generic", Parser(namespace=namespace)),
+        ("generic single pass", Parser(namespace=namespace, single_pass=True)),
+        ("compiled", Parser(namespace=namespace, compiled=True)),
+    ]:
+        total = measure(p.parse_bytes, data)
+        line = f"{name:>19}: {total * 1e3:8.1f} ms"
+        if not p.single_pass:
+            line += f"  parse {measure(p.parse, decoded) * 1e3:8.1f} ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
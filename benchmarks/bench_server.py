@@ -0,0 +1,66 @@
+"""
+CPU time spent by the Python process per evaluation, for the legacy
+spin-polling transport and the selector-based `PKLServer`.
+
+    python benchmarks/bench_server.py -n 50 tests/pkls/types.pkl
+"""
+
+import argparse
+import os
+import time
+
+import pkl
+from pkl import evaluator_manager
+from pkl.server import PKLServer
+
+
+class SpinningPKLServer(PKLServer):
+    """The transport as it was before: busy-loops on a non-blocking read."""
+
+    def __init__(self, cmd=None, debug=False, **kwargs):
+        super().__init__(cmd, debug, **{**kwargs, "pipe_size": None})
+        os.set_blocking(self.stdout.fileno(), False)
+
+    def _read(self, stream):
+        msg = None
+        while msg is None:
+            msg = stream.read()
+        return msg
+
+
+def run(server_cls, source, expr, n, pkl_command):
+    evaluator_manager.PKLServer = server_cls
+    try:
+        with pkl.EvaluatorManager(pkl_command) as manager:
+            evaluator = manager.new_evaluator(pkl.PreconfiguredOptions())
+            evaluator.evaluate_expression(source, expr)  # warm up
+
+            cpu, wall = time.process_time(), time.perf_counter()
+            for _ in range(n):
+                evaluator.evaluate_expression(source, expr)
+            cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    finally:
+        evaluator_manager.PKLServer = PKLServer
+    return cpu / n, wall / n
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("module", nargs="?", default="tests/pkls/types.pkl")
+    parser.add_argument("-x", "--expr", default=None)
+    parser.add_argument("-n", type=int, default=50)
+    parser.add_argument("--pkl-command", nargs="+", default=None)
+    args = parser.parse_args()
+
+    source = pkl.ModuleSource.from_path(args.module)
+    for name, cls in [("spin (before)", SpinningPKLServer), ("selector", PKLServer)]:
+        cpu, wall = run(cls, source, args.expr, args.n, args.pkl_command)
+        print(
+            f"{name:>14}: cpu {cpu * 1e3:8.3f} ms/eval  "
+            f"wall {wall * 1e3:8.3f} ms/eval  "
+            f"cpu/wall {cpu / wall:6.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,37 @@ from pathlib import Path
 from typing import Optional, Union
 from urllib.parse import ParseResult, urlparse
 
-from pkl.evaluator_manager import Evaluator, EvaluatorManager
+from pkl.async_evaluator_manager import AsyncEvaluator, AsyncEvaluatorManager
+from pkl.evaluator_manager import Evaluator, EvaluatorManager, RecyclePolicy
 from pkl.evaluator_options import EvaluatorOptions, PreconfiguredOptions
-from pkl.parser import DataSize, Duration, IntSeq, Pair, Parser, Regex
+from pkl.json_renderer import JsonRenderer
+from pkl.lazy import LazyDict, LazyList, LazyObject
+from pkl.parser import (
+    ClassRegistry,
+    DataSize,
+    Duration,
+    FrozenDict,
+    IntSeq,
+    Pair,
+    Parser,
+    Regex,
+    ResultType,
+)
+from pkl.pool import PKLServerPool, PooledEvaluator
 from pkl.reader import ModuleReader, PathElement, ResourceReader
-from pkl.utils import ModuleSource, PklBugError, PklError
+from pkl.shared import (
+    disable_shared_manager,
+    enable_shared_manager,
+    get_shared_manager,
+    warm_start,
+)
+from pkl.utils import (
+    ModuleSource,
+    PklBugError,
+    PklError,
+    PklServerError,
+    add_slots,
+)
 
 # get version
 with open(os.path.join(os.path.dirname(__file__), "VERSION"), "r") as _f:
@@ -50,6 +76,7 @@ def load(
     evaluator_options: EvaluatorOptions = PreconfiguredOptions(),
     parser=None,
     debug=False,
+    shared: Optional[bool] = None,
     **kwargs,
 ):
     """
@@ -68,6 +95,10 @@ def load(
         parser: A specific parser to be used for parsing the module.
             If None, a default parser is used.
         debug (bool, False): Enable debugging mode for additional output and diagnostics.
+        shared (Optional[bool], None): Evaluate on the process-wide server instead of
+            starting one for this call. None uses it if `enable_shared_manager` was
+            called; True enables it with default settings if needed. Debug mode
+            always starts its own server.
         **kwargs: Additional keyword arguments for extensibility and future use.
 
     Returns:
@@ -83,6 +114,17 @@ def load(
     if project_dir is None:
         project_dir = _search_project_dir(str(module_uri))
 
+    shared_manager = None
+    if shared is not False and not debug:
+        shared_manager = get_shared_manager()
+        if shared_manager is None and shared:
+            shared_manager = enable_shared_manager()
+
+    if shared_manager is not None:
+        with shared_manager.evaluator(evaluator_options, project_dir) as evaluator:
+            binary_res = evaluator._evaluate_expression_raw(source, expr)
+        return (parser or Parser()).parse_bytes(binary_res)
+
     with EvaluatorManager(debug=debug) as manager:
         if (Path(project_dir) / "PklProject").exists():
             evaluator = manager.new_project_evaluator(
@@ -102,6 +144,7 @@ def loads(
     evaluator_options: EvaluatorOptions = PreconfiguredOptions(),
     parser=None,
     debug=False,
+    shared: Optional[bool] = None,
     **kwargs,
 ):
     """
@@ -117,6 +160,7 @@ def loads(
         evaluator_options=evaluator_options,
         parser=parser,
         debug=debug,
+        shared=shared,
         **kwargs,
     )
 
@@ -124,20 +168,44 @@ def loads(
 __all__ = [
     "load",
     "loads",
+    "enable_shared_manager",
+    "disable_shared_manager",
+    "get_shared_manager",
+    "warm_start",
     "Evaluator",
     "EvaluatorManager",
+    "RecyclePolicy",
+    "AsyncEvaluator",
+    "AsyncEvaluatorManager",
+    "PKLServerPool",
+    "PooledEvaluator",
     "EvaluatorOptions",
     "PreconfiguredOptions",
     "ModuleReader",
     "ResourceReader",
     "PathElement",
     "Parser",
+    "ClassRegistry",
+    "ResultType",
+    "JsonRenderer",
+    "LazyObject",
+    "LazyList",
+    "LazyDict",
     "ModuleSource",
     "PklError",
     "PklBugError",
+    "PklServerError",
     "Duration",
     "DataSize",
     "Pair",
     "IntSeq",
     "Regex",
+    "FrozenDict",
 ]
+
+
+if os.environ.get("PKL_WARM_START") == "1":
+    _warm_start_module = os.environ.get("PKL_WARM_START_MODULE")
+    warm_start(
+        ModuleSource.from_path(_warm_start_module) if _warm_start_module else None
+    )
@@ -0,0 +1,309 @@
+import asyncio
+import itertools
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import msgpack
+
+from pkl.evaluator_manager import (
+    Evaluator,
+    _create_evaluator_request,
+    _encode_dependencies,
+)
+from pkl.evaluator_options import EvaluatorOptions, PreconfiguredOptions
+from pkl.json_renderer import JsonRenderer
+from pkl.msgapi import (
+    CloseEvaluator,
+    CreateEvaluatorResponse,
+    EvaluateRequest,
+    EvaluateResponse,
+    IncomingMessage,
+    OutgoingMessage,
+    Project,
+)
+from pkl.server import DEFAULT_BUFFER_SIZE, StderrLog, preexec_function
+from pkl.utils import ModuleSource, PklBugError, PklError, PklServerError
+
+
+class AsyncEvaluator(Evaluator):
+    """
+    An `Evaluator` whose evaluation methods are coroutines.
+
+    Any number of evaluations may be awaited concurrently; they share the
+    server of the owning `AsyncEvaluatorManager`.
+
+    Module and resource readers are still called synchronously, from the event loop.
+    """
+
+    _manager: "AsyncEvaluatorManager"
+
+    def _get_requestId(self):
+        return self._manager._next_requestId()
+
+    async def evaluate_expression(self, source: ModuleSource, expr: Optional[str]):
+        binary_res = await self._evaluate_expression_raw(source, expr)
+        return self.parser.parse_bytes(binary_res)
+
+    async def _evaluate_expression_raw(self, source: ModuleSource, expr: Optional[str]):
+        if self.closed:
+            raise ValueError("Evaluator is closed")
+
+        requestId = self._get_requestId()
+
+        request = EvaluateRequest(
+            requestId=requestId,
+            evaluatorId=self.evaluatorId,
+            moduleUri=source.uri,
+            moduleText=source.text,
+            expr=expr,
+        )
+
+        response: EvaluateResponse = await self._manager._request(
+            request, self.evaluatorId
+        )
+
+        if response.error is not None:
+            raise PklError("\n" + response.error)
+        return response.result
+
+    async def evaluate_module(self, source: ModuleSource):
+        return await self.evaluate_expression(source, None)
+
+    async def evaluate_output_files(self, source: ModuleSource) -> List[str]:
+        return await self.evaluate_expression(
+            source, "output.files.toMap().mapValues((_, it) -> it.text)"
+        )
+
+    async def evaluate_output_text(self, source: ModuleSource) -> str:
+        return await self.evaluate_expression(source, "output")
+
+    async def evaluate_output_value(self, source: ModuleSource):
+        return await self.evaluate_expression(source, "output.value")
+
+    async def evaluate_expression_json_bytes(
+        self,
+        source: ModuleSource,
+        expr: Optional[str] = None,
+        renderer: Optional[JsonRenderer] = None,
+    ) -> bytes:
+        binary_res = await self._evaluate_expression_raw(source, expr)
+        return (renderer or JsonRenderer()).render(binary_res)
+
+    async def evaluate_dataframe(
+        self, source: ModuleSource, expr: Optional[str] = None
+    ):
+        from pkl.columnar import to_dataframe
+
+        binary_res = await self._evaluate_expression_raw(source, expr)
+        return to_dataframe(binary_res, self.parser)
+
+    async def evaluate_arrow(
+        self, source: ModuleSource, expr: Optional[str] = None, parser=None
+    ):
+        from pkl.columnar import to_arrow
+
+        binary_res = await self._evaluate_expression_raw(source, expr)
+        return to_arrow(binary_res, parser)
+
+    async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._manager._evaluators.pop(self.evaluatorId, None)
+        self._manager.send(CloseEvaluator(self.evaluatorId))
+        await self._manager._drain()
+
+    def __enter__(self):
+        # `Evaluator.__exit__` would call `close` without awaiting it
+        raise TypeError("use 'async with'")
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        raise TypeError("use 'async with'")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+class AsyncEvaluatorManager:
+    """
+    asyncio counterpart of `EvaluatorManager`.
+
+    The server is started with `asyncio.create_subprocess_exec`, and its output is
+    decoded incrementally by a reader task that routes each response to the
+    coroutine waiting for it, so many evaluations can be in flight at once.
+
+    Usage::
+
+        async with AsyncEvaluatorManager() as manager:
+            evaluator = await manager.new_evaluator(PreconfiguredOptions())
+            config = await evaluator.evaluate_module(ModuleSource.from_path(path))
+    """
+
+    def __init__(
+        self,
+        pkl_command: Optional[List[str]] = None,
+        *,
+        debug=False,
+    ):
+        self._evaluators: Dict[int, AsyncEvaluator] = {}
+        self._pending: Dict[int, Tuple[Optional[int], asyncio.Future]] = {}
+        self._closed = False
+        self._debug = debug
+        self._pkl_command = pkl_command
+        self._request_ids = itertools.count(1)
+        self._packer = msgpack.Packer()
+
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._stderr_task: Optional[asyncio.Task] = None
+        self.stderr_log = StderrLog()
+
+    async def start(self):
+        if self._process is not None:
+            return
+        cmd = self._pkl_command
+        if cmd is None:
+            from pkl.binary_manager import BinaryManager
+
+            cmd = [BinaryManager().get_binary_filepath(), "server"]
+
+        env = {"PKL_DEBUG": "1"} if self._debug else {}
+        self._process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            preexec_fn=preexec_function,
+            env=env,
+        )
+        self._reader_task = asyncio.ensure_future(self._read_loop())
+        self._stderr_task = asyncio.ensure_future(self._read_stderr())
+
+    def _next_requestId(self) -> int:
+        return next(self._request_ids)
+
+    def send(self, msg: OutgoingMessage):
+        if self._closed or self._process is None:
+            raise ValueError("Server closed")
+        obj = msg.to_json()
+        self._process.stdin.write(self._packer.pack(obj))
+
+    async def _drain(self):
+        await self._process.stdin.drain()
+
+    async def _request(self, msg: OutgoingMessage, evaluatorId: Optional[int]):
+        future = asyncio.get_running_loop().create_future()
+        self._pending[msg.requestId] = (evaluatorId, future)
+        try:
+            self.send(msg)
+            await self._drain()
+            return await future
+        finally:
+            self._pending.pop(msg.requestId, None)
+
+    async def _read_loop(self):
+        unpacker = msgpack.Unpacker(list_hook=IncomingMessage.decode, max_buffer_size=0)
+        stdout = self._process.stdout
+        while True:
+            data = await stdout.read(DEFAULT_BUFFER_SIZE)
+            if not data:
+                self._fail_pending(
+                    PklServerError("pkl server closed its output stream")
+                )
+                return
+            unpacker.feed(data)
+            for decoded in unpacker:
+                self._dispatch(decoded)
+
+    async def _read_stderr(self):
+        stderr = self._process.stderr
+        while True:
+            data = await stderr.read(DEFAULT_BUFFER_SIZE)
+            if not data:
+                self.stderr_log.flush()
+                return
+            self.stderr_log.feed(data)
+
+    def _dispatch(self, decoded: IncomingMessage):
+        if isinstance(decoded, (EvaluateResponse, CreateEvaluatorResponse)):
+            _, future = self._pending.get(decoded.requestId, (None, None))
+            if future is not None and not future.done():
+                future.set_result(decoded)
+            return
+        try:
+            self._evaluators[decoded.evaluatorId].handle_request(decoded)
+        except Exception as e:
+            # nothing else can answer the server; fail the evaluations waiting on it
+            self._fail_pending(e, decoded.evaluatorId)
+
+    def _fail_pending(self, exc: BaseException, evaluatorId: Optional[int] = None):
+        for pending_evaluatorId, future in list(self._pending.values()):
+            if evaluatorId is not None and pending_evaluatorId != evaluatorId:
+                continue
+            if not future.done():
+                future.set_exception(exc)
+
+    async def new_evaluator(
+        self, options: EvaluatorOptions, project: Optional[Project] = None, parser=None
+    ) -> AsyncEvaluator:
+        if self._closed:
+            raise ValueError("Server closed")
+        await self.start()
+
+        requestId = self._next_requestId()
+        create_evaluator = _create_evaluator_request(requestId, options, project)
+        response: CreateEvaluatorResponse = await self._request(create_evaluator, None)
+
+        if response.error is not None:
+            raise PklBugError(response.error)
+
+        evaluator = AsyncEvaluator(
+            response.evaluatorId,
+            requestId,
+            self,
+            resource_readers=options.resourceReaders,
+            module_readers=options.moduleReaders,
+            parser=parser,
+        )
+        self._evaluators[response.evaluatorId] = evaluator
+        return evaluator
+
+    async def new_project_evaluator(
+        self, project_dir: str, options: EvaluatorOptions, parser=None
+    ) -> AsyncEvaluator:
+        project_evaluator = await self.new_evaluator(
+            PreconfiguredOptions(), parser=parser
+        )
+        project = await load_project_from_evaluator(project_evaluator, project_dir)
+        evaluator = await self.new_evaluator(options, project, parser)
+        return evaluator
+
+    async def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._process is None:
+            return
+        if self._process.returncode is None:
+            self._process.terminate()
+        await self._process.wait()
+        await asyncio.gather(self._reader_task, self._stderr_task)
+        self._fail_pending(ValueError("Server closed"))
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+async def load_project_from_evaluator(evaluator: AsyncEvaluator, path) -> Project:
+    path = str(Path(path) / "PklProject")
+    config = await evaluator.evaluate_output_value(ModuleSource.from_path(path))
+    dependencies = _encode_dependencies(config.dependencies)
+    project = Project(config.projectFileUri, dependencies=dependencies)
+    return project
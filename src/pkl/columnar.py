@@ -0,0 +1,198 @@
+"""
+Decode a Listing or List of Pkl objects straight into columns, without building
+an object per row.
+
+Columns are in the order of the first object's properties; properties that only
+later objects have are added after them. Durations become duration columns, and
+DataSizes columns of byte counts.
+"""
+
+import io
+from typing import Dict, List, Optional
+
+import msgpack
+
+from pkl.parser import (
+    _ARRAY_HEADER_SIZES,
+    _BYTES,
+    _NANOSECONDS,
+    CODE_DATASIZE,
+    CODE_DURATION,
+    CODE_ELEMENT,
+    CODE_LIST,
+    CODE_LISTING,
+    CODE_TYPED_DYNAMIC,
+    DataSize,
+    Duration,
+    Parser,
+    ResultType,
+)
+
+# column kinds
+VALUES = "values"
+DURATION = "duration"  # nanoseconds
+DATASIZE = "datasize"  # bytes
+
+
+class Columns:
+    """Columns decoded from a Listing of objects.
+
+    Attributes:
+        data: Values per column, in column order. ``None`` where a row lacks the
+            property.
+        kinds: `VALUES`, `DURATION` (values in nanoseconds) or `DATASIZE` (values
+            in bytes) per column.
+        rows: Number of rows.
+    """
+
+    def __init__(self):
+        self.data: Dict[str, list] = {}
+        self.kinds: Dict[str, str] = {}
+        self.rows = 0
+
+    def _column(self, name) -> list:
+        column = self.data.get(name)
+        if column is None:
+            # a property the earlier rows don't have
+            column = self.data[name] = [None] * self.rows
+        return column
+
+    def _add(self, name, kind, value):
+        column = self._column(name)
+        if value is None:
+            column.append(None)
+            return
+        current = self.kinds.setdefault(name, kind)
+        if current != kind:
+            if current != VALUES:
+                column = self._demote(name)
+            if kind == DURATION:
+                value = Duration(value, "ns")
+            elif kind == DATASIZE:
+                value = DataSize(value, "b")
+        column.append(value)
+
+    def _demote(self, name) -> list:
+        # durations and data sizes mixed with other values: keep them as objects
+        make, unit = (
+            (Duration, "ns") if self.kinds[name] == DURATION else (DataSize, "b")
+        )
+        column = self.data[name] = [
+            make(v, unit) if v is not None else None for v in self.data[name]
+        ]
+        self.kinds[name] = VALUES
+        return column
+
+    def finish(self):
+        # columns that only ever held null
+        for name in self.data:
+            self.kinds.setdefault(name, VALUES)
+
+    def _end_row(self):
+        self.rows += 1
+        for column in self.data.values():
+            if len(column) < self.rows:
+                column.append(None)
+
+
+def decode_columns(data: bytes, parser: Optional[Parser] = None) -> Columns:
+    """Decode an msgpack-encoded Listing or List of objects into `Columns`.
+
+    Values other than Durations, DataSizes and scalars are parsed with `parser`.
+    """
+    parser = parser or Parser()
+    unpacker = msgpack.Unpacker(
+        io.BytesIO(data), strict_map_key=False, max_buffer_size=max(len(data), 1)
+    )
+    if unpacker.read_array_header() != 2 or unpacker.unpack() not in (
+        CODE_LIST,
+        CODE_LISTING,
+    ):
+        raise ValueError("Expected a Listing or List of objects")
+
+    columns = Columns()
+    for _ in range(unpacker.read_array_header()):
+        if unpacker.read_array_header() != 4 or unpacker.unpack() != CODE_TYPED_DYNAMIC:
+            raise ValueError("Expected a Listing or List of objects")
+        unpacker.skip()  # class name
+        unpacker.skip()  # module uri
+        for _ in range(unpacker.read_array_header()):
+            unpacker.read_array_header()
+            if unpacker.unpack() == CODE_ELEMENT:
+                raise ValueError("Objects with elements cannot be turned into columns")
+            name = unpacker.unpack()
+            _read_cell(unpacker, data, parser, columns, name)
+        columns._end_row()
+    columns.finish()
+    return columns
+
+
+def _read_cell(unpacker, data, parser, columns, name):
+    position = unpacker.tell()
+    header_size = _ARRAY_HEADER_SIZES.get(data[position])
+    if header_size is not None and data[position + header_size] in (
+        CODE_DURATION,
+        CODE_DATASIZE,
+    ):
+        unpacker.read_array_header()
+        code, value, unit = unpacker.unpack(), unpacker.unpack(), unpacker.unpack()
+        if code == CODE_DURATION:
+            columns._add(name, DURATION, value * _NANOSECONDS[unit])
+        else:
+            columns._add(name, DATASIZE, value * _BYTES[unit])
+        return
+    value = unpacker.unpack()
+    if header_size is not None:
+        value = parser.parse(value)
+    columns._add(name, VALUES, value)
+
+
+def to_dataframe(data: bytes, parser: Optional[Parser] = None):
+    """Decode an msgpack-encoded Listing or List of objects into a
+    `pandas.DataFrame`. Duration columns are ``timedelta64[ns]``."""
+    import pandas as pd
+
+    columns = decode_columns(data, parser)
+    frame = {}
+    for name, values in columns.data.items():
+        kind = columns.kinds[name]
+        if kind == DURATION:
+            frame[name] = pd.to_timedelta(pd.array(values, dtype="Float64"), unit="ns")
+        elif kind == DATASIZE:
+            frame[name] = pd.array(values, dtype=_number_dtype(values, "Int64"))
+        else:
+            frame[name] = values
+    return pd.DataFrame(frame, columns=list(columns.data), index=range(columns.rows))
+
+
+def to_arrow(data: bytes, parser: Optional[Parser] = None):
+    """Decode an msgpack-encoded Listing or List of objects into a `pyarrow.Table`.
+
+    Duration columns are ``duration("ns")``. Nested objects become structs,
+    unless `parser` makes them something else.
+    """
+    import pyarrow as pa
+
+    parser = parser or Parser(object_type=ResultType.DICTIONARY)
+    columns = decode_columns(data, parser)
+    arrays = {}
+    for name, values in columns.data.items():
+        kind = columns.kinds[name]
+        if kind == DURATION:
+            values = [None if v is None else round(v) for v in values]
+            arrays[name] = pa.array(values, type=pa.duration("ns"))
+        elif kind == DATASIZE:
+            arrays[name] = pa.array(
+                values, type=pa.int64() if _integral(values) else None
+            )
+        else:
+            arrays[name] = pa.array(values)
+    return pa.table(arrays)
+
+
+def _integral(values: List) -> bool:
+    return all(v is None or float(v).is_integer() for v in values)
+
+
+def _number_dtype(values: List, integer_dtype: str) -> str:
+    return integer_dtype if _integral(values) else "Float64"
@@ -1,5 +1,11 @@
+import itertools
+import os
+import threading
+import time
 import warnings
-from dataclasses import asdict
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import asdict, dataclass, replace
 from pathlib import Path
 from typing import Dict, List, Optional, Union
 from urllib.parse import urlparse
@@ -12,6 +18,7 @@ from pkl.evaluator_options import (
     PreconfiguredOptions,
     RemoteDependency,
 )
+from pkl.json_renderer import JsonRenderer
 from pkl.msgapi import (
     CloseEvaluator,
     CreateEvaluator,
@@ -34,7 +41,30 @@ from pkl.msgapi import (
 from pkl.parser import Parser
 from pkl.reader import ModuleReader, ResourceReader
 from pkl.server import PKLServer
-from pkl.utils import ModuleSource, PklBugError, PklError
+from pkl.utils import ModuleSource, PklBugError, PklError, PklServerError
+
+# Module evaluated by `EvaluatorManager.warm_up` unless another one is given.
+# It loads the commonly used standard library modules and runs a renderer.
+WARM_UP_MODULE_TEXT = """\
+import "pkl:json"
+import "pkl:math"
+import "pkl:reflect"
+import "pkl:yaml"
+
+res {
+  list = List(1, 2, 3).map((it) -> it * 2)
+  map = Map("a", 1).mapValues((_, it) -> it + 1)
+  listing = new Listing { 1 2 3 }
+  duration = 5.min
+  dataSize = 10.mb
+  max = math.max(1, 2)
+  type = reflect.Class(Dynamic).name
+}
+
+output {
+  renderer = new json.Renderer {}
+}
+"""
 
 
 class Evaluator:
@@ -59,8 +89,11 @@ class Evaluator:
 
         self.parser = parser or Parser()
 
+        # the request that created this evaluator, sent again after a restart
+        self._create_request: Optional[CreateEvaluator] = None
+
     def _get_requestId(self):
-        res = self._prev_requestId + 1
+        res = self._manager._next_requestId()
         self._prev_requestId = res
         return res
 
@@ -82,9 +115,7 @@ class Evaluator:
 
     def evaluate_expression(self, source: ModuleSource, expr: Optional[str]):
         binary_res = self._evaluate_expression_raw(source, expr)
-        decoded = msgpack.unpackb(binary_res, strict_map_key=False)
-        parsed = self.parser.parse(decoded)
-        return parsed
+        return self.parser.parse_bytes(binary_res)
 
     def _evaluate_expression_raw(self, source: ModuleSource, expr: Optional[str]):
         if self.closed:
@@ -100,8 +131,8 @@ class Evaluator:
             expr=expr,
         )
 
-        self._manager.send(request)
-        response: EvaluateResponse = self._manager.receive(requestId)
+        future = self._manager._submit(request, self.evaluatorId)
+        response: EvaluateResponse = self._manager._wait(requestId, future)
 
         if response.error is not None:
             raise PklError("\n" + response.error)
@@ -121,6 +152,33 @@ class Evaluator:
     def evaluate_output_value(self, source: ModuleSource):
         return self.evaluate_expression(source, "output.value")
 
+    def evaluate_expression_json_bytes(
+        self,
+        source: ModuleSource,
+        expr: Optional[str] = None,
+        renderer: Optional[JsonRenderer] = None,
+    ) -> bytes:
+        """Evaluate into JSON, rendered straight from the server's response
+        without building Python objects (see `JsonRenderer`)."""
+        binary_res = self._evaluate_expression_raw(source, expr)
+        return (renderer or JsonRenderer()).render(binary_res)
+
+    def evaluate_dataframe(self, source: ModuleSource, expr: Optional[str] = None):
+        """Evaluate a Listing or List of objects into a `pandas.DataFrame`, one
+        column per property (see `pkl.columnar`). Requires pandas."""
+        from pkl.columnar import to_dataframe
+
+        return to_dataframe(self._evaluate_expression_raw(source, expr), self.parser)
+
+    def evaluate_arrow(
+        self, source: ModuleSource, expr: Optional[str] = None, parser=None
+    ):
+        """Evaluate a Listing or List of objects into a `pyarrow.Table`. Nested
+        values are parsed with `parser`, by default into dicts. Requires pyarrow."""
+        from pkl.columnar import to_arrow
+
+        return to_arrow(self._evaluate_expression_raw(source, expr), parser)
+
     def _find_module_reader(
         self, msg: Union[EvaluatorReadModuleRequest, EvaluatorListModulesRequest]
     ):
@@ -206,6 +264,10 @@ class Evaluator:
         self._manager.send(response)
 
     def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._manager._evaluators.pop(self.evaluatorId, None)
         request = CloseEvaluator(self.evaluatorId)
         self._manager.send(request)
 
@@ -216,52 +278,357 @@ class Evaluator:
         self.close()
 
 
+@dataclass
+class RecyclePolicy:
+    """When to replace a healthy server with a fresh one."""
+
+    # Restart the server after this many evaluations.
+    max_evaluations: Optional[int] = None
+
+    # Restart the server once its resident set size exceeds this many bytes.
+    max_rss_bytes: Optional[int] = None
+
+    # Number of evaluations between two RSS measurements.
+    rss_check_interval: int = 100
+
+
+def _process_rss(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    try:
+        return psutil.Process(pid).memory_info().rss
+    except psutil.Error:
+        return None
+
+
+def _describe_failure(server: PKLServer, error: BaseException) -> str:
+    message = f"pkl server is gone: {error}"
+    tail = server.stderr_tail(20)
+    if tail:
+        message += "\nLast stderr output:\n" + tail
+    return message
+
+
+class _PendingRequest:
+    __slots__ = ("message", "future", "generation", "attempts")
+
+    def __init__(self, message: OutgoingMessage):
+        self.message = message
+        self.future: Future = Future()
+        # the server generation the request was written to; None until sent
+        self.generation: Optional[int] = None
+        self.attempts = 0
+
+
 class EvaluatorManager:
+    """
+    Owns a `pkl server` process and the evaluators created on it.
+
+    A reader thread routes every response to the request waiting for it, and
+    writes are serialized by a lock, so one manager (and its evaluators) can be
+    shared by many threads with any number of evaluations in flight.
+
+    Module and resource readers are called from the reader thread.
+
+    Args:
+        pkl_command: Command used to start the server.
+        debug: Start the server in debug mode.
+        request_timeout: Seconds to wait for any single response. A request that
+            misses it fails with `PklServerError`, and the server is considered hung
+            and stopped. Without `restart`, later requests then fail as well.
+        restart: Restart the server when it exits, closes its output, or hangs.
+            Evaluators are created again on the new server and in-flight
+            requests are replayed, each at most `max_replays` times.
+        recycle: Replace the server after a number of evaluations or once it uses
+            too much memory. In-flight requests are replayed on the new server.
+        max_replays: How often a single request may be replayed after restarts.
+    """
+
     def __init__(
         self,
         pkl_command: Optional[List[str]] = None,
         *,
         debug=False,
+        request_timeout: Optional[float] = None,
+        restart: bool = False,
+        recycle: Optional[RecyclePolicy] = None,
+        max_replays: int = 1,
     ):
         self._evaluators: Dict[int, Evaluator] = {}
         self._closed = False
         self._debug = debug
         self._pkl_command = pkl_command
-        self._server = PKLServer(pkl_command, debug=debug)
+        self._server = self._start_server()
+
+        self._request_timeout = request_timeout
+        self._restart_on_failure = restart
+        self._recycle_policy = recycle
+        self._max_replays = max_replays
+        self._generation = 0
+        self._evaluations = 0
+        self._recycling = False
+        self._broken: Optional[BaseException] = None
+        # evaluator ids from before a restart -> current ids
+        self._renamed: Dict[int, int] = {}
+        self.restarts = 0
+
+        self._request_ids = itertools.count(1)
+        self._pending: Dict[int, _PendingRequest] = {}
+        self._pending_lock = threading.Lock()
+        # responses to requests passed to `send`, until `receive` claims them
+        self._unclaimed: Dict[int, Future] = {}
+        # guards writes, `_packer` and replacing `_server`
+        self._write_lock = threading.RLock()
+        self._packer = msgpack.Packer()
+
+        self._reader = threading.Thread(
+            target=self._read_loop, name="pkl-server-reader", daemon=True
+        )
+        self._reader.start()
+
+        self.warm_up_seconds: Optional[float] = None
 
-        self._prev_id = -100
+    def _next_requestId(self) -> int:
+        return next(self._request_ids)
 
     def send(self, msg: OutgoingMessage):
+        if isinstance(msg, (CreateEvaluator, EvaluateRequest)):
+            evaluatorId = getattr(msg, "evaluatorId", None)
+            self._unclaimed[msg.requestId] = self._submit(msg, evaluatorId)
+            return
         obj = msg.to_json()
-        encoded = msgpack.packb(obj)
-        self._server.send(encoded)
-        self._server.receive_err()
+        with self._write_lock:
+            self._server.send(self._packer.pack(obj))
 
     def receive(self, requestId) -> IncomingMessage:
-        while True:
-            msg = self._server.receive()
-            self._server.receive_err()
-            decoded = IncomingMessage.decode(msg)
-
-            if hasattr(decoded, "requestId") and decoded.requestId == requestId:
-                return decoded
-
-            self._evaluators[decoded.evaluatorId].handle_request(decoded)
+        """
+        Wait for the response to a request passed to `send`.
+
+        Deprecated: responses are read by a background thread now. Use the
+        evaluators returned by `new_evaluator` instead.
+        """
+        warnings.warn(
+            "EvaluatorManager.receive is deprecated; "
+            "use the evaluators returned by new_evaluator instead",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        return self._claim(requestId)
 
     def _receive_create_response(self, requestId) -> CreateEvaluatorResponse:
+        return self._claim(requestId)
+
+    def _claim(self, requestId) -> IncomingMessage:
+        future = self._unclaimed.pop(requestId, None)
+        if future is None:
+            raise ValueError(f"No response is expected for request {requestId}")
+        return self._wait(requestId, future)
+
+    def _submit(self, msg: OutgoingMessage, evaluatorId: Optional[int]) -> Future:
+        """Send a request and return a future resolved with its response."""
+        if self._broken is not None:
+            raise PklServerError(f"pkl server is gone: {self._broken}")
+        if isinstance(msg, EvaluateRequest):
+            self._maybe_recycle()
+        entry = _PendingRequest(msg)
+        with self._pending_lock:
+            self._pending[msg.requestId] = entry
+        with self._write_lock:
+            if evaluatorId is not None:
+                # the evaluator may have been re-created by a restart meanwhile
+                msg.evaluatorId = self._renamed.get(evaluatorId, evaluatorId)
+            entry.generation = self._generation
+            try:
+                self._server.send(self._packer.pack(msg.to_json()))
+            except (OSError, ValueError):
+                if not (self._will_restart() and not self._closed):
+                    with self._pending_lock:
+                        self._pending.pop(msg.requestId, None)
+                    raise
+                # the server is going away; the restart replays this request
+        return entry.future
+
+    def _wait(self, requestId: int, future: Future) -> IncomingMessage:
+        try:
+            return future.result(timeout=self._request_timeout)
+        except FutureTimeoutError:
+            with self._pending_lock:
+                self._pending.pop(requestId, None)
+            error = PklServerError(
+                f"pkl server did not answer request {requestId} "
+                f"within {self._request_timeout} seconds"
+            )
+            if not self._restart_on_failure:
+                # the hung server is not replaced; fail later requests fast
+                self._broken = error
+            self._kill_server()
+            raise error from None
+
+    def _will_restart(self) -> bool:
+        return self._restart_on_failure or self._recycling
+
+    def _kill_server(self):
+        # the reader thread sees end of stream and restarts it; no lock, since
+        # a restart holds the write lock while it waits for the new server
+        self._server.stop()
+
+    def _maybe_recycle(self):
+        policy = self._recycle_policy
+        if policy is None:
+            return
+        with self._write_lock:
+            self._evaluations += 1
+            due = (
+                policy.max_evaluations is not None
+                and self._evaluations > policy.max_evaluations
+            )
+            if (
+                not due
+                and policy.max_rss_bytes is not None
+                and self._evaluations % policy.rss_check_interval == 0
+            ):
+                rss = _process_rss(self._server.process.pid)
+                due = rss is not None and rss > policy.max_rss_bytes
+            if due and not self._recycling:
+                self._recycling = True
+                self._kill_server()
+
+    def _read_loop(self):
         while True:
-            msg = self._server.receive()
-            self._server.receive_err()
-            decoded = IncomingMessage.decode(msg)
+            server = self._server
+            try:
+                decoded = server.receive()
+            except Exception as e:
+                if self._closed:
+                    self._fail_pending(ValueError("Server closed"))
+                    return
+                if self._will_restart():
+                    try:
+                        self._restart(server)
+                        continue
+                    except Exception as restart_error:
+                        e = restart_error
+                # keep the reason a timeout gave up on the server
+                e = self._broken or e
+                self._broken = e
+                self._fail_pending(
+                    ValueError("Server closed")
+                    if self._closed
+                    else PklServerError(_describe_failure(server, e))
+                )
+                return
+            self._dispatch(decoded)
+
+    def _start_server(self) -> PKLServer:
+        # messages are built while unpacking, without an intermediate list
+        return PKLServer(
+            self._pkl_command, debug=self._debug, list_hook=IncomingMessage.decode
+        )
 
+    def _restart(self, old_server: PKLServer):
+        with self._write_lock:
+            old_server.terminate()
+            server = self._start_server()
+            if self._closed:
+                # closed while it started; the reader stops with nothing to read
+                server.terminate()
+                raise ValueError("Server closed")
+            self._server = server
+            self._generation += 1
+            # the evaluation that triggered a recycle runs on the new server
+            self._evaluations = 1 if self._recycling else 0
+            self._recycling = False
+            self.restarts += 1
+
+            # create the evaluators again; their ids change
+            id_map = {}
+            for old_id, evaluator in list(self._evaluators.items()):
+                requestId = self._next_requestId()
+                request = replace(evaluator._create_request, requestId=requestId)
+                server.send(self._packer.pack(request.to_json()))
+                response = self._receive_inline(server, requestId)
+                if response.error is not None:
+                    raise PklBugError(response.error)
+                evaluator.evaluatorId = response.evaluatorId
+                id_map[old_id] = response.evaluatorId
+            self._evaluators = {e.evaluatorId: e for e in self._evaluators.values()}
+            for old_id, new_id in self._renamed.items():
+                self._renamed[old_id] = id_map.get(new_id, new_id)
+            self._renamed.update(id_map)
+
+            # replay what was sent to the old server
+            with self._pending_lock:
+                replay = [
+                    (requestId, entry)
+                    for requestId, entry in self._pending.items()
+                    if entry.generation is not None
+                    and entry.generation < self._generation
+                ]
+            for requestId, entry in replay:
+                if entry.attempts >= self._max_replays:
+                    with self._pending_lock:
+                        self._pending.pop(requestId, None)
+                    entry.future.set_exception(
+                        PklServerError(
+                            f"pkl server died while handling request {requestId}"
+                        )
+                    )
+                    continue
+                entry.attempts += 1
+                entry.generation = self._generation
+                msg = entry.message
+                if hasattr(msg, "evaluatorId"):
+                    msg.evaluatorId = id_map.get(msg.evaluatorId, msg.evaluatorId)
+                server.send(self._packer.pack(msg.to_json()))
+
+    def _receive_inline(self, server: PKLServer, requestId: int):
+        # bounded, since the write lock is held meanwhile
+        while True:
+            try:
+                decoded = server.receive(timeout=self._request_timeout)
+            except TimeoutError:
+                raise PklServerError(
+                    f"restarted pkl server did not answer request {requestId} "
+                    f"within {self._request_timeout} seconds"
+                ) from None
             if (
                 isinstance(decoded, CreateEvaluatorResponse)
                 and decoded.requestId == requestId
             ):
                 return decoded
-
-            # self._evaluators[decoded.evaluatorId].pending_requests[requestId] = decoded
+            self._dispatch(decoded)
+
+    def _dispatch(self, decoded: IncomingMessage):
+        if isinstance(decoded, (EvaluateResponse, CreateEvaluatorResponse)):
+            with self._pending_lock:
+                entry = self._pending.pop(decoded.requestId, None)
+            if entry is not None:
+                entry.future.set_result(decoded)
+            return
+        try:
             self._evaluators[decoded.evaluatorId].handle_request(decoded)
+        except Exception as e:
+            # nothing else can answer the server; fail the evaluations waiting on it
+            self._fail_pending(e, decoded.evaluatorId)
+
+    def _fail_pending(self, exc: BaseException, evaluatorId: Optional[int] = None):
+        with self._pending_lock:
+            failed = [
+                requestId
+                for requestId, entry in self._pending.items()
+                if evaluatorId is None
+                or getattr(entry.message, "evaluatorId", None) == evaluatorId
+            ]
+            futures = [self._pending.pop(requestId).future for requestId in failed]
+        for future in futures:
+            future.set_exception(exc)
 
     def new_evaluator(
         self, options: EvaluatorOptions, project: Optional[Project] = None, parser=None
@@ -269,19 +636,10 @@ class EvaluatorManager:
         if self._closed:
             raise ValueError("Server closed")
 
-        requestId = self._get_start_requestId()
-        opt_dict = asdict(options)
-
-        opt_dict["clientModuleReaders"] = opt_dict["moduleReaders"]
-        opt_dict["clientResourceReaders"] = opt_dict["resourceReaders"]
-        del opt_dict["moduleReaders"]
-        del opt_dict["resourceReaders"]
-
-        create_evaluator = CreateEvaluator(
-            requestId=requestId, project=project, **opt_dict
-        )
-        self.send(create_evaluator)
-        response: CreateEvaluatorResponse = self._receive_create_response(requestId)
+        requestId = self._next_requestId()
+        create_evaluator = _create_evaluator_request(requestId, options, project)
+        future = self._submit(create_evaluator, None)
+        response: CreateEvaluatorResponse = self._wait(requestId, future)
 
         if response.error is not None:
             raise PklBugError(response.error)
@@ -294,6 +652,7 @@ class EvaluatorManager:
             module_readers=options.moduleReaders,
             parser=parser,
         )
+        evaluator._create_request = create_evaluator
         self._evaluators[response.evaluatorId] = evaluator
         return evaluator
 
@@ -305,14 +664,31 @@ class EvaluatorManager:
         evaluator = self.new_evaluator(options, project, parser)
         return evaluator
 
-    def _get_start_requestId(self):
-        res = self._prev_id + 100
-        self._prev_id = res
-        return res
+    def warm_up(self, source: Optional[ModuleSource] = None) -> float:
+        """
+        Evaluate `source` with a throwaway evaluator so that later evaluations on
+        this server don't pay for cold start of the standard library.
+
+        Returns the time it took in seconds, which is also kept as `warm_up_seconds`.
+        """
+        source = source or ModuleSource.from_text(WARM_UP_MODULE_TEXT)
+        start = time.perf_counter()
+        with self.new_evaluator(PreconfiguredOptions()) as evaluator:
+            evaluator.evaluate_output_text(source)
+        self.warm_up_seconds = time.perf_counter() - start
+        return self.warm_up_seconds
 
     def close(self):
+        # under the write lock, so a restart either sees `_closed` or has
+        # published the server stopped here
+        with self._write_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._server.stop()
+        if threading.current_thread() is not self._reader:
+            self._reader.join()
         self._server.terminate()
-        self._closed = True
 
     def __enter__(self):
         return self
@@ -321,6 +697,19 @@ class EvaluatorManager:
         self.close()
 
 
+def _create_evaluator_request(
+    requestId: int, options: EvaluatorOptions, project: Optional[Project]
+) -> CreateEvaluator:
+    opt_dict = asdict(options)
+
+    opt_dict["clientModuleReaders"] = opt_dict["moduleReaders"]
+    opt_dict["clientResourceReaders"] = opt_dict["resourceReaders"]
+    del opt_dict["moduleReaders"]
+    del opt_dict["resourceReaders"]
+
+    return CreateEvaluator(requestId=requestId, project=project, **opt_dict)
+
+
 def new_evaluator_manager_with_command(pkl_command: List[str]):
     with EvaluatorManager(pkl_command) as manager:
         return manager
@@ -0,0 +1,338 @@
+"""
+Render msgpack-encoded evaluation results as JSON, straight from the encoded bytes
+and without parsing them into Python objects first.
+"""
+
+import base64
+import io
+import json
+from json.encoder import encode_basestring, encode_basestring_ascii
+from typing import Any, Callable, Optional, Tuple, Union
+
+import msgpack
+
+from pkl.parser import (
+    _ARRAY_HEADER_SIZES,
+    _ARRAY_MARKERS,
+    _BYTES,
+    _CONTAINER_MARKERS,
+    _MAP_MARKERS,
+    _NANOSECONDS,
+    CODE_CLASS,
+    CODE_DATASIZE,
+    CODE_DURATION,
+    CODE_ELEMENT,
+    CODE_ENTRY,
+    CODE_INTSEQ,
+    CODE_LIST,
+    CODE_LISTING,
+    CODE_MAP,
+    CODE_MAPPING,
+    CODE_PAIR,
+    CODE_PROPERTY,
+    CODE_REGEX,
+    CODE_SET,
+    CODE_TYPEALIAS,
+    CODE_TYPED_DYNAMIC,
+    DataSize,
+    Duration,
+    IntSeq,
+    Regex,
+)
+
+# what precedes each child of a frame: nothing, a map key, a member's header, or
+# one of the frame's field names
+_ITEMS, _KEYS, _MEMBERS, _FIELDS = range(4)
+
+_LIST_CODES = (CODE_LIST, CODE_LISTING, CODE_SET)
+_MAP_CODES = (CODE_MAP, CODE_MAPPING)
+_MEMBER_CODES = (CODE_PROPERTY, CODE_ENTRY, CODE_ELEMENT)
+
+# values `json.JSONEncoder` renders the same way as `JsonRenderer`
+_JSON_SCALARS = frozenset((str, int, float, bool, type(None)))
+
+# render this many pieces of output at once
+_FLUSH_PIECES = 4096
+
+_INFINITY = float("inf")
+
+
+def _intseq_items(start, end, step):
+    # IntSeq includes its end
+    return list(range(start, end + (1 if step > 0 else -1), step))
+
+
+_SHAPES = {
+    CODE_DURATION: {
+        "object": lambda value, unit: {"value": value, "unit": unit},
+        "string": lambda value, unit: f"{value}.{unit}",
+        "seconds": lambda value, unit: value * _NANOSECONDS[unit] / 1e9,
+    },
+    CODE_DATASIZE: {
+        "object": lambda value, unit: {"value": value, "unit": unit},
+        "string": lambda value, unit: f"{value}.{unit}",
+        "bytes": lambda value, unit: value * _BYTES[unit],
+    },
+    CODE_INTSEQ: {
+        "object": lambda start, end, step: {"start": start, "end": end, "step": step},
+        "array": _intseq_items,
+    },
+    CODE_REGEX: {
+        "object": lambda pattern: {"pattern": pattern},
+        "string": lambda pattern: pattern,
+    },
+}
+_SHAPE_TYPES = {
+    CODE_DURATION: ("duration", Duration),
+    CODE_DATASIZE: ("datasize", DataSize),
+    CODE_INTSEQ: ("intseq", IntSeq),
+    CODE_REGEX: ("regex", Regex),
+}
+
+Shape = Union[str, Callable[[Any], Any]]
+
+
+class JsonRenderer:
+    """Renders msgpack-encoded evaluation results as JSON bytes.
+
+    The result is transcoded as it is read; no Python objects are built for it.
+    Objects, Maps and Mappings become JSON objects, and Lists, Listings, Sets and
+    objects with only elements arrays. Bytes become base64 strings, and Classes
+    and TypeAliases null. The other Pkl types are rendered as follows.
+
+    Args:
+        duration: ``"object"`` (``{"value": 5, "unit": "s"}``, like
+            `dataclasses.asdict`), ``"string"`` (``"5.s"``) or ``"seconds"``.
+        datasize: ``"object"``, ``"string"`` (``"2.mb"``) or ``"bytes"``.
+        pair: ``"object"`` (``{"first": ..., "second": ...}``) or ``"array"``.
+        intseq: ``"object"`` (``{"start": ..., "end": ..., "step": ...}``) or
+            ``"array"``, the ints in it.
+        regex: ``"object"`` (``{"pattern": ...}``) or ``"string"``.
+        separators: ``(item separator, key separator)``, as for `json.dumps`.
+        ensure_ascii: Escape non-ASCII characters.
+
+    `duration`, `datasize`, `intseq` and `regex` can also be callables, which are
+    given the `Duration`, `DataSize`, `IntSeq` or `Regex` and return what to
+    render in its place.
+    """
+
+    def __init__(
+        self,
+        duration: Shape = "object",
+        datasize: Shape = "object",
+        pair: str = "object",
+        intseq: Shape = "object",
+        regex: Shape = "object",
+        separators: Tuple[str, str] = (",", ":"),
+        ensure_ascii: bool = False,
+    ):
+        if pair not in ("object", "array"):
+            raise ValueError(f"Unsupported pair shape: {pair!r}")
+        shapes = dict(duration=duration, datasize=datasize, intseq=intseq, regex=regex)
+        self._leaves = {}
+        for code, (name, clazz) in _SHAPE_TYPES.items():
+            shape = shapes[name]
+            if callable(shape):
+                self._leaves[code] = _from_value(shape, clazz)
+            elif shape in _SHAPES[code]:
+                self._leaves[code] = _SHAPES[code][shape]
+            else:
+                raise ValueError(f"Unsupported {name} shape: {shape!r}")
+        self.pair = pair
+        self.separators = separators
+        self._string = encode_basestring_ascii if ensure_ascii else encode_basestring
+        self._encoder = json.JSONEncoder(
+            separators=separators, ensure_ascii=ensure_ascii
+        )
+        key_separator = separators[1]
+        self._pair_keys = tuple(
+            self._string(name) + key_separator for name in ("first", "second")
+        )
+
+    def render(self, data: bytes) -> bytes:
+        """Render an msgpack-encoded evaluation result as JSON."""
+        chunks = []
+        self.render_to(data, chunks.append)
+        return b"".join(chunks)
+
+    def render_to(self, data: bytes, write: Callable[[bytes], Any]):
+        """Render an msgpack-encoded evaluation result as JSON, passing it to
+        `write` (e.g. a file's or socket's) in chunks as it is rendered."""
+        parts = []
+        self._transcode(data, parts, write)
+        if parts:
+            write("".join(parts).encode())
+
+    def _transcode(self, data, parts, write=None):
+        """Append the JSON for `data` to `parts`, flushing them to `write`.
+
+        A frame is ``[remaining, kind, closing, written, context]``: the children
+        still to render, what precedes each of them (see `_ITEMS`), what to close
+        the frame with, the children rendered so far, and the field names for
+        `_FIELDS` or whether the members are elements for `_MEMBERS`.
+        """
+        unpacker = msgpack.Unpacker(
+            io.BytesIO(data), strict_map_key=False, max_buffer_size=max(len(data), 1)
+        )
+        item_separator, key_separator = self.separators
+        stack = []
+        self._open(unpacker, data, parts, stack)
+        while stack:
+            frame = stack[-1]
+            if not frame[0]:
+                stack.pop()
+                parts.append(frame[2])
+                continue
+            if frame[3]:
+                parts.append(item_separator)
+            frame[0] -= 1
+            frame[3] += 1
+            kind = frame[1]
+            if kind == _KEYS:
+                parts.append(self._key(unpacker.unpack()))
+                parts.append(key_separator)
+            elif kind == _MEMBERS:
+                self._open_member(unpacker, frame, parts)
+            elif kind == _FIELDS:
+                parts.append(frame[4][frame[3] - 1])
+            self._open(unpacker, data, parts, stack)
+            if write is not None and len(parts) > _FLUSH_PIECES:
+                write("".join(parts).encode())
+                parts.clear()
+
+    def _open(self, unpacker, data, parts, stack):
+        """Render the next value, or push a frame for its children."""
+        marker = data[unpacker.tell()]
+        if marker in _ARRAY_MARKERS:
+            length = unpacker.read_array_header()
+            if not length:
+                parts.append("[]")
+                return
+            code = unpacker.unpack()
+            if code == CODE_TYPED_DYNAMIC and length == 4:
+                unpacker.skip()  # class name
+                unpacker.skip()  # module uri
+                members = unpacker.read_array_header()
+                if members:
+                    # opened by the first member, as `{` or `[`
+                    stack.append([members, _MEMBERS, None, 0, None])
+                else:
+                    parts.append("{}")
+            elif code in _LIST_CODES and length == 2:
+                self._open_list(unpacker, data, parts, stack)
+            elif code in _MAP_CODES and length == 2:
+                parts.append("{")
+                stack.append([unpacker.read_map_header(), _KEYS, "}", 0, None])
+            elif code == CODE_PAIR and length == 3:
+                if self.pair == "array":
+                    parts.append("[")
+                    stack.append([2, _ITEMS, "]", 0, None])
+                else:
+                    parts.append("{")
+                    stack.append([2, _FIELDS, "}", 0, self._pair_keys])
+            else:
+                fields = [unpacker.unpack() for _ in range(length - 1)]
+                parts.append(self._leaf(code, fields))
+        elif marker in _MAP_MARKERS:
+            parts.append("{")
+            stack.append([unpacker.read_map_header(), _KEYS, "}", 0, None])
+        else:
+            parts.append(self._scalar(unpacker.unpack()))
+
+    def _open_list(self, unpacker, data, parts, stack):
+        position = unpacker.tell()
+        first = position + _ARRAY_HEADER_SIZES.get(data[position], 0)
+        if first < len(data) and data[first] not in _CONTAINER_MARKERS:
+            # Starts with a scalar, so it most likely holds nothing else: render it
+            # in one go rather than item by item.
+            items = unpacker.unpack()
+            if set(map(type, items)) <= _JSON_SCALARS:
+                parts.append(self._encoder.encode(items))
+            else:
+                rendered = map(self._render_decoded, items)
+                parts.append(f"[{self.separators[0].join(rendered)}]")
+            return
+        parts.append("[")
+        stack.append([unpacker.read_array_header(), _ITEMS, "]", 0, None])
+
+    def _open_member(self, unpacker, frame, parts):
+        if unpacker.read_array_header() != 3:
+            raise ValueError("Malformed object member")
+        code = unpacker.unpack()
+        if code not in _MEMBER_CODES:
+            raise ValueError(f"Unknown object member type code: {code:#x}")
+        key = unpacker.unpack()
+        is_element = code == CODE_ELEMENT
+        if frame[4] is None:
+            frame[4] = is_element
+            frame[2] = "]" if is_element else "}"
+            parts.append("[" if is_element else "{")
+        elif frame[4] != is_element:
+            raise ValueError(
+                "Cannot render object with both elements and properties/entries"
+            )
+        if not is_element:
+            parts.append(self._key(key))
+            parts.append(self.separators[1])
+
+    def _render_decoded(self, value) -> str:
+        if type(value) in _JSON_SCALARS or type(value) is bytes:
+            return self._scalar(value)
+        # a Pkl value in a List that started with a scalar
+        parts = []
+        self._transcode(msgpack.packb(value), parts)
+        return "".join(parts)
+
+    def _leaf(self, code, fields) -> str:
+        shape = self._leaves.get(code)
+        if shape is None:
+            if code in (CODE_CLASS, CODE_TYPEALIAS):
+                return "null"
+            raise ValueError(f"Cannot render Pkl type code {code!r} as JSON")
+        return self._encoder.encode(shape(*fields))
+
+    def _scalar(self, value) -> str:
+        kind = type(value)
+        if kind is str:
+            return self._string(value)
+        if kind is int:
+            return int.__repr__(value)
+        if kind is float:
+            if value != value:
+                return "NaN"
+            if value == _INFINITY:
+                return "Infinity"
+            if value == -_INFINITY:
+                return "-Infinity"
+            return float.__repr__(value)
+        if value is True:
+            return "true"
+        if value is False:
+            return "false"
+        if value is None:
+            return "null"
+        if kind is bytes:
+            return self._string(base64.b64encode(value).decode("ascii"))
+        raise TypeError(f"Cannot render {kind.__name__} as JSON")
+
+    def _key(self, key) -> str:
+        # like `json.dumps`
+        if type(key) is str:
+            return self._string(key)
+        if type(key) in _JSON_SCALARS:
+            return self._string(self._scalar(key))
+        raise TypeError(
+            f"keys must be str, int, float, bool or None, not {type(key).__name__}"
+        )
+
+
+def _from_value(shape: Callable[[Any], Any], clazz: type):
+    def render(*fields):
+        return shape(clazz(*fields))
+
+    return render
+
+
+def render_json(data: bytes, renderer: Optional[JsonRenderer] = None) -> bytes:
+    """Render an msgpack-encoded evaluation result as JSON (see `JsonRenderer`)."""
+    return (renderer or JsonRenderer()).render(data)
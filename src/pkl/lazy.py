@@ -0,0 +1,223 @@
+import io
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, Tuple
+
+import msgpack
+
+from pkl.parser import (
+    _ARRAY_MARKERS,
+    CODE_ENTRY,
+    CODE_LIST,
+    CODE_LISTING,
+    CODE_MAP,
+    CODE_MAPPING,
+    CODE_PROPERTY,
+    CODE_TYPED_DYNAMIC,
+    Parser,
+)
+
+# Largest chunk read at once while skipping over values
+_READ_SIZE = 1 << 16
+
+
+class _Source:
+    """The encoded result that lazy values decode their parts from.
+
+    Values are located by their byte range; nothing is decoded up front."""
+
+    def __init__(self, data: bytes, parser: Parser):
+        self.data = data
+        self.view = memoryview(data)
+        self.parser = parser
+
+    def unpacker(self, start: int, end: int):
+        stream = io.BytesIO(self.data)  # shares `data`; no copy
+        stream.seek(start)
+        size = max(end - start, 1)
+        return msgpack.Unpacker(
+            stream,
+            read_size=min(size, _READ_SIZE),
+            max_buffer_size=size,
+            strict_map_key=False,
+        )
+
+    def parse(self, start: int, end: int):
+        return self.parser.parse(
+            msgpack.unpackb(self.view[start:end], strict_map_key=False)
+        )
+
+    def value(self, start: int, end: int):
+        """A lazy value for objects, Listings, Lists, Mappings and Maps; anything
+        else is parsed right away."""
+        if self.data[start] in _ARRAY_MARKERS:
+            unpacker = self.unpacker(start, end)
+            length = unpacker.read_array_header()
+            code = unpacker.unpack() if length else None
+            openers = self.parser._openers
+            if code == CODE_TYPED_DYNAMIC and length == 4 and code in openers:
+                members = self._scan_members(unpacker, start)
+                if members is not None:
+                    return LazyObject(self, start, end, members)
+            elif code in (CODE_LIST, CODE_LISTING) and length == 2 and code in openers:
+                return LazyList(self, start, end, self._scan_items(unpacker, start))
+            elif code in (CODE_MAP, CODE_MAPPING) and length == 2 and code in openers:
+                return LazyDict(self, start, end, self._scan_entries(unpacker, start))
+        return self.parse(start, end)
+
+    @staticmethod
+    def _scan_members(unpacker, start):
+        unpacker.skip()  # class name
+        unpacker.skip()  # module uri
+        members = {}
+        for _ in range(unpacker.read_array_header()):
+            if unpacker.read_array_header() != 3:
+                return None
+            if unpacker.unpack() not in (CODE_PROPERTY, CODE_ENTRY):
+                # elements are rendered as a list; leave it to the parser
+                return None
+            key = unpacker.unpack()
+            value_start = start + unpacker.tell()
+            unpacker.skip()
+            members[key] = (value_start, start + unpacker.tell())
+        return members
+
+    @staticmethod
+    def _scan_items(unpacker, start):
+        # item i spans bounds[i]:bounds[i + 1]; 8 bytes per item
+        length = unpacker.read_array_header()
+        bounds = array("q", [start + unpacker.tell()])
+        for _ in range(length):
+            unpacker.skip()
+            bounds.append(start + unpacker.tell())
+        return bounds
+
+    @staticmethod
+    def _scan_entries(unpacker, start):
+        entries = {}
+        for _ in range(unpacker.read_map_header()):
+            key = unpacker.unpack()
+            value_start = start + unpacker.tell()
+            unpacker.skip()
+            entries[key] = (value_start, start + unpacker.tell())
+        return entries
+
+
+class _LazyValue:
+    __slots__ = ("_source", "_start", "_end", "_cache")
+
+    def __init__(self, source: _Source, start: int, end: int):
+        self._source = source
+        self._start = start
+        self._end = end
+        self._cache: Dict[Any, Any] = {}
+
+    def _get(self, key, span: Tuple[int, int]):
+        try:
+            return self._cache[key]
+        except KeyError:
+            value = self._cache[key] = self._source.value(*span)
+            return value
+
+    def materialize(self):
+        """Parse the whole value, as the parser would have without `lazy`."""
+        return self._source.parse(self._start, self._end)
+
+
+class LazyObject(_LazyValue):
+    """A Pkl object whose members are parsed on first access.
+
+    Properties are read as attributes, entries (and properties) with ``obj[key]``.
+    Objects, Listings, Lists, Mappings and Maps among them are lazy as well.
+    """
+
+    __slots__ = ("_members",)
+
+    def __init__(self, source, start, end, members: Dict[Any, Tuple[int, int]]):
+        super().__init__(source, start, end)
+        self._members = members
+
+    def __getattr__(self, name):
+        if name in _SLOTS:
+            # not set yet, e.g. while being copied
+            raise AttributeError(name)
+        try:
+            span = self._members[name]
+        except KeyError:
+            raise AttributeError(name) from None
+        return self._get(name, span)
+
+    def __getitem__(self, key):
+        return self._get(key, self._members[key])
+
+    def __contains__(self, key):
+        return key in self._members
+
+    def __len__(self):
+        return len(self._members)
+
+    def keys(self):
+        return self._members.keys()
+
+    def __dir__(self):
+        return [k for k in self._members if isinstance(k, str)]
+
+    def __repr__(self):
+        return f"LazyObject({', '.join(map(str, self._members))})"
+
+
+_SLOTS = frozenset(_LazyValue.__slots__ + LazyObject.__slots__)
+
+
+class LazyList(_LazyValue, Sequence):
+    """A Listing or List whose elements are parsed on first access."""
+
+    __slots__ = ("_bounds",)
+
+    def __init__(self, source, start, end, bounds: "array[int]"):
+        super().__init__(source, start, end)
+        self._bounds = bounds
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("list index out of range")
+        return self._get(index, (self._bounds[index], self._bounds[index + 1]))
+
+    def __len__(self):
+        return len(self._bounds) - 1
+
+    def __repr__(self):
+        return f"LazyList(<{len(self)} elements>)"
+
+
+class LazyDict(_LazyValue, Mapping):
+    """A Mapping or Map whose values are parsed on first access."""
+
+    __slots__ = ("_entries",)
+
+    def __init__(self, source, start, end, entries: Dict[Any, Tuple[int, int]]):
+        super().__init__(source, start, end)
+        self._entries = entries
+
+    def __getitem__(self, key):
+        return self._get(key, self._entries[key])
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return f"LazyDict({list(self._entries)!r})"
+
+
+def parse_lazy(data: bytes, parser: Parser):
+    """Wrap an msgpack-encoded result in lazy values (see `Parser` ``lazy``)."""
+    if not isinstance(data, bytes):
+        data = bytes(data)
+    return _Source(data, parser).value(0, len(data))
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-from dataclasses import asdict, dataclass
-from typing import Any, Dict, List, Optional
+from dataclasses import dataclass, fields, is_dataclass
+from typing import Any, Callable, Dict, List, Optional
 
 from pkl.evaluator_options import ClientModuleReader, ClientResourceReader, Project
 from pkl.reader import PathElement
+from pkl.utils import add_slots
 
 CODE_NEW_EVALUATOR = 0x20
 CODE_NEW_EVALUATOR_RESPONSE = 0x21
@@ -25,28 +26,23 @@ CODE_LIST_MODULES_RESPONSE = 0x2D
 # Define the base interface for incoming messages
 @dataclass
 class IncomingMessage:
+    __slots__ = ()
+
     @classmethod
     def decode(cls, incoming: List):
-        code, msg = incoming
+        """Build the message for a decoded ``[code, body]`` pair.
 
-        if code == CODE_EVALUATE_RESPONSE:
-            return EvaluateResponse(**msg)
-        elif code == CODE_EVALUATE_LOG:
-            return Log(**msg)
-        elif code == CODE_NEW_EVALUATOR_RESPONSE:
-            return CreateEvaluatorResponse(**msg)
-        elif code == CODE_EVALUATE_READ:
-            return EvaluatorReadResourceRequest(**msg)
-        elif code == CODE_EVALUATE_READ_MODULE:
-            return EvaluatorReadModuleRequest(**msg)
-        elif code == CODE_LIST_RESOURCES_REQUEST:
-            return EvaluatorListResourcesRequest(**msg)
-        elif code == CODE_LIST_MODULES_REQUEST:
-            return EvaluatorListModulesRequest(**msg)
-        else:
+        Also usable as the ``list_hook`` of a ``msgpack.Unpacker``, which then
+        yields messages instead of lists; incoming messages hold no other arrays.
+        """
+        code, msg = incoming
+        message_cls = _INCOMING_MESSAGES.get(code)
+        if message_cls is None:
             raise ValueError(f"Unknown code: {hex(code)}")
+        return message_cls(**msg)
 
 
+@add_slots
 @dataclass
 class CreateEvaluatorResponse(IncomingMessage):
     # A number identifying this request
@@ -59,6 +55,7 @@ class CreateEvaluatorResponse(IncomingMessage):
     error: Optional[str] = None
 
 
+@add_slots
 @dataclass
 class EvaluateResponse(IncomingMessage):
     # The requestId of the Evaluate request
@@ -74,6 +71,7 @@ class EvaluateResponse(IncomingMessage):
     error: Optional[str] = None
 
 
+@add_slots
 @dataclass
 class Log(IncomingMessage):
     # A number identifying this evaluator.
@@ -92,6 +90,7 @@ class Log(IncomingMessage):
     frameUri: str
 
 
+@add_slots
 @dataclass
 class EvaluatorReadResourceRequest(IncomingMessage):
     # A number identifying this request.
@@ -104,6 +103,7 @@ class EvaluatorReadResourceRequest(IncomingMessage):
     uri: str
 
 
+@add_slots
 @dataclass
 class EvaluatorReadModuleRequest(IncomingMessage):
     # A number identifying this request.
@@ -116,6 +116,7 @@ class EvaluatorReadModuleRequest(IncomingMessage):
     uri: str
 
 
+@add_slots
 @dataclass
 class EvaluatorListResourcesRequest(IncomingMessage):
     # A number identifying this request.
@@ -128,6 +129,7 @@ class EvaluatorListResourcesRequest(IncomingMessage):
     uri: str
 
 
+@add_slots
 @dataclass
 class EvaluatorListModulesRequest(IncomingMessage):
     # A number identifying this request.
@@ -140,18 +142,73 @@ class EvaluatorListModulesRequest(IncomingMessage):
     uri: str
 
 
+_INCOMING_MESSAGES = {
+    CODE_EVALUATE_RESPONSE: EvaluateResponse,
+    CODE_EVALUATE_LOG: Log,
+    CODE_NEW_EVALUATOR_RESPONSE: CreateEvaluatorResponse,
+    CODE_EVALUATE_READ: EvaluatorReadResourceRequest,
+    CODE_EVALUATE_READ_MODULE: EvaluatorReadModuleRequest,
+    CODE_LIST_RESOURCES_REQUEST: EvaluatorListResourcesRequest,
+    CODE_LIST_MODULES_REQUEST: EvaluatorListModulesRequest,
+}
+
+
+_SCALAR_TYPES = frozenset((str, bytes, int, float, bool))
+
+# field names of the (nested) dataclasses seen by `_to_wire`
+_FIELD_NAMES: Dict[type, tuple] = {}
+
+
+def _to_wire(value):
+    """Convert nested dataclasses to dicts without their None fields.
+
+    Unlike `dataclasses.asdict`, nothing is deep-copied."""
+    if type(value) in _SCALAR_TYPES:
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_to_wire(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _to_wire(v) for k, v in value.items()}
+    names = _FIELD_NAMES.get(type(value))
+    if names is None:
+        if not is_dataclass(value):
+            return value
+        names = _FIELD_NAMES[type(value)] = tuple(f.name for f in fields(value))
+    items = ((name, getattr(value, name)) for name in names)
+    return {k: _to_wire(v) for k, v in items if v is not None}
+
+
+def _compile_encoder(cls) -> Callable[["OutgoingMessage"], list]:
+    code = cls.CODE
+    names = tuple(f.name for f in fields(cls))
+    scalar_types = _SCALAR_TYPES
+
+    def encode(msg):
+        obj = {}
+        for name in names:
+            value = getattr(msg, name)
+            if value is None:
+                continue
+            obj[name] = value if type(value) in scalar_types else _to_wire(value)
+        return [code, obj]
+
+    return encode
+
+
 @dataclass
 class OutgoingMessage:
     CODE = None
 
-    def _dict_factory(self, items):
-        return {k: v for k, v in items if v is not None}
-
     def to_json(self):
-        assert self.CODE is not None
-        msg = asdict(self, dict_factory=self._dict_factory)
-        obj = [self.CODE, msg]
-        return obj
+        cls = type(self)
+        encoder = cls.__dict__.get("_encoder")
+        if encoder is None:
+            assert self.CODE is not None
+            # fields are known once the subclass is a dataclass; build the
+            # encoder for it on first use
+            encoder = _compile_encoder(cls)
+            cls._encoder = encoder
+        return encoder(self)
 
 
 @dataclass
@@ -1,15 +1,30 @@
+import io
 import sys
+import threading
 import types
-from dataclasses import dataclass, make_dataclass
+from collections import OrderedDict, namedtuple
+from dataclasses import dataclass, fields, is_dataclass, make_dataclass
 from datetime import timedelta
 from enum import Enum, auto
-from typing import Generic, List, Literal, TypeVar
+from operator import attrgetter, itemgetter
+from typing import Callable, Generic, Hashable, List, Literal, Optional, Tuple, TypeVar
+
+import msgpack
+
+from pkl.utils import add_slots
 
 # create module for lookup
 _lookup_module = types.ModuleType(__name__ + "._lookup")
 sys.modules[_lookup_module.__name__] = _lookup_module
 
 
+def _register_lookup(clazz: type) -> type:
+    # lets generated classes be found by name, e.g. for pickling
+    clazz.__module__ = _lookup_module.__name__
+    setattr(_lookup_module, clazz.__name__, clazz)
+    return clazz
+
+
 class ResultType(Enum):
     INT = auto()
     FLOAT = auto()
@@ -42,6 +57,23 @@ CODE_PROPERTY = 0x10
 CODE_ENTRY = 0x11
 CODE_ELEMENT = 0x12
 
+_OBJECT_TYPES = (ResultType.DATACLASS, ResultType.NAMEDTUPLE, ResultType.DICTIONARY)
+_DURATION_TYPES = (None, ResultType.TIMEDELTA, ResultType.PANDAS_TIMEDELTA)
+
+_MEMBER_CODES = (CODE_PROPERTY, CODE_ENTRY, CODE_ELEMENT)
+
+# values that are their own result
+_SCALAR_TYPES = frozenset((str, int, float, bool, bytes, type(None)))
+
+# what the children of a `_read` frame are preceded by
+_VALUES, _MAP_KEYS, _MEMBER_HEADERS = range(3)
+
+# msgpack type bytes: fixarray, array 16, array 32 / fixmap, map 16, map 32
+_ARRAY_MARKERS = frozenset(range(0x90, 0xA0)) | {0xDC, 0xDD}
+_MAP_MARKERS = frozenset(range(0x80, 0x90)) | {0xDE, 0xDF}
+_CONTAINER_MARKERS = _ARRAY_MARKERS | _MAP_MARKERS
+_ARRAY_HEADER_SIZES = {**dict.fromkeys(range(0x90, 0xA0), 1), 0xDC: 3, 0xDD: 5}
+
 
 T1 = TypeVar("T1")
 T2 = TypeVar("T2")
@@ -82,6 +114,32 @@ class DataSize:
     unit: Literal["b", "kb", "kib", "mb", "mib", "gb", "gib", "tb", "tib", "pb", "pib"]
 
 
+# size of each unit in nanoseconds and bytes
+_NANOSECONDS = {
+    "ns": 1,
+    "us": 10**3,
+    "ms": 10**6,
+    "s": 10**9,
+    "min": 60 * 10**9,
+    "h": 3600 * 10**9,
+    "d": 86400 * 10**9,
+}
+
+_BYTES = {
+    "b": 1,
+    "kb": 10**3,
+    "kib": 2**10,
+    "mb": 10**6,
+    "mib": 2**20,
+    "gb": 10**9,
+    "gib": 2**30,
+    "tb": 10**12,
+    "tib": 2**40,
+    "pb": 10**15,
+    "pib": 2**50,
+}
+
+
 @dataclass
 class IntSeq:
     start: int
@@ -94,12 +152,355 @@ class Regex:
     pattern: str
 
 
+def _frozen_variant(clazz: type) -> type:
+    """An immutable, hashable subclass of the value dataclass `clazz`, which
+    ``Parser(frozen=True)`` makes instead. Its instances equal those of `clazz`
+    with the same fields."""
+    names = [f.name for f in fields(clazz)]
+    template = make_dataclass(clazz.__name__, names, frozen=True)
+    values = attrgetter(*names)
+
+    def __eq__(self, other):
+        if isinstance(other, clazz):
+            return values(self) == values(other)
+        return NotImplemented
+
+    return type(
+        f"Frozen{clazz.__name__}",
+        (clazz,),
+        {
+            "__module__": __name__,
+            "__doc__": f"A frozen `{clazz.__name__}`.",
+            "__init__": template.__init__,
+            "__setattr__": template.__setattr__,
+            "__delattr__": template.__delattr__,
+            "__eq__": __eq__,
+            "__hash__": template.__hash__,
+            "__dataclass_params__": template.__dataclass_params__,
+        },
+    )
+
+
+FrozenPair = _frozen_variant(Pair)
+FrozenDuration = _frozen_variant(Duration)
+FrozenDataSize = _frozen_variant(DataSize)
+FrozenIntSeq = _frozen_variant(IntSeq)
+FrozenRegex = _frozen_variant(Regex)
+
+_VALUE_CLASSES = (Pair, Duration, DataSize, IntSeq, Regex)
+_FROZEN_VALUE_CLASSES = (
+    FrozenPair,
+    FrozenDuration,
+    FrozenDataSize,
+    FrozenIntSeq,
+    FrozenRegex,
+)
+
+
+def _finish_map(values, keys):
+    return dict(zip(keys, values))
+
+
+def _finish_frozen_map(values, keys):
+    return FrozenDict(zip(keys, values))
+
+
+def _try_hash(value) -> Optional[int]:
+    try:
+        return hash(value)
+    except TypeError:
+        # holds something unhashable, e.g. a numpy array
+        return None
+
+
+class FrozenDict(dict):
+    """A dict that cannot be changed and is hashable. Maps and Mappings become
+    these with ``Parser(frozen=True)``."""
+
+    __slots__ = ("_hash",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        try:
+            self._hash = hash(frozenset(self.items()))
+        except TypeError:
+            self._hash = None
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError(f"'{type(self).__name__}' object is immutable")
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+    def __hash__(self):
+        if self._hash is None:
+            raise TypeError(f"unhashable type: '{type(self).__name__}'")
+        return self._hash
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if isinstance(other, FrozenDict) and _hashes_differ(self._hash, other._hash):
+            return False
+        return dict.__eq__(self, other)
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict.__repr__(self)})"
+
+
+def _hashes_differ(first: Optional[int], second: Optional[int]) -> bool:
+    return first is not None and second is not None and first != second
+
+
+class _FrozenResult:
+    """Base of the frozen dataclasses generated with ``Parser(frozen=True)``.
+
+    Instances compute their hash once, from their fields' (cached) hashes, and
+    compare it before their fields, so unequal objects are mostly told apart
+    without looking inside them."""
+
+    __slots__ = ("_pkl_hash",)
+    _pkl_fields: Tuple[str, ...] = ()
+
+    def __post_init__(self):
+        object.__setattr__(self, "_pkl_hash", _try_hash(self._pkl_values()))
+
+    def _pkl_values(self) -> tuple:
+        return tuple(getattr(self, name) for name in self._pkl_fields)
+
+    def __hash__(self):
+        if self._pkl_hash is None:
+            raise TypeError(f"unhashable type: '{type(self).__name__}'")
+        return self._pkl_hash
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if type(other) is not type(self):
+            return NotImplemented
+        if _hashes_differ(self._pkl_hash, other._pkl_hash):
+            return False
+        return self._pkl_values() == other._pkl_values()
+
+    def __reduce__(self):
+        return type(self), self._pkl_values()
+
+
+class ClassRegistry:
+    """Thread-safe, bounded cache of the classes generated for results.
+
+    One registry is shared by all parsers, so repeated loads reuse the same
+    classes and their results compare equal. Once `maxsize` classes exist, the
+    least recently used one is forgotten; results that already use it keep it.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._classes: "OrderedDict[Hashable, type]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, factory: Callable[[], type]) -> type:
+        """Return the class for `key`, calling `factory` to create it if needed."""
+        with self._lock:
+            clazz = self._classes.get(key)
+            if clazz is None:
+                clazz = self._classes[key] = factory()
+                if len(self._classes) > self.maxsize:
+                    self._classes.popitem(last=False)
+            else:
+                self._classes.move_to_end(key)
+            return clazz
+
+    def clear(self):
+        with self._lock:
+            self._classes.clear()
+
+    def __len__(self):
+        return len(self._classes)
+
+
+# shared by all parsers that are not given their own registry
+class_registry = ClassRegistry()
+
+# longer strings are deduplicated within a result, but not interned
+_INTERN_MAX_LENGTH = 64
+
+# how `_Interner` keys values of a type: by value, by item identities, or by the
+# identities of the fields a getter returns; None if they are never shared
+_BY_VALUE, _BY_ITEMS, _BY_SET, _BY_MAPPING = range(4)
+_SHAPES = {int: _BY_VALUE, bytes: _BY_VALUE, timedelta: _BY_VALUE}
+
+
+def _shape(clazz: type):
+    shape = _SHAPES.get(clazz, ...)
+    if shape is ...:
+        if issubclass(clazz, tuple):
+            shape = _BY_ITEMS
+        elif issubclass(clazz, frozenset):
+            shape = _BY_SET
+        elif issubclass(clazz, FrozenDict):
+            shape = _BY_MAPPING
+        elif issubclass(clazz, timedelta):
+            shape = _BY_VALUE  # e.g. pandas.Timedelta
+        elif is_dataclass(clazz) and clazz.__dataclass_params__.frozen:
+            shape = _field_getter(tuple(f.name for f in fields(clazz)))
+        else:
+            shape = None
+        _SHAPES[clazz] = shape
+    return shape
+
+
+def _field_getter(names):
+    def get(obj):
+        return tuple(getattr(obj, name) for name in names)
+
+    return get
+
+
+class _Interner:
+    """The values of one result, so equal ones can be shared (see `Parser` ``intern``).
+
+    Immutable values are replaced by the first equal one. Their children are
+    canonical already, so containers are keyed by their children's identities,
+    and by type and value for numbers and strings, which keeps ``1``, ``1.0`` and
+    ``True`` or ``0.0`` and ``-0.0`` apart. Values that hold anything mutable are
+    kept as they are.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._shared = set()  # ids of the values in `_values`
+
+    @staticmethod
+    def key(key):
+        return sys.intern(key) if type(key) is str else key
+
+    def __call__(self, value):
+        clazz = type(value)
+        if clazz is str:
+            if len(value) <= _INTERN_MAX_LENGTH:
+                return sys.intern(value)
+            key = value
+        elif clazz is float:
+            key = (float, value.hex())
+        elif clazz is bool or value is None:
+            return value
+        else:
+            shape = _shape(clazz)
+            if shape is None:
+                return value
+            if shape is _BY_VALUE:
+                key = (clazz, value)
+            else:
+                if shape is _BY_MAPPING:
+                    items = (*value.keys(), *value.values())
+                elif shape is _BY_ITEMS or shape is _BY_SET:
+                    items = value
+                else:
+                    items = shape(value)
+                shared = self._shared
+                parts = []
+                for item in items:
+                    item_type = type(item)
+                    if item_type is float:
+                        parts.append((float, item.hex()))
+                    elif item_type in _SCALAR_TYPES:
+                        parts.append((item_type, item))
+                    elif id(item) in shared:
+                        parts.append(id(item))
+                    else:
+                        return value
+                key = (clazz, frozenset(parts) if shape is _BY_SET else tuple(parts))
+        canonical = self._values.setdefault(key, value)
+        if canonical is value:
+            self._shared.add(id(value))
+        return canonical
+
+    def children(self, frame):
+        """Share the values and intern the keys of a `_walk` or `_read` frame."""
+        results, context = frame[1], frame[3]
+        results[:] = map(self, results)
+        if type(context) is tuple:
+            # an object: (class name, module uri, member types, keys)
+            context = context[3]
+        if type(context) is list:
+            context[:] = map(self.key, context)
+
+
 class Parser:
+    """Turns evaluation results into Python objects.
+
+    Args:
+        namespace: Classes to instantiate for Pkl objects, by class name. Without
+            it, dataclasses are generated. Classes with a ``_from_pkl`` classmethod
+            (see pkl-gen-python's ``slots`` and ``frozen``) are made with it, from
+            the object's properties by name.
+        force_render: Render objects with both elements and properties or entries.
+        single_pass: In `parse_bytes`, build the result while reading the msgpack
+            bytes instead of decoding them to lists and dicts first, so only the
+            final objects are ever held in memory.
+        registry: Where generated classes are kept. Defaults to the process-wide
+            `class_registry`.
+        object_type: What Pkl objects become without a `namespace`:
+            ``ResultType.DATACLASS`` (the default), ``ResultType.NAMEDTUPLE`` or
+            ``ResultType.DICTIONARY`` for plain dicts.
+        slots: Give generated dataclasses ``__slots__``. They use less memory but
+            cannot be given new attributes.
+        duration_type: Convert Durations to ``ResultType.TIMEDELTA``
+            (`datetime.timedelta`) or ``ResultType.PANDAS_TIMEDELTA``
+            (`pandas.Timedelta`) instead of `Duration`.
+        numpy_arrays: Turn Lists and Listings of only ints, only floats (or both)
+            or only booleans into `numpy` arrays; anything else stays a list.
+        numpy_dtype: dtype for those arrays. By default it is ``int64``,
+            ``float64`` or ``bool``, from the values. Lists that can't be cast
+            safely (e.g. floats to an int dtype, or values out of its range)
+            stay lists.
+        numpy_min_length: Shorter Lists and Listings stay lists.
+        lazy: In `parse_bytes`, return `pkl.lazy.LazyObject`, `LazyList` and
+            `LazyDict` proxies over the encoded result, which parse each member on
+            first access. ``materialize()`` parses a whole proxy.
+        intern: Intern property names, keys and short strings, and share equal
+            immutable values (numbers, strings, tuples, namedtuples, frozen
+            dataclasses, timedeltas) within a result instead of keeping a copy of
+            each. Large results with repetitive content take less memory, at some
+            cost in parsing time.
+        frozen: Make results immutable and hashable, e.g. to use them as cache
+            keys: objects become frozen, slotted dataclasses, Lists and Listings
+            tuples, Sets frozensets, Maps and Mappings `FrozenDict`, and Durations,
+            DataSizes, Pairs, IntSeqs and Regexes frozen subclasses of their
+            classes (e.g. `FrozenDuration`). Objects cache their hash, so unequal
+            ones usually compare in O(1); with `intern`, equal ones are mostly the
+            same object.
+        compiled: With a `namespace`, decode objects with a function per class,
+            compiled from the types of its dataclass's fields (see `pkl.schema`),
+            instead of looking at the type of every value. `single_pass` is then
+            not used. Has no effect with `intern` or overridden handlers.
+    """
+
     def __init__(
         self,
         namespace=None,
         force_render=False,
+        single_pass=False,
+        registry: Optional[ClassRegistry] = None,
+        object_type: ResultType = ResultType.DATACLASS,
+        slots: bool = False,
+        duration_type: Optional[ResultType] = None,
+        numpy_arrays: bool = False,
+        numpy_dtype=None,
+        numpy_min_length: int = 1,
+        lazy: bool = False,
+        intern: bool = False,
+        frozen: bool = False,
+        compiled: bool = False,
     ):
+        if object_type not in _OBJECT_TYPES:
+            raise ValueError(f"Unsupported object_type: {object_type}")
+        if duration_type not in _DURATION_TYPES:
+            raise ValueError(f"Unsupported duration_type: {duration_type}")
         self.type_handlers = {
             CODE_TYPED_DYNAMIC: self.parse_typed_dynamic,
             CODE_MAP: self.parse_map,
@@ -119,11 +520,347 @@ class Parser:
             CODE_ELEMENT: self.parse_element,
         }
         self.namespace = namespace
-        self.dataclass_cache = {}
+        self.registry = class_registry if registry is None else registry
         self.force_render = force_render
+        self.single_pass = single_pass
+        self.object_type = object_type
+        self.slots = slots
+        self.duration_type = duration_type
+        self.lazy = lazy
+        self.intern = intern
+        self.frozen = frozen
+        self._finish_map = _finish_frozen_map if frozen else _finish_map
+        self._pair, self._duration, self._datasize, self._intseq, self._regex = (
+            _FROZEN_VALUE_CLASSES if frozen else _VALUE_CLASSES
+        )
+        self.numpy_arrays = numpy_arrays
+        self.numpy_dtype = numpy_dtype
+        self.numpy_min_length = numpy_min_length
+
+        # Types whose handler was overridden in a subclass are always passed to that
+        # handler; the others are built by `parse` and `parse_bytes` without recursion.
+        defaults = {
+            code
+            for code, handler in self.type_handlers.items()
+            if getattr(handler, "__func__", None) is getattr(Parser, handler.__name__)
+        }
+        self.compiled = compiled
+        self._compilable = (
+            compiled
+            and namespace is not None
+            and not intern
+            and len(defaults) == len(self.type_handlers)
+            and type(self).handle_type is Parser.handle_type
+        )
+        self._schema = None
+        self._member_codes = frozenset(defaults.intersection(_MEMBER_CODES))
+        openers = {
+            CODE_TYPED_DYNAMIC: self._open_typed_dynamic,
+            CODE_MAP: self._open_map,
+            CODE_MAPPING: self._open_map,
+            CODE_LIST: self._open_list,
+            CODE_LISTING: self._open_list,
+        }
+        self._openers = {code: f for code, f in openers.items() if code in defaults}
+
+        # for `parse_bytes`: containers, with the array length they expect, and leaves
+        stream_openers = {
+            CODE_TYPED_DYNAMIC: (self._stream_typed_dynamic, 4),
+            CODE_MAP: (self._stream_map, 2),
+            CODE_MAPPING: (self._stream_map, 2),
+            CODE_LIST: (self._stream_list, 2),
+            CODE_LISTING: (self._stream_list, 2),
+        }
+        self._stream_openers = {
+            code: opener for code, opener in stream_openers.items() if code in defaults
+        }
+        stream_readers = {
+            CODE_SET: (self._read_set, 2),
+            CODE_DURATION: (self._read_duration, 3),
+            CODE_DATASIZE: (self._read_datasize, 3),
+            CODE_PAIR: (self._read_pair, 3),
+            CODE_INTSEQ: (self._read_intseq, 4),
+            CODE_REGEX: (self._read_regex, 2),
+            CODE_PROPERTY: (self._read_member, 3),
+            CODE_ENTRY: (self._read_member, 3),
+            CODE_ELEMENT: (self._read_member, 3),
+        }
+        self.stream_readers = {
+            code: reader for code, reader in stream_readers.items() if code in defaults
+        }
 
     def parse(self, obj):
-        return self.handle_type(obj)
+        if type(self).handle_type is not Parser.handle_type:
+            return self.handle_type(obj)
+        if self._compilable:
+            return self._schema_decoder().parse(obj)
+        return self._walk(obj)
+
+    def _schema_decoder(self):
+        if self._schema is None:
+            from pkl.schema import SchemaDecoder
+
+            self._schema = SchemaDecoder(self.namespace, self)
+        return self._schema
+
+    def _walk(self, obj):
+        """`handle_type` with an explicit stack instead of recursion.
+
+        A frame is ``[children, results, finish, context]``: an iterator over the
+        child values still to parse, the parsed ones, and how to build the value
+        from them.
+        """
+        frame, result = self._open(obj)
+        if frame is None:
+            return result
+        stack = [frame]
+        share = _Interner() if self.intern else None
+        while True:
+            frame = stack[-1]
+            results = frame[1]
+            for child in frame[0]:
+                if type(child) in _SCALAR_TYPES:
+                    results.append(child)
+                    continue
+                child_frame, result = self._open(child)
+                if child_frame is not None:
+                    stack.append(child_frame)
+                    break
+                results.append(result)
+            else:
+                stack.pop()
+                if share is not None:
+                    share.children(frame)
+                result = frame[2](results, frame[3])
+                if not stack:
+                    return result
+                stack[-1][1].append(result)
+
+    def _open(self, obj):
+        """Return a frame for `obj` if it has children, or else its parsed value."""
+        if isinstance(obj, list):
+            opener = self._openers.get(obj[0]) if obj else None
+            frame = opener(obj) if opener is not None else None
+            if frame is not None:
+                return frame, None
+            return None, self.handle_type(obj)
+        if type(obj) is dict:
+            return [iter(obj.values()), [], self._finish_map, list(obj)], None
+        if isinstance(obj, (dict, set, tuple)):
+            return None, self.handle_type(obj)
+        return None, obj
+
+    def _open_typed_dynamic(self, obj):
+        if len(obj) != 4:
+            return None
+        _, full_class_name, module_uri, members = obj
+        member_codes = self._member_codes
+        for m in members:
+            if type(m) is not list or len(m) != 3 or m[0] not in member_codes:
+                return None
+        member_types = set(map(itemgetter(0), members))
+        keys = list(map(itemgetter(1), members))
+        context = (full_class_name, module_uri, member_types, keys)
+        return [map(itemgetter(2), members), [], self._finish_object, context]
+
+    def _open_map(self, obj):
+        if len(obj) != 2:
+            return None
+        members = obj[1]
+        return [iter(members.values()), [], self._finish_map, list(members)]
+
+    def _open_list(self, obj):
+        if len(obj) != 2:
+            return None
+        return [iter(obj[1]), [], self._finish_list, None]
+
+    def _finish_list(self, values, context=None):
+        if self.numpy_arrays and len(values) >= self.numpy_min_length:
+            array = self._numpy_array(values)
+            if array is not None:
+                return array
+        return tuple(values) if self.frozen else values
+
+    def _numpy_array(self, values):
+        kinds = set(map(type, values))
+        if kinds == {bool}:
+            dtype = "bool"
+        elif kinds == {int}:
+            dtype = "int64"
+        elif kinds == {float} or kinds == {int, float}:
+            dtype = "float64"
+        else:
+            # mixed or non-numeric content
+            return None
+        import numpy as np
+
+        try:
+            array = np.array(values, dtype=dtype)
+            if self.numpy_dtype is not None:
+                with np.errstate(over="ignore"):
+                    cast = array.astype(self.numpy_dtype, casting="same_kind")
+                # astype wraps values out of the dtype's range around (or turns
+                # them into infinities); floats may only lose precision
+                if cast.dtype.kind == "f":
+                    fits = np.array_equal(np.isinf(cast), np.isinf(array))
+                else:
+                    fits = np.array_equal(cast, array)
+                if not fits:
+                    return None
+                array = cast
+        except (OverflowError, TypeError):
+            # ints beyond int64, or a dtype the values can't be cast to
+            return None
+        if self.frozen:
+            array.flags.writeable = False
+        return array
+
+    def _finish_object(self, values, context):
+        full_class_name, module_uri, member_types, keys = context
+        if self._has_elements(member_types):
+            return self._finish_elements(keys, values)
+        return self._build_object(full_class_name, module_uri, dict(zip(keys, values)))
+
+    def parse_bytes(self, data: bytes):
+        """Parse an msgpack-encoded evaluation result."""
+        if self.lazy:
+            from pkl.lazy import parse_lazy
+
+            return parse_lazy(data, self)
+        if not self.single_pass or self._compilable:
+            return self.parse(msgpack.unpackb(data, strict_map_key=False))
+        unpacker = msgpack.Unpacker(
+            io.BytesIO(data), strict_map_key=False, max_buffer_size=max(len(data), 1)
+        )
+        return self._read(unpacker, data)
+
+    def _read(self, unpacker, data):
+        """Read the next value, like `_walk` but straight from the msgpack stream.
+
+        A frame is ``[remaining, results, finish, context, kind]``, where `kind`
+        says what precedes each child: nothing, a map key, or a member's header.
+        """
+        frame, result = self._read_open(unpacker, data)
+        if frame is None:
+            return result
+        stack = [frame]
+        member_codes = self._member_codes
+        share = _Interner() if self.intern else None
+        while True:
+            frame = stack[-1]
+            results, context, kind = frame[1], frame[3], frame[4]
+            while frame[0]:
+                frame[0] -= 1
+                if kind == _MAP_KEYS:
+                    context.append(unpacker.unpack())
+                elif kind == _MEMBER_HEADERS:
+                    length = unpacker.read_array_header()
+                    code = unpacker.unpack()
+                    context[2].add(code)
+                    if length != 3 or code not in member_codes:
+                        member = self._read_coded(code, unpacker, data, length)
+                        context[3].extend(member.keys())
+                        results.extend(member.values())
+                        continue
+                    context[3].append(unpacker.unpack())
+                child_frame, result = self._read_open(unpacker, data)
+                if child_frame is not None:
+                    stack.append(child_frame)
+                    break
+                results.append(result)
+            else:
+                stack.pop()
+                if share is not None:
+                    share.children(frame)
+                result = frame[2](results, context)
+                if not stack:
+                    return result
+                stack[-1][1].append(result)
+
+    def _read_open(self, unpacker, data):
+        # peek at the type byte to tell Pkl values (arrays) from scalars
+        marker = data[unpacker.tell()]
+        if marker in _ARRAY_MARKERS:
+            length = unpacker.read_array_header()
+            if not length:
+                return None, self.handle_type([])
+            code = unpacker.unpack()
+            opener, expected = self._stream_openers.get(code, (None, None))
+            if opener is not None and length == expected:
+                return opener(unpacker, data)
+            return None, self._read_coded(code, unpacker, data, length)
+        if marker in _MAP_MARKERS:
+            return [
+                unpacker.read_map_header(),
+                [],
+                self._finish_map,
+                [],
+                _MAP_KEYS,
+            ], None
+        return None, unpacker.unpack()
+
+    def _read_coded(self, code, unpacker, data, length):
+        reader, expected = self.stream_readers.get(code, (None, None))
+        if reader is None or length != expected:
+            # not streamed; decode the remaining items and handle them as usual
+            obj = [code] + [unpacker.unpack() for _ in range(length - 1)]
+            return self.handle_type(obj)
+        return reader(unpacker, data)
+
+    def _stream_typed_dynamic(self, unpacker, data):
+        full_class_name = unpacker.unpack()
+        module_uri = unpacker.unpack()
+        length = unpacker.read_array_header()
+        context = (full_class_name, module_uri, set(), [])
+        return [length, [], self._finish_object, context, _MEMBER_HEADERS], None
+
+    def _stream_map(self, unpacker, data):
+        return [unpacker.read_map_header(), [], self._finish_map, [], _MAP_KEYS], None
+
+    def _stream_list(self, unpacker, data):
+        position = unpacker.tell()
+        first = position + _ARRAY_HEADER_SIZES.get(data[position], 0)
+        if (
+            not self.intern
+            and first < len(data)
+            and data[first] not in _CONTAINER_MARKERS
+        ):
+            # Starts with a scalar, so it most likely holds nothing else: decode it
+            # in one go rather than item by item. (With `intern`, the items are read
+            # one by one so they can be shared.)
+            items = unpacker.unpack()
+            if set(map(type, items)) <= _SCALAR_TYPES:
+                return None, self._finish_list(items)
+            return None, self._walk([CODE_LIST, items])
+        return [
+            unpacker.read_array_header(),
+            [],
+            self._finish_list,
+            None,
+            _VALUES,
+        ], None
+
+    def _read_set(self, unpacker, data):
+        return (frozenset if self.frozen else set)(unpacker.unpack())
+
+    def _read_duration(self, unpacker, data):
+        return self._make_duration(unpacker.unpack(), unpacker.unpack())
+
+    def _read_datasize(self, unpacker, data):
+        return self._datasize(unpacker.unpack(), unpacker.unpack())
+
+    def _read_pair(self, unpacker, data):
+        return self._pair(unpacker.unpack(), unpacker.unpack())
+
+    def _read_intseq(self, unpacker, data):
+        return self._intseq(unpacker.unpack(), unpacker.unpack(), unpacker.unpack())
+
+    def _read_regex(self, unpacker, data):
+        return self._regex(unpacker.unpack())
+
+    def _read_member(self, unpacker, data):
+        key = unpacker.unpack()
+        return {key: self._read(unpacker, data)}
 
     def handle_type(self, obj):
         if isinstance(obj, list):
@@ -139,84 +876,149 @@ class Parser:
             return type(obj)(self.handle_type(v) for v in obj)
         return obj
 
-    def get_dataclass_class(self, class_name: str, keys: List[str], no_cache: bool = False):
-        """Return a dataclass for the given name and keys. When no_cache is True (e.g. for
-        Pkl's built-in Dynamic type), skip cache so each distinct key set gets its own class.
-        Fixes https://github.com/jw-y/pkl-python/issues/11
+    def get_dataclass_class(
+        self, class_name: str, keys: List[str], no_cache: bool = False, module_uri: str = ""
+    ):
+        """Return a dataclass for the given name and keys, creating it once per module and
+        distinct key set. Caching by name alone would give every Pkl ``Dynamic`` the members
+        of the first one seen (https://github.com/jw-y/pkl-python/issues/11).
+        When no_cache is True, always create a new class.
         """
-        if no_cache or class_name not in self.dataclass_cache:
-            dynamic_class = make_dataclass(class_name, keys)
-            dynamic_class.__module__ = _lookup_module.__name__
-            setattr(_lookup_module, class_name, dynamic_class)
-            if not no_cache:
-                self.dataclass_cache[class_name] = dynamic_class
-        else:
-            dynamic_class = self.dataclass_cache[class_name]
-        return dynamic_class
+        keys = tuple(keys)
+        slots, frozen = self.slots, self.frozen
+
+        def create():
+            if frozen:
+                dynamic_class = make_dataclass(
+                    class_name,
+                    keys,
+                    bases=(_FrozenResult,),
+                    namespace={"_pkl_fields": keys},
+                    eq=False,
+                    frozen=True,
+                )
+            else:
+                dynamic_class = make_dataclass(class_name, keys)
+            if slots or frozen:
+                dynamic_class = add_slots(dynamic_class)
+            return _register_lookup(dynamic_class)
+
+        if no_cache:
+            return create()
+        kind = "frozen" if frozen else "slots" if slots else "dataclass"
+        return self.registry.get((module_uri, class_name, keys, kind), create)
+
+    def get_namedtuple_class(
+        self, class_name: str, keys: List[str], module_uri: str = ""
+    ):
+        """Return a namedtuple for the given name and keys, creating it once per module and
+        distinct key set."""
+        keys = tuple(keys)
+
+        def create():
+            return _register_lookup(namedtuple(class_name, keys))
+
+        return self.registry.get((module_uri, class_name, keys, "namedtuple"), create)
 
     def parse_typed_dynamic(self, obj):
         _, full_class_name, module_uri, members = obj
 
         member_types = set(m[0] for m in members)
         property_list = list(map(self.handle_type, members))
+        return self._make_object(
+            full_class_name, module_uri, member_types, property_list
+        )
 
+    def _make_object(self, full_class_name, module_uri, member_types, property_list):
+        if self._has_elements(member_types):
+            # element types
+            members = property_list
+            if self.frozen:
+                return tuple(map(FrozenDict, members))
+            return members
+
+        # only properties and entries
+        members = {k: v for m in property_list for k, v in m.items()}
+        return self._build_object(full_class_name, module_uri, members)
+
+    def _finish_elements(self, keys, values):
+        # objects with elements are rendered as a list of {index: value}
+        return self._finish_list(
+            [self._finish_map([v], [k]) for k, v in zip(keys, values)]
+        )
+
+    def _has_elements(self, member_types):
         if CODE_ELEMENT in member_types:  # has element
             if len(member_types) > 1 and not self.force_render:
                 raise ValueError(
                     "Cannot render object with both elements and properties/entries.\n"
                     "\tUse 'force_render=True'"
                 )
-            # element types
-            members = property_list
-            return members
+            return True
+        return False
 
-        # only properties and entries
-        members = {k: v for m in property_list for k, v in m.items()}
+    def _build_object(self, full_class_name, module_uri, members):
         class_name = full_class_name.split("#")[-1].split(".")[-1]
 
         if self.namespace is not None:
             if class_name not in self.namespace:
                 raise ValueError(f"'namespace' provided but '{class_name}' not found")
             clazz = self.namespace[class_name]
+            from_pkl = getattr(clazz, "_from_pkl", None)
+            if from_pkl is not None:
+                # generated by pkl-gen-python; sets the fields by name, without __init__
+                return from_pkl(members)
+        elif self.object_type is ResultType.DICTIONARY:
+            return FrozenDict(members) if self.frozen else members
+        elif self.object_type is ResultType.NAMEDTUPLE:
+            clazz = self.get_namedtuple_class(class_name, members.keys(), module_uri)
         else:
-            # Don't cache by name alone for Dynamic: different instances can have different members
-            no_cache = class_name == "Dynamic"
-            clazz = self.get_dataclass_class(class_name, members.keys(), no_cache=no_cache)
+            clazz = self.get_dataclass_class(class_name, members.keys(), module_uri=module_uri)
         res = clazz(*members.values())
         return res
 
+    def _make_duration(self, value, unit):
+        duration = self._duration(value, unit)
+        if self.duration_type is ResultType.TIMEDELTA:
+            return duration.to_timedelta()
+        if self.duration_type is ResultType.PANDAS_TIMEDELTA:
+            return duration.to_pandas_timedelta()
+        return duration
+
     def parse_map(self, obj):
         members = obj[1]
-        return dict(zip(members.keys(), map(self.handle_type, members.values())))
+        return self._finish_map(
+            list(map(self.handle_type, members.values())), members.keys()
+        )
 
     def parse_mapping(self, obj):
         return self.parse_map(obj)
 
     def parse_list(self, obj):
-        return list(map(self.handle_type, obj[1]))
+        return self._finish_list(list(map(self.handle_type, obj[1])))
 
     def parse_listing(self, obj):
         return self.parse_list(obj)
 
     def parse_set(self, obj):
-        return set(obj[1])
+        return (frozenset if self.frozen else set)(obj[1])
 
     def parse_duration(self, obj):
         _, value, unit = obj
 
-        return Duration(value, unit)
+        return self._make_duration(value, unit)
 
     def parse_pair(self, obj):
-        return Pair(obj[1], obj[2])
+        return self._pair(obj[1], obj[2])
 
     def parse_datasize(self, obj):
-        return DataSize(obj[1], obj[2])
+        return self._datasize(obj[1], obj[2])
 
     def parse_intseq(self, obj):
-        return IntSeq(obj[1], obj[2], obj[3])
+        return self._intseq(obj[1], obj[2], obj[3])
 
     def parse_regex(self, obj):
-        return Regex(obj[1])
+        return self._regex(obj[1])
 
     def parse_class(self, obj):
         return
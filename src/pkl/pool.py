@@ -0,0 +1,310 @@
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+from pkl.evaluator_manager import (
+    Evaluator,
+    EvaluatorManager,
+    load_project_from_evaluator,
+)
+from pkl.evaluator_options import EvaluatorOptions, PreconfiguredOptions
+from pkl.msgapi import Project
+from pkl.parser import Parser
+from pkl.utils import ModuleSource
+
+
+class _Member:
+    def __init__(self, manager: EvaluatorManager):
+        self.manager = manager
+        self.in_flight = 0
+        self.last_used = time.monotonic()
+        # set under the pool lock once the member leaves the pool
+        self.closed = False
+
+
+class PooledEvaluator:
+    """
+    An evaluator whose `CreateEvaluator` settings are replicated on every server
+    of a `PKLServerPool`. Each evaluation runs on the least-loaded server.
+    """
+
+    def __init__(
+        self,
+        pool: "PKLServerPool",
+        options: EvaluatorOptions,
+        project: Optional[Project] = None,
+        *,
+        parser=None,
+    ):
+        self.options = options
+        self.project = project
+        self.parser = parser or Parser()
+        self.closed = False
+        self._pool = pool
+        # resolved once the evaluator exists on the member's server
+        self._evaluators: "Dict[_Member, Future[Evaluator]]" = {}
+        self._lock = threading.Lock()
+
+    def _evaluator_for(self, member: _Member) -> Evaluator:
+        # The evaluator is created without the lock; other threads that need it
+        # on the same member wait for the future.
+        with self._lock:
+            future = self._evaluators.get(member)
+            create = future is None
+            if create:
+                # the pool closes a member before it calls `_forget`, so one
+                # checked here is never left behind
+                if member.closed:
+                    raise ValueError("Server closed")
+                future = self._evaluators[member] = Future()
+        if create:
+            try:
+                future.set_result(
+                    member.manager.new_evaluator(self.options, self.project)
+                )
+            except BaseException as e:
+                future.set_exception(e)
+                with self._lock:
+                    if self._evaluators.get(member) is future:
+                        del self._evaluators[member]
+        return future.result()
+
+    def _forget(self, member: _Member):
+        with self._lock:
+            self._evaluators.pop(member, None)
+
+    def evaluate_expression(self, source: ModuleSource, expr: Optional[str]):
+        binary_res = self._evaluate_expression_raw(source, expr)
+        return self.parser.parse_bytes(binary_res)
+
+    def _evaluate_expression_raw(self, source: ModuleSource, expr: Optional[str]):
+        if self.closed:
+            raise ValueError("Evaluator is closed")
+        member = self._pool._acquire()
+        try:
+            evaluator = self._evaluator_for(member)
+            return evaluator._evaluate_expression_raw(source, expr)
+        finally:
+            self._pool._release(member)
+
+    def evaluate_module(self, source: ModuleSource):
+        return self.evaluate_expression(source, None)
+
+    def evaluate_output_files(self, source: ModuleSource) -> List[str]:
+        return self.evaluate_expression(
+            source, "output.files.toMap().mapValues((_, it) -> it.text)"
+        )
+
+    def evaluate_output_text(self, source: ModuleSource) -> str:
+        return self.evaluate_expression(source, "output")
+
+    def evaluate_output_value(self, source: ModuleSource):
+        return self.evaluate_expression(source, "output.value")
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        with self._lock:
+            futures = list(self._evaluators.values())
+            self._evaluators.clear()
+        for future in futures:
+            if future.exception() is not None:
+                continue
+            try:
+                future.result().close()
+            except ValueError:
+                # its server was already shut down
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class PKLServerPool:
+    """
+    A pool of `pkl server` processes for evaluating on several cores at once.
+
+    Evaluators created by the pool exist on every server. Each evaluation is sent
+    to the server with the fewest requests in flight. When every server has at
+    least `grow_threshold` requests in flight, a server is added (up to
+    `max_servers`); servers idle for longer than `idle_timeout` seconds are shut
+    down again (down to `min_servers`). Servers that die are replaced.
+
+    Args:
+        pkl_command: Command used to start each server.
+        min_servers: Servers started up front and always kept.
+        max_servers: Upper bound on servers. Defaults to the number of CPUs.
+        grow_threshold: Requests in flight on the least-loaded server
+            at which the pool grows.
+        idle_timeout: Seconds a server may sit idle before it is shut down.
+        debug: Start the servers in debug mode.
+    """
+
+    def __init__(
+        self,
+        pkl_command: Optional[List[str]] = None,
+        *,
+        min_servers: int = 1,
+        max_servers: Optional[int] = None,
+        grow_threshold: int = 2,
+        idle_timeout: float = 30.0,
+        debug=False,
+    ):
+        max_servers = max_servers or os.cpu_count() or 1
+        if not 1 <= min_servers <= max_servers:
+            raise ValueError(
+                f"Expected 1 <= min_servers <= max_servers, "
+                f"got {min_servers} and {max_servers}"
+            )
+        self.min_servers = min_servers
+        self.max_servers = max_servers
+        self.grow_threshold = grow_threshold
+        self.idle_timeout = idle_timeout
+        self._pkl_command = pkl_command
+        self._debug = debug
+        self._closed = False
+        self._lock = threading.Lock()
+        self._members: List[_Member] = [self._start() for _ in range(min_servers)]
+        # servers being started, which count towards `max_servers`
+        self._starting = 0
+        self._evaluators: "weakref.WeakSet[PooledEvaluator]" = weakref.WeakSet()
+
+    @property
+    def size(self) -> int:
+        return len(self._members)
+
+    def _start(self) -> _Member:
+        return _Member(EvaluatorManager(self._pkl_command, debug=self._debug))
+
+    def _remove_idle(self) -> List[_Member]:
+        """Take the members idle for too long out of the pool. Called with the lock
+        held; the caller closes them after releasing it."""
+        now = time.monotonic()
+        idle = []
+        for member in list(self._members):
+            if len(self._members) <= self.min_servers:
+                break
+            if member.in_flight == 0 and now - member.last_used > self.idle_timeout:
+                self._members.remove(member)
+                member.closed = True
+                idle.append(member)
+        return idle
+
+    def _remove_broken(self) -> List[_Member]:
+        """Take the members whose server died out of the pool. Called with the lock
+        held; the caller closes them after releasing it."""
+        broken = [m for m in self._members if m.manager._broken is not None]
+        for member in broken:
+            self._members.remove(member)
+            member.closed = True
+        return broken
+
+    def _close_members(self, members: List[_Member]):
+        for member in members:
+            for evaluator in list(self._evaluators):
+                evaluator._forget(member)
+            member.manager.close()
+
+    def _acquire(self) -> _Member:
+        # Starting and stopping servers takes long, so neither happens under the
+        # lock: dead and idle servers are taken out of the pool and a slot is
+        # reserved for a new one there, then they are closed and it is started.
+        with self._lock:
+            if self._closed:
+                raise ValueError("Server closed")
+            retired = self._remove_broken() + self._remove_idle()
+            member = min(self._members, key=lambda m: m.in_flight, default=None)
+            running = len(self._members) + self._starting
+            grow = member is None or (
+                running < self.max_servers
+                and (
+                    member.in_flight >= self.grow_threshold
+                    # replaces dead servers
+                    or running < self.min_servers
+                )
+            )
+            if grow:
+                self._starting += 1
+            else:
+                member.in_flight += 1
+        self._close_members(retired)
+        if not grow:
+            return member
+
+        try:
+            member = self._start()
+        except BaseException:
+            with self._lock:
+                self._starting -= 1
+            raise
+        with self._lock:
+            self._starting -= 1
+            if not self._closed:
+                member.in_flight += 1
+                self._members.append(member)
+                return member
+        member.manager.close()
+        raise ValueError("Server closed")
+
+    def _release(self, member: _Member):
+        with self._lock:
+            member.in_flight -= 1
+            member.last_used = time.monotonic()
+
+    def new_evaluator(
+        self, options: EvaluatorOptions, project: Optional[Project] = None, parser=None
+    ) -> PooledEvaluator:
+        if self._closed:
+            raise ValueError("Server closed")
+        evaluator = PooledEvaluator(self, options, project, parser=parser)
+        # registered first, so that servers shut down meanwhile are forgotten
+        self._evaluators.add(evaluator)
+        # create it on every running server up front; servers added later
+        # create it on first use
+        with self._lock:
+            members = list(self._members)
+        for member in members:
+            try:
+                evaluator._evaluator_for(member)
+            except ValueError:
+                # shut down since; nothing to create it on
+                if not member.closed:
+                    raise
+        return evaluator
+
+    def new_project_evaluator(
+        self, project_dir: str, options: EvaluatorOptions, parser=None
+    ) -> PooledEvaluator:
+        member = self._acquire()
+        try:
+            with member.manager.new_evaluator(
+                PreconfiguredOptions()
+            ) as project_evaluator:
+                project = load_project_from_evaluator(project_evaluator, project_dir)
+        finally:
+            self._release(member)
+        return self.new_evaluator(options, project, parser)
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            members, self._members = self._members, []
+            for member in members:
+                member.closed = True
+        for member in members:
+            member.manager.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,233 @@
+"""
+Decoders compiled from the dataclasses of a `Parser` namespace, such as those
+generated by pkl-gen-python (see `Parser` ``compiled``).
+
+Each class gets a function, generated from its fields' types, that builds it from
+the decoded msgpack of a Pkl object: the properties are matched to the fields by
+precomputed position, and each value is converted as its type requires, without
+looking at type codes. Values of types that aren't known here (unions, ``Any``,
+...) are parsed as usual.
+"""
+
+import sys
+import threading
+import weakref
+from collections.abc import Mapping
+from dataclasses import fields, is_dataclass
+from typing import Any, Callable, Dict, Literal, Tuple, Union, get_args, get_origin
+
+from pkl.parser import (
+    CODE_PROPERTY,
+    CODE_TYPED_DYNAMIC,
+    DataSize,
+    Duration,
+    FrozenDataSize,
+    FrozenDict,
+)
+
+# values that are decoded as they are
+_PASSTHROUGH = frozenset((str, int, float, bool, type(None)))
+
+# generated factories, per class and per `_Compiler` options
+_factories: "weakref.WeakKeyDictionary[type, Dict[Tuple, Callable]]"
+_factories = weakref.WeakKeyDictionary()
+_factories_lock = threading.Lock()
+
+_MISSING = object()
+
+
+class SchemaDecoder:
+    """Decodes Pkl objects into the dataclasses of `namespace`, with a compiled
+    function per class.
+
+    Classes are found by their ``_registered_identifier`` (the qualified Pkl class
+    name), or else by name, as the parser does. Objects of other classes are
+    parsed by `parser` as usual.
+    """
+
+    def __init__(self, namespace, parser):
+        self.parser = parser
+        self._walk = parser._walk
+        options = (parser.frozen, parser.numpy_arrays)
+        self._by_short_name: Dict[str, Callable] = {}
+        self._decoders: Dict[str, Callable] = {}
+        env = {
+            "_walk": parser._walk,
+            "_object": self.decode,
+            "_finish_list": parser._finish_list,
+            "_set": frozenset if parser.frozen else set,
+            "_duration": parser._make_duration,
+        }
+        for name, clazz in namespace.items():
+            if not isinstance(clazz, type) or not is_dataclass(clazz):
+                continue
+            decoder = _factory(clazz, options)(clazz, **env)
+            self._by_short_name[name] = decoder
+            identifier = getattr(clazz, "_registered_identifier", None)
+            if isinstance(identifier, str):
+                self._decoders[identifier] = decoder
+
+    def decode(self, obj):
+        """Decode a Pkl object (``[CODE_TYPED_DYNAMIC, class name, module uri,
+        members]``)."""
+        decoder = self._decoders.get(obj[1])
+        if decoder is None:
+            class_name = obj[1].split("#")[-1].split(".")[-1]
+            decoder = self._by_short_name.get(class_name, self._walk)
+            self._decoders[obj[1]] = decoder
+        return decoder(obj)
+
+    def parse(self, obj):
+        """`Parser.parse`, with objects decoded by their compiled decoder."""
+        if type(obj) is list and len(obj) == 4 and obj[0] == CODE_TYPED_DYNAMIC:
+            return self.decode(obj)
+        return self._walk(obj)
+
+
+def _factory(clazz: type, options: Tuple) -> Callable:
+    with _factories_lock:
+        per_class = _factories.setdefault(clazz, {})
+        factory = per_class.get(options)
+        if factory is None:
+            factory = per_class[options] = _Compiler(clazz, *options).compile()
+        return factory
+
+
+class _Compiler:
+    """Generates the decoder of a dataclass.
+
+    The decoder first tries the properties in field order, as the server sends
+    them, and otherwise looks up each property's position. Objects with other
+    members (entries, elements, unknown properties) or missing properties are
+    left to the parser.
+    """
+
+    def __init__(self, clazz: type, frozen: bool, numpy_arrays: bool):
+        self.clazz = clazz
+        self.frozen = frozen
+        self.finish_lists = frozen or numpy_arrays
+        self._names = 0
+
+    def compile(self) -> Callable:
+        names = [f.name for f in fields(self.clazz) if f.init]
+        types = self._field_types()
+        values = [f"v{i}" for i in range(len(names))]
+        converted = ", ".join(
+            self._convert(types.get(name, Any), value)
+            for name, value in zip(names, values)
+        )
+        members = [f"m{i}" for i in range(len(names))]
+        in_order = " and ".join(
+            f"{m}[0] == {CODE_PROPERTY} and {m}[1] == {name!r}"
+            for m, name in zip(members, names)
+        )
+        positions = {name: i for i, name in enumerate(names)}
+
+        lines = [
+            "def make(_cls, _walk, _object, _finish_list, _set, _duration):",
+            f"    _positions = {positions!r}",
+            "    def decode(obj):",
+            "        members = obj[3]",
+            f"        if len(members) == {len(names)}:",
+        ]
+        if names:
+            lines += [
+                f"            {', '.join(members)}, = members",
+                f"            if {in_order}:",
+                f"                {', '.join(values)}, = "
+                + "".join(f"{m}[2], " for m in members),
+                f"                return _cls({converted})",
+            ]
+        else:
+            lines.append("            return _cls()")
+        lines += [
+            f"        values = [_MISSING] * {len(names)}",
+            "        for member in members:",
+            "            position = _positions.get(member[1])",
+            f"            if position is None or member[0] != {CODE_PROPERTY}:",
+            "                return _walk(obj)",
+            "            values[position] = member[2]",
+            "        for value in values:",
+            "            if value is _MISSING:",
+            "                return _walk(obj)",
+        ]
+        if names:
+            lines.append(f"        {', '.join(values)}, = values")
+        lines += [
+            f"        return _cls({converted})",
+            "    return decode",
+        ]
+        namespace: Dict[str, Any] = {
+            "_DataSize": FrozenDataSize if self.frozen else DataSize,
+            "_FrozenDict": FrozenDict,
+            "_MISSING": _MISSING,
+        }
+        filename = f"<pkl decoder for {self.clazz.__qualname__}>"
+        exec(compile("\n".join(lines), filename, "exec"), namespace)
+        return namespace["make"]
+
+    def _field_types(self) -> Dict[str, Any]:
+        module = sys.modules.get(self.clazz.__module__)
+        module_globals = vars(module) if module is not None else {}
+        types = {}
+        for f in fields(self.clazz):
+            annotation = f.type
+            if isinstance(annotation, str):
+                # from `from __future__ import annotations`
+                try:
+                    annotation = eval(
+                        annotation, module_globals, dict(vars(self.clazz))
+                    )
+                except Exception:
+                    annotation = Any
+            types[f.name] = annotation
+        return types
+
+    def _name(self) -> str:
+        self._names += 1
+        return f"x{self._names}"
+
+    def _convert(self, tp, value: str) -> str:
+        """An expression that converts the decoded msgpack `value` (a name) to `tp`."""
+        if tp in _PASSTHROUGH:
+            return value
+        origin, args = get_origin(tp), get_args(tp)
+        if origin is Union:
+            members = [arg for arg in args if arg is not type(None)]
+            if len(members) == 1:
+                converted = self._convert(members[0], value)
+                if converted == value:
+                    return value
+                return f"(None if {value} is None else {converted})"
+        elif origin is Literal:
+            return value
+        elif origin is list or (origin is tuple and args[1:] == (Ellipsis,)):
+            # `Tuple[X, ...]` as pkl-gen-python annotates Lists with `frozen`
+            item = self._name()
+            converted = self._convert(args[0] if args else Any, item)
+            items = (
+                f"{value}[1]"
+                if converted == item
+                else f"[{converted} for {item} in {value}[1]]"
+            )
+            return f"_finish_list({items})" if self.finish_lists else items
+        elif origin in (set, frozenset):
+            if args and args[0] in _PASSTHROUGH:
+                return f"_set({value}[1])"
+        elif origin in (dict, Mapping):
+            if args and args[0] in _PASSTHROUGH:
+                key, item = self._name(), self._name()
+                converted = self._convert(args[1], item)
+                entries = (
+                    f"{value}[1]"
+                    if converted == item
+                    else f"{{{key}: {converted} for {key}, {item} in {value}[1].items()}}"
+                )
+                return f"_FrozenDict({entries})" if self.frozen else entries
+        elif tp is Duration:
+            return f"_duration({value}[1], {value}[2])"
+        elif tp is DataSize:
+            return f"_DataSize({value}[1], {value}[2])"
+        elif isinstance(tp, type) and is_dataclass(tp):
+            return f"_object({value})"
+        return f"_walk({value})"
@@ -1,10 +1,32 @@
 import atexit
+import logging
 import os
+import selectors
 import signal
 import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from typing import List, Optional, Tuple
 
 import msgpack
 
+# Size of the reusable buffer that stdout is read into.
+DEFAULT_BUFFER_SIZE = 1 << 16
+
+# Linux only: capacity requested for the stdin/stdout pipes (see F_SETPIPE_SZ).
+# 1 MiB is the default `/proc/sys/fs/pipe-max-size` for unprivileged processes.
+DEFAULT_PIPE_SIZE = 1 << 20
+
+# fcntl.F_SETPIPE_SZ is only exposed by Python >= 3.10
+_F_SETPIPE_SZ = 1031
+
+# Number of stderr lines kept per server.
+DEFAULT_STDERR_LINES = 1000
+
+logger = logging.getLogger(__name__)
+
 
 def preexec_function():
     # Cause the child process to be terminated when the parent exits
@@ -12,6 +34,10 @@ def preexec_function():
 
 
 _PROCESSES = []
+_PROCESSES_LOCK = threading.Lock()
+
+# Upper bound on live server processes this process may own; None for no limit.
+_MAX_SERVERS = None
 
 
 def terminate_processes():
@@ -20,24 +46,36 @@ def terminate_processes():
         process.wait()
 
 
-atexit.register(terminate_processes)
+def _forget_processes():
+    # A forked child must neither count nor terminate its parent's servers.
+    global _PROCESSES_LOCK
+    _PROCESSES_LOCK = threading.Lock()
+    _PROCESSES.clear()
 
 
-class PKLServer:
-    def __init__(self, cmd=None, debug=False):
-        from pkl.binary_manager import BinaryManager
+atexit.register(terminate_processes)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_processes)
 
-        manager = BinaryManager()
-        binary_path = manager.get_binary_filepath()
 
-        self.cmd = cmd or [binary_path, "server"]
-        self.next_request_id = 1
-        self.unpacker = msgpack.Unpacker()
+def set_max_servers(max_servers: Optional[int]):
+    """Cap the number of `pkl server` processes this process may run at once.
+
+    Starting a server beyond the cap raises `RuntimeError`. ``None`` removes the cap.
+    """
+    global _MAX_SERVERS
+    _MAX_SERVERS = max_servers
 
-        env = {"PKL_DEBUG": "1"} if debug else {}
 
-        self.process = subprocess.Popen(
-            self.cmd,
+def _spawn(cmd, env) -> subprocess.Popen:
+    with _PROCESSES_LOCK:
+        _PROCESSES[:] = [p for p in _PROCESSES if p.poll() is None]
+        if _MAX_SERVERS is not None and len(_PROCESSES) >= _MAX_SERVERS:
+            raise RuntimeError(
+                f"Refusing to start more than {_MAX_SERVERS} pkl server processes"
+            )
+        process = subprocess.Popen(
+            cmd,
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
@@ -46,14 +84,160 @@ class PKLServer:
             preexec_fn=preexec_function,
             env=env,
         )
+        _PROCESSES.append(process)
+    return process
+
+
+def _unregister_process(process: subprocess.Popen):
+    with _PROCESSES_LOCK:
+        if process in _PROCESSES:
+            _PROCESSES.remove(process)
+
+
+def _set_pipe_size(fd: int, size: int):
+    if not sys.platform.startswith("linux"):
+        return
+    import fcntl
+
+    try:
+        fcntl.fcntl(fd, getattr(fcntl, "F_SETPIPE_SZ", _F_SETPIPE_SZ), size)
+    except OSError:
+        # EPERM above pipe-max-size, or EBUSY when shrinking a non-empty pipe;
+        # the kernel default is still usable.
+        pass
+
+
+class StderrLog:
+    """Bounded buffer of the most recent stderr lines of a server; every line is
+    also sent to the ``pkl.server`` logger."""
+
+    def __init__(self, maxlen: int = DEFAULT_STDERR_LINES, level=logging.WARNING):
+        self.lines = deque(maxlen=maxlen)
+        self.level = level
+        # lines ever added, including those no longer kept
+        self.count = 0
+        self._partial = b""
+        self._lock = threading.Lock()
+
+    def feed(self, data: bytes):
+        *complete, self._partial = (self._partial + data).split(b"\n")
+        for line in complete:
+            self._add(line)
+
+    def flush(self):
+        if self._partial:
+            self._add(self._partial)
+            self._partial = b""
+
+    def _add(self, raw: bytes):
+        line = raw.decode(errors="replace")
+        with self._lock:
+            self.lines.append(line)
+            self.count += 1
+        logger.log(self.level, "%s", line)
+
+    def tail(self, n: Optional[int] = None) -> List[str]:
+        with self._lock:
+            lines = list(self.lines)
+        return lines if n is None else lines[-n:]
+
+    def since(self, count: int) -> Tuple[List[str], int]:
+        """The lines still kept that were added after the first `count`, and the
+        count to pass next time."""
+        with self._lock:
+            new = min(self.count - count, len(self.lines))
+            return list(self.lines)[len(self.lines) - new :], self.count
+
+
+class PKLServer:
+    """
+    Transport to a `pkl server` subprocess.
+
+    Reads block on a selector until the server has written something, instead of
+    spinning on a non-blocking pipe, and are done with ``readinto`` into a single
+    reusable buffer.
+
+    Args:
+        cmd: Command used to start the server. Defaults to ``<pkl binary> server``.
+        debug: Start the server with ``PKL_DEBUG=1``.
+        buffer_size: Size of the reusable buffer stdout is read into.
+        pipe_size: Capacity to request for the stdin/stdout pipes (Linux only).
+            ``None`` keeps the kernel default.
+        liveness_interval: While waiting for output, check this often (in seconds)
+            whether the process is still running.
+        stderr_lines: Number of stderr lines kept in `stderr_log`.
+        stderr_level: Level at which stderr lines are logged to ``pkl.server``.
+        list_hook: Passed to the ``msgpack.Unpacker`` that decodes stdout, e.g.
+            `IncomingMessage.decode` to receive messages instead of lists.
+    """
+
+    def __init__(
+        self,
+        cmd=None,
+        debug=False,
+        *,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        pipe_size=DEFAULT_PIPE_SIZE,
+        liveness_interval: float = 1.0,
+        stderr_lines: int = DEFAULT_STDERR_LINES,
+        stderr_level=logging.WARNING,
+        list_hook=None,
+    ):
+        if cmd is None:
+            from pkl.binary_manager import BinaryManager
+
+            manager = BinaryManager()
+            cmd = [manager.get_binary_filepath(), "server"]
+
+        self.cmd = cmd
+        self.liveness_interval = liveness_interval
+        self.next_request_id = 1
+        # no limit on message size; results of several hundred MB are fine
+        self.unpacker = msgpack.Unpacker(list_hook=list_hook, max_buffer_size=0)
+
+        env = {"PKL_DEBUG": "1"} if debug else {}
+
+        self.process = _spawn(self.cmd, env)
         self.stdout = self.process.stdout
         self.stdin = self.process.stdin
         self.stderr = self.process.stderr
         self.closed = False
 
-        os.set_blocking(self.stdout.fileno(), False)
-        os.set_blocking(self.stderr.fileno(), False)
-        _PROCESSES.append(self.process)
+        if pipe_size is not None:
+            _set_pipe_size(self.stdin.fileno(), pipe_size)
+            _set_pipe_size(self.stdout.fileno(), pipe_size)
+
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+
+        # Windows pipes cannot be registered with a selector; plain blocking
+        # reads are used there instead.
+        self._selector = None
+        if os.name != "nt":
+            os.set_blocking(self.stdout.fileno(), False)
+            self._selector = selectors.DefaultSelector()
+            self._selector.register(self.stdout, selectors.EVENT_READ)
+
+        # stderr is drained by its own thread so that a chatty server can never
+        # block on a full pipe, and so that reading it costs nothing per message
+        self.stderr_log = StderrLog(stderr_lines, stderr_level)
+        self._stderr_printed = 0
+        self._stderr_thread = threading.Thread(
+            target=self._drain_stderr, name="pkl-server-stderr", daemon=True
+        )
+        self._stderr_thread.start()
+
+    def _drain_stderr(self):
+        fd = self.stderr.fileno()
+        while True:
+            try:
+                data = os.read(fd, DEFAULT_BUFFER_SIZE)
+            except OSError:
+                break
+            if not data:
+                break
+            self.stderr_log.feed(data)
+        self.stderr_log.flush()
 
     def get_request_id(self):
         ret = self.next_request_id
@@ -66,35 +250,78 @@ class PKLServer:
         self.stdin.write(msg)
         self.stdin.flush()
 
-    def _read(self, stream):
-        msg = None
-        while msg is None:
-            msg = stream.read()
-        return msg
+    def _read(self, stream, deadline=None):
+        """Block until ``stream`` has data and read it into the shared buffer.
+
+        Returns a view of the bytes read; an empty view means end of stream.
+        Raises `TimeoutError` once the ``time.monotonic()`` ``deadline`` passes.
+        """
+        while True:
+            if self._selector is not None:
+                wait = self.liveness_interval
+                if deadline is not None:
+                    wait = min(wait, deadline - time.monotonic())
+                    if wait <= 0:
+                        raise TimeoutError("no output from the pkl server in time")
+                if not self._selector.select(wait):
+                    if self.process.poll() is not None:
+                        # exited without closing the pipe (e.g. a grandchild holds it)
+                        return self._view[:0]
+                    continue
+            n = stream.readinto(self._buffer)
+            if n is not None:
+                return self._view[:n]
+            # woken up without data (EAGAIN); wait again
 
-    def _receive(self, stream):
+    def _receive(self, stream, deadline=None):
         while True:
             for unpacked in self.unpacker:
                 return unpacked
-            msg = self._read(stream)
+            msg = self._read(stream, deadline)
+            if not msg:
+                raise EOFError("pkl server closed its output stream")
             self.unpacker.feed(msg)
 
-    def receive(self):
+    def receive(self, timeout: Optional[float] = None):
+        """Receive the next message.
+
+        Args:
+            timeout: Seconds to wait before raising `TimeoutError`. Not supported
+                on Windows, where reads always block.
+        """
         if self.closed:
             raise ValueError("Server closed")
-        return self._receive(self.stdout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        return self._receive(self.stdout, deadline)
 
     def receive_err(self):
+        """Print the stderr output received since the last call."""
         if self.closed:
             raise ValueError("Server closed")
-        msg = self.stderr.read()
-        if msg is not None:
-            print(msg.decode(), end="")
+        lines, self._stderr_printed = self.stderr_log.since(self._stderr_printed)
+        for line in lines:
+            print(line)
+
+    def stderr_tail(self, n: Optional[int] = None) -> str:
+        """The last `n` (by default all kept) lines of stderr output."""
+        return "\n".join(self.stderr_log.tail(n))
+
+    def stop(self):
+        """Terminate the process but leave the pipes open, so that a thread blocked
+        in `receive` wakes up with end of stream instead of a closed file."""
+        self.process.terminate()
+        self.process.wait()
 
     def terminate(self):
         self.process.terminate()
+        self.process.wait()
+        # EOF once the process is gone, unless a grandchild keeps the pipe open
+        self._stderr_thread.join(timeout=1)
+        if self._selector is not None:
+            self._selector.close()
         self.process.stdout.close()
         self.process.stderr.close()
         self.process.stdin.close()
         self.process.wait()
         self.closed = True
+        _unregister_process(self.process)
@@ -0,0 +1,301 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import fields
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from pkl.evaluator_manager import (
+    Evaluator,
+    EvaluatorManager,
+    load_project_from_evaluator,
+)
+from pkl.evaluator_options import EvaluatorOptions, PreconfiguredOptions
+from pkl.server import set_max_servers
+from pkl.utils import ModuleSource
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(map(_freeze, value))
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def _options_key(options: EvaluatorOptions):
+    key = [type(options)]
+    for f in fields(options):
+        value = getattr(options, f.name)
+        if f.name in ("moduleReaders", "resourceReaders"):
+            # readers are arbitrary objects; two option sets only match if they
+            # hold the very same reader instances
+            value = tuple(map(id, value or ()))
+        key.append((f.name, _freeze(value)))
+    return tuple(key)
+
+
+class SharedEvaluatorManager:
+    """
+    A lazily started `EvaluatorManager` shared by the whole process, plus a cache
+    of evaluators keyed by evaluator options and project directory.
+
+    The server is shut down after `idle_timeout` seconds without evaluations and
+    started again on the next use. One that dies is restarted, or replaced on the
+    next use if that fails. A forked child never touches its parent's
+    server; it starts its own on first use.
+
+    Args:
+        pkl_command: Command used to start the server.
+        idle_timeout: Seconds without evaluations after which the server is shut
+            down. ``None`` keeps it running until exit.
+        max_evaluators: Number of cached evaluators; the least recently used one
+            is closed when the cache is full.
+    """
+
+    def __init__(
+        self,
+        pkl_command: Optional[List[str]] = None,
+        *,
+        idle_timeout: Optional[float] = 60.0,
+        max_evaluators: int = 32,
+    ):
+        self.pkl_command = pkl_command
+        self.idle_timeout = idle_timeout
+        self.max_evaluators = max_evaluators
+        self._lock = threading.RLock()
+        self._manager: Optional[EvaluatorManager] = None
+        self._evaluators: "OrderedDict[tuple, list]" = OrderedDict()
+        self._in_use = 0
+        self._timer: Optional[threading.Timer] = None
+
+    def _get_manager(self) -> EvaluatorManager:
+        manager = self._manager
+        if manager is not None and manager._broken is not None:
+            # its server died and could not be restarted; start over
+            self._evaluators.clear()
+            self._manager = None
+            manager.close()
+        if self._manager is None:
+            # a server that dies is restarted, with the cached evaluators
+            self._manager = EvaluatorManager(self.pkl_command, restart=True)
+        return self._manager
+
+    def _new_evaluator(
+        self,
+        manager: EvaluatorManager,
+        options: EvaluatorOptions,
+        project_dir: Optional[str],
+    ):
+        project = None
+        if project_dir is not None:
+            with manager.new_evaluator(PreconfiguredOptions()) as project_evaluator:
+                project = load_project_from_evaluator(project_evaluator, project_dir)
+        return manager.new_evaluator(options, project)
+
+    def _borrow(
+        self, options: EvaluatorOptions, project_dir: Optional[str]
+    ) -> Tuple[tuple, list, Optional[EvaluatorManager]]:
+        """Borrow the cache entry for `options` and `project_dir`, adding it if
+        missing. Called with the lock held. Also returns the manager to create
+        the entry's evaluator on when the caller added it, else ``None``."""
+        manager = self._get_manager()  # drops the cached evaluators of a broken one
+        key = (_options_key(options), project_dir)
+        entry = self._evaluators.get(key)
+        if entry is None:
+            # [future evaluator, borrowers, options]; whoever adds the entry
+            # creates the evaluator without the lock, and other borrowers wait
+            # for it. `options` is kept alive so the reader ids in `key` cannot
+            # be reused
+            entry = self._evaluators[key] = [Future(), 0, options]
+        else:
+            manager = None
+        self._evaluators.move_to_end(key)
+        entry[1] += 1
+        self._evict()
+        return key, entry, manager
+
+    def _evict(self):
+        excess = len(self._evaluators) - self.max_evaluators
+        for key, (future, borrowers, _) in list(self._evaluators.items()):
+            if excess <= 0:
+                return
+            # borrowed until created, so it has been created
+            if borrowers == 0:
+                del self._evaluators[key]
+                future.result().close()
+                excess -= 1
+
+    @contextmanager
+    def evaluator(
+        self, options: EvaluatorOptions, project_dir: Optional[str] = None
+    ) -> Iterator[Evaluator]:
+        """
+        Borrow the cached evaluator for `options` (and the project in
+        `project_dir`, if given), creating it if needed.
+
+        The server is not shut down for idleness while an evaluator is borrowed.
+        """
+        if project_dir is not None and not (Path(project_dir) / "PklProject").exists():
+            project_dir = None
+        with self._lock:
+            self._cancel_timer()
+            key, entry, manager = self._borrow(options, project_dir)
+            self._in_use += 1
+        try:
+            future = entry[0]
+            if manager is not None:
+                try:
+                    future.set_result(
+                        self._new_evaluator(manager, options, project_dir)
+                    )
+                except BaseException as e:
+                    future.set_exception(e)
+                    with self._lock:
+                        if self._evaluators.get(key) is entry:
+                            del self._evaluators[key]
+            yield future.result()
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                self._in_use -= 1
+                if self._in_use == 0:
+                    self._start_timer()
+
+    @property
+    def warm_up_seconds(self) -> Optional[float]:
+        """How long the last `warm_up` of the current server took, if any."""
+        manager = self._manager
+        return manager.warm_up_seconds if manager is not None else None
+
+    def warm_up(self, source: Optional[ModuleSource] = None) -> float:
+        """Start the server if needed and warm it up (see `EvaluatorManager.warm_up`)."""
+        with self._lock:
+            self._cancel_timer()
+            manager = self._get_manager()
+            self._in_use += 1
+        try:
+            return manager.warm_up(source)
+        finally:
+            with self._lock:
+                self._in_use -= 1
+                if self._in_use == 0:
+                    self._start_timer()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _start_timer(self):
+        if self.idle_timeout is None:
+            return
+        self._timer = threading.Timer(self.idle_timeout, self._on_idle)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_idle(self):
+        with self._lock:
+            if self._in_use == 0 and self._timer is threading.current_thread():
+                self._timer = None
+                self.close()
+
+    def close(self):
+        """Shut down the server and drop all cached evaluators."""
+        with self._lock:
+            self._cancel_timer()
+            self._evaluators.clear()
+            manager, self._manager = self._manager, None
+        if manager is not None:
+            manager.close()
+
+    def _after_fork_in_child(self):
+        # The server, its reader thread and the timer all belong to the parent.
+        self._lock = threading.RLock()
+        self._manager = None
+        self._evaluators = OrderedDict()
+        self._in_use = 0
+        self._timer = None
+
+
+_shared_manager: Optional[SharedEvaluatorManager] = None
+
+
+def enable_shared_manager(
+    pkl_command: Optional[List[str]] = None,
+    *,
+    idle_timeout: Optional[float] = 60.0,
+    max_evaluators: int = 32,
+    max_servers: Optional[int] = None,
+) -> SharedEvaluatorManager:
+    """
+    Make `pkl.load` and `pkl.loads` evaluate on one process-wide server instead of
+    starting a new one per call.
+
+    Args:
+        pkl_command: Command used to start the server.
+        idle_timeout: Seconds without evaluations after which the server is shut down.
+        max_evaluators: Number of evaluators kept in the cache.
+        max_servers: If given, cap the number of `pkl server` processes this process
+            may run (see `pkl.server.set_max_servers`).
+    """
+    global _shared_manager
+    disable_shared_manager()
+    if max_servers is not None:
+        set_max_servers(max_servers)
+    _shared_manager = SharedEvaluatorManager(
+        pkl_command, idle_timeout=idle_timeout, max_evaluators=max_evaluators
+    )
+    return _shared_manager
+
+
+def disable_shared_manager():
+    """Shut down the process-wide server, if any, and go back to one per call."""
+    global _shared_manager
+    manager, _shared_manager = _shared_manager, None
+    if manager is not None:
+        manager.close()
+
+
+def warm_start(
+    source: Optional[ModuleSource] = None, *, background: bool = True
+) -> "Future[float]":
+    """
+    Start the process-wide server ahead of the first `pkl.load` and warm it up.
+
+    Enables the shared manager with default settings if it isn't already. With
+    `background=True` this returns immediately; the returned future resolves to
+    the warm-up time in seconds.
+
+    Setting the environment variable ``PKL_WARM_START=1`` calls this when `pkl` is
+    imported, warming up with the module at ``PKL_WARM_START_MODULE`` if set.
+    """
+    manager = _shared_manager or enable_shared_manager()
+    future: "Future[float]" = Future()
+
+    def run():
+        try:
+            future.set_result(manager.warm_up(source))
+        except BaseException as e:
+            future.set_exception(e)
+
+    if background:
+        threading.Thread(target=run, name="pkl-warm-start", daemon=True).start()
+    else:
+        run()
+    return future
+
+
+def get_shared_manager() -> Optional[SharedEvaluatorManager]:
+    return _shared_manager
+
+
+def _after_fork_in_child():
+    if _shared_manager is not None:
+        _shared_manager._after_fork_in_child()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
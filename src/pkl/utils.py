@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from pathlib import Path
 from typing import Optional, Union
 from urllib.parse import urlparse
@@ -12,6 +12,45 @@ class PklError(Exception):
     pass
 
 
+class PklServerError(PklError):
+    """The pkl server exited, closed its output, or stopped answering."""
+
+
+def add_slots(cls):
+    """Give a dataclass ``__slots__`` for its fields.
+
+    Same as ``@dataclass(slots=True)``, which needs Python 3.10. Apply it on top
+    of ``@dataclass``; the class is re-created, as the standard library does."""
+    inherited = {
+        slot
+        for base in cls.__mro__[1:-1]
+        for slot in base.__dict__.get("__slots__", ())
+    }
+    names = tuple(f.name for f in fields(cls))
+    namespace = dict(cls.__dict__)
+    for name in names:
+        # defaults live on in the generated __init__
+        namespace.pop(name, None)
+    namespace.pop("__dict__", None)
+    namespace.pop("__weakref__", None)
+    # a slot a base class already has would only take up space
+    namespace["__slots__"] = tuple(name for name in names if name not in inherited)
+    if cls.__dataclass_params__.frozen:
+        # the default __setstate__ can't set the fields of a frozen dataclass
+        namespace["__getstate__"] = _frozen_getstate
+        namespace["__setstate__"] = _frozen_setstate
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+def _frozen_getstate(self):
+    return [getattr(self, f.name) for f in fields(self)]
+
+
+def _frozen_setstate(self, state):
+    for f, value in zip(fields(self), state):
+        object.__setattr__(self, f.name, value)
+
+
 @dataclass
 class ModuleSource:
     uri: str
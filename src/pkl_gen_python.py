@@ -1,10 +1,17 @@
 import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
 import sys
 import tempfile
+import threading
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, Dict, Iterator, List, Optional
 from urllib.parse import ParseResult, urlparse
 
 import pkl
@@ -43,6 +50,12 @@ class GeneratorSettings:
     # If [true], prints the filenames that would be created, but skips writing any files.
     dryRun: Optional[bool] = None
 
+    # If [true], generates classes with `__slots__`, whose instances take less memory.
+    slots: Optional[bool] = None
+
+    # If [true], generates frozen (immutable and hashable) dataclasses.
+    frozen: Optional[bool] = None
+
     # The Generator.pkl script to use for code generation.
     #
     # This is an internal setting that's meant for development purposes.
@@ -58,9 +71,9 @@ class GeneratorSettings:
         return config
 
 
-def python_generator(evaluator, settings: GeneratorSettings, pkl_input_module):
-    output_path = Path(settings.outputPath or ".out")
-
+def generate_files(evaluator, settings: GeneratorSettings, pkl_input_module):
+    """Evaluate the generator for `pkl_input_module`, returning the contents of the
+    files to write, by file name."""
     parsed = urlparse(str(settings.generateScript))
 
     def is_uri(_uri: ParseResult):
@@ -80,13 +93,20 @@ def python_generator(evaluator, settings: GeneratorSettings, pkl_input_module):
 
     moduleToGenerate = theModule\
     """
+    # only when set, so that older Generator.pkl scripts keep working
+    for option in ("slots", "frozen"):
+        if getattr(settings, option):
+            module_to_evaluate += f"\n{option} = true"
 
     with tempfile.NamedTemporaryFile("w+t", suffix=".pkl") as temp_file:
         temp_file.write(module_to_evaluate)
         temp_file.flush()
         source = pkl.ModuleSource.from_path(temp_file.name)
-        files = evaluator.evaluate_output_files(source)
+        return evaluator.evaluate_output_files(source)
+
 
+def write_files(settings: GeneratorSettings, files):
+    output_path = Path(settings.outputPath or ".out")
     for filename, contents in files.items():
         fp = output_path / filename
         print(fp.absolute())
@@ -98,6 +118,306 @@ def python_generator(evaluator, settings: GeneratorSettings, pkl_input_module):
             file.write(contents)
 
 
+def python_generator(evaluator, settings: GeneratorSettings, pkl_input_module):
+    files = generate_files(evaluator, settings, pkl_input_module)
+    write_files(settings, files)
+    return files
+
+
+def run_generator(
+    settings: GeneratorSettings,
+    new_evaluator,
+    jobs: int = 1,
+    on_generated: Optional[Callable[[str, Dict[str, str]], None]] = None,
+) -> Dict[str, Dict[str, str]]:
+    """Generate code for every input of `settings`, returning the files generated
+    for each input. `on_generated(input, files)` is called once an input's files
+    are written, so they are known even if a later input fails.
+
+    With `jobs` > 1, that many inputs are evaluated at once, each thread calling
+    `new_evaluator()` once for the evaluator it uses. The files are still written in input order, so
+    the output is the same as with one job, and the first input (in that order) that
+    fails to generate is the one reported.
+    """
+    inputs = settings.inputs or []
+    generated = {}
+    if jobs <= 1 or len(inputs) <= 1:
+        for pkl_input_module in inputs:
+            try:
+                files = python_generator(new_evaluator(), settings, pkl_input_module)
+            except pkl.PklError as e:
+                _report_failure(pkl_input_module, e)
+            generated[pkl_input_module] = files
+            if on_generated is not None:
+                on_generated(pkl_input_module, files)
+        return generated
+
+    local = threading.local()
+
+    def generate(pkl_input_module):
+        evaluator = getattr(local, "evaluator", None)
+        if evaluator is None:
+            evaluator = local.evaluator = new_evaluator()
+        return generate_files(evaluator, settings, pkl_input_module)
+
+    with ThreadPoolExecutor(max_workers=min(jobs, len(inputs))) as executor:
+        futures = [executor.submit(generate, module) for module in inputs]
+        for pkl_input_module, future in zip(inputs, futures):
+            try:
+                files = future.result()
+            except pkl.PklError as e:
+                for pending in futures:
+                    pending.cancel()
+                _report_failure(pkl_input_module, e)
+            write_files(settings, files)
+            generated[pkl_input_module] = files
+            if on_generated is not None:
+                on_generated(pkl_input_module, files)
+    return generated
+
+
+def _report_failure(pkl_input_module, error):
+    warnings.warn(f"Failed to generate: {pkl_input_module}")
+    warnings.warn(str(error))
+    sys.exit(1)
+
+
+MANIFEST_NAME = ".pkl-gen-python.json"
+_MANIFEST_VERSION = 1
+
+# the modules a module refers to; `import*` takes a glob pattern
+_MODULE_REFERENCE = re.compile(r'\b(import\*?|amends|extends)\s+"((?:[^"\\]|\\.)*)"')
+_URI_SCHEME = re.compile(r"[A-Za-z][A-Za-z0-9+.-]*:")
+
+
+def _referenced_paths(path: Path, text: str) -> Iterator[Path]:
+    """The local files that the Pkl module at `path` imports, amends or extends.
+
+    Modules from elsewhere (``pkl:``, ``package:``, ``https:``, project
+    dependencies, ...) are left out; they change with the pkl version or the
+    PklProject files, which are hashed separately.
+    """
+    for keyword, uri in _MODULE_REFERENCE.findall(text):
+        if uri.startswith("file:"):
+            yield Path(urlparse(uri).path)
+        elif _URI_SCHEME.match(uri) or uri.startswith("@"):
+            continue
+        elif keyword == "import*":
+            yield from sorted(path.parent.glob(uri))
+        elif uri.startswith(".../"):
+            # the first match in an ancestor directory
+            for directory in path.parent.parents:
+                if (directory / uri[4:]).exists():
+                    yield directory / uri[4:]
+                    break
+        else:
+            yield path.parent / uri
+
+
+def module_hashes(path: Path) -> Dict[str, Optional[str]]:
+    """Content hashes of the Pkl module at `path` and of the local modules it
+    refers to, transitively, by path (``None`` for files that don't exist)."""
+    hashes: Dict[str, Optional[str]] = {}
+    stack = [Path(path).absolute()]
+    while stack:
+        current = stack.pop()
+        key = os.path.normpath(current)
+        if key in hashes:
+            continue
+        try:
+            data = current.read_bytes()
+        except OSError:
+            hashes[key] = None
+            continue
+        hashes[key] = hashlib.sha256(data).hexdigest()
+        stack.extend(_referenced_paths(current, data.decode("utf-8", "replace")))
+    return hashes
+
+
+def _project_files(path: Path) -> Iterator[Path]:
+    # the nearest PklProject decides what `@dependency` imports resolve to
+    for directory in Path(path).absolute().parents:
+        if (directory / "PklProject").exists():
+            yield directory / "PklProject"
+            yield directory / "PklProject.deps.json"
+            return
+
+
+def pkl_version() -> Optional[str]:
+    """``pkl --version`` of the pkl binary the generator runs, if there is one."""
+    from pkl.binary_manager import BinaryManager
+
+    binary = BinaryManager(download_binary=False).binary_path
+    if binary is None:
+        return None
+    try:
+        result = subprocess.run(
+            [str(binary), "--version"], capture_output=True, text=True, timeout=60
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+class Manifest:
+    """What each input module was last generated from and into, kept in the output
+    directory so that reruns can skip inputs that haven't changed.
+
+    An input is up to date when its key (see `key`) is the one recorded and the
+    files generated for it are still as they were written.
+    """
+
+    def __init__(self, path: Path, inputs: Optional[Dict[str, dict]] = None):
+        self.path = path
+        self.inputs: Dict[str, dict] = inputs or {}
+
+    @classmethod
+    def load(cls, output_path: Path) -> "Manifest":
+        path = Path(output_path) / MANIFEST_NAME
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return cls(path)
+        if not isinstance(data, dict) or data.get("version") != _MANIFEST_VERSION:
+            return cls(path)
+        return cls(path, data.get("inputs") or {})
+
+    @staticmethod
+    def key(
+        settings: GeneratorSettings, pkl_input_module, version: Optional[str]
+    ) -> str:
+        """A hash of everything the code generated for `pkl_input_module` depends
+        on: the module and the local modules it refers to, its PklProject, the
+        generator script, the settings that change the output and the versions of
+        pkl and pkl-python."""
+        hashes = module_hashes(Path(pkl_input_module))
+        for project_file in _project_files(Path(pkl_input_module)):
+            hashes.update(module_hashes(project_file))
+        script = str(settings.generateScript)
+        if not _URI_SCHEME.match(script) or script.startswith("file:"):
+            hashes.update(module_hashes(Path(urlparse(script).path)))
+        identity = {
+            "modules": hashes,
+            "generateScript": script,
+            "slots": bool(settings.slots),
+            "frozen": bool(settings.frozen),
+            "pkl": version,
+            "pkl-python": pkl.__version__,
+        }
+        encoded = json.dumps(identity, sort_keys=True).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def is_up_to_date(self, pkl_input_module, key: str) -> bool:
+        entry = self.inputs.get(_input_key(pkl_input_module))
+        if entry is None or entry.get("key") != key:
+            return False
+        output_path = self.path.parent
+        for filename, digest in entry.get("files", {}).items():
+            try:
+                data = (output_path / filename).read_bytes()
+            except OSError:
+                return False
+            if hashlib.sha256(data).hexdigest() != digest:
+                return False
+        return True
+
+    def record(self, pkl_input_module, key: str, files: Dict[str, str]) -> List[Path]:
+        """Record the `files` generated for `pkl_input_module`, deleting the ones it
+        generated before but no longer does (unless another input generates them).
+        Returns the deleted files."""
+        name = _input_key(pkl_input_module)
+        previous = set(self.inputs.get(name, {}).get("files", {}))
+        self.inputs[name] = {
+            "key": key,
+            "files": {
+                filename: hashlib.sha256(contents.encode("utf-8")).hexdigest()
+                for filename, contents in files.items()
+            },
+        }
+        return self._delete_unclaimed(previous)
+
+    def prune(self, pkl_input_modules) -> List[Path]:
+        """Forget the inputs other than `pkl_input_modules`, deleting the files they
+        generated (unless a remaining input generates them). Returns the deleted
+        files."""
+        keep = set(map(_input_key, pkl_input_modules))
+        previous = set()
+        for name in set(self.inputs) - keep:
+            previous.update(self.inputs.pop(name).get("files", {}))
+        return self._delete_unclaimed(previous)
+
+    def _delete_unclaimed(self, filenames) -> List[Path]:
+        claimed = {
+            filename for entry in self.inputs.values() for filename in entry["files"]
+        }
+        deleted = []
+        for filename in sorted(set(filenames) - claimed):
+            stale = self.path.parent / filename
+            try:
+                stale.unlink()
+            except FileNotFoundError:
+                continue
+            deleted.append(stale)
+        return deleted
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"version": _MANIFEST_VERSION, "inputs": self.inputs}
+        # written whole, so an interrupted run leaves the previous manifest
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        temp_path.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n")
+        os.replace(temp_path, self.path)
+
+
+def _input_key(pkl_input_module) -> str:
+    return str(Path(pkl_input_module).absolute())
+
+
+def generate_incrementally(
+    settings: GeneratorSettings, generate, force: bool = False, prune: bool = False
+) -> Dict[str, Dict[str, str]]:
+    """Run `generate` on the inputs of `settings` that changed since the last run,
+    as recorded in the `Manifest` in the output directory, recording what they
+    generate and deleting the files they no longer generate. `generate` isn't
+    called when nothing changed.
+
+    `generate(settings, on_generated)` must call `on_generated(input, files)` for
+    each input it generated, as `run_generator` does. The manifest is saved even
+    if `generate` fails, with the inputs generated until then.
+
+    With `force`, or in a dry run, every input is generated. With `prune`, the
+    inputs of `settings` are all there are: files of inputs no longer among them
+    are deleted too.
+    """
+    inputs = settings.inputs or []
+    if settings.dryRun:
+        return generate(settings, None) if inputs else {}
+    manifest = Manifest.load(Path(settings.outputPath or ".out"))
+    version = pkl_version()
+    keys = {module: manifest.key(settings, module, version) for module in inputs}
+
+    def report(deleted: List[Path]):
+        for stale in deleted:
+            print(f"Deleted {stale.absolute()}", file=sys.stderr)
+
+    def on_generated(module, files):
+        report(manifest.record(module, keys[module], files))
+
+    try:
+        if prune:
+            report(manifest.prune(inputs))
+        if not force:
+            inputs = [m for m in inputs if not manifest.is_up_to_date(m, keys[m])]
+            skipped = len(keys) - len(inputs)
+            if skipped:
+                print(f"Skipping {skipped} unchanged input module(s)", file=sys.stderr)
+        if not inputs:
+            return {}
+        return generate(replace(settings, inputs=inputs), on_generated)
+    finally:
+        manifest.save()
+
+
 def get_generator_settings_file(generator_settings_fp):
     if generator_settings_fp is not None:
         return generator_settings_fp
@@ -124,6 +444,10 @@ def build_generator_settings(args):
         generator_settings = replace(generator_settings, outputPath=args.output_path)
 
     generator_settings = replace(generator_settings, dryRun=args.dry_run)
+    if args.slots:
+        generator_settings = replace(generator_settings, slots=True)
+    if args.frozen:
+        generator_settings = replace(generator_settings, frozen=True)
 
     if generator_settings.generateScript is None:
         VERSION = pkl.__version__
@@ -149,6 +473,29 @@ def main():
         action="store_true",
         help="Print the names of the files that will be generated, but don't write any files",
     )
+    parser.add_argument(
+        "--slots",
+        action="store_true",
+        help="Generate classes with __slots__",
+    )
+    parser.add_argument(
+        "--frozen",
+        action="store_true",
+        help="Generate frozen dataclasses",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Generate this many input modules at once, on as many pkl servers "
+        "(0: one per CPU)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Regenerate every input module, even those unchanged since the last run",
+    )
     parser.add_argument(
         "--version", action="store_true", help="Print the version and exit"
     )
@@ -173,15 +520,31 @@ def main():
     if generator_settings.dryRun:
         print("Running in dry-run mode", file=sys.stderr)
 
-    with pkl.EvaluatorManager() as manager:
-        for pkl_input_module in generator_settings.inputs or []:
-            evaluator = manager.new_evaluator(pkl.PreconfiguredOptions())
-            try:
-                python_generator(evaluator, generator_settings, pkl_input_module)
-            except pkl.PklError as e:
-                warnings.warn(f"Failed to generate: {pkl_input_module}")
-                warnings.warn(str(e))
-                sys.exit(1)
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+
+    def generate(settings: GeneratorSettings, on_generated):
+        n = min(jobs, len(settings.inputs or []))
+        if n > 1:
+            with pkl.PKLServerPool(min_servers=n, max_servers=n) as pool:
+                # one evaluator for all threads: it exists on every server, and
+                # each evaluation goes to the least-loaded one
+                evaluator = pool.new_evaluator(pkl.PreconfiguredOptions())
+                return run_generator(settings, lambda: evaluator, n, on_generated)
+        with pkl.EvaluatorManager() as manager:
+            return run_generator(
+                settings,
+                lambda: manager.new_evaluator(pkl.PreconfiguredOptions()),
+                on_generated=on_generated,
+            )
+
+    # inputs from the settings file are all there are; given on the command
+    # line, they may be only some of them
+    generate_incrementally(
+        generator_settings,
+        generate,
+        force=args.force,
+        prune=not args.pkl_input_modules,
+    )
 
 
 if __name__ == "__main__":
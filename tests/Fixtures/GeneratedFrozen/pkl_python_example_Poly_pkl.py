@@ -0,0 +1,92 @@
+# Code generated from Pkl module `pkl.python.example.Poly`. DO NOT EDIT.
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Mapping, Optional, Tuple
+
+import pkl
+
+from . import pkl_python_lib1_pkl
+
+
+@pkl.add_slots
+@dataclass(frozen=True)
+class Bird(pkl_python_lib1_pkl.Being):
+    name: str
+
+    flies: bool
+
+    _registered_identifier = "pkl.python.example.Poly#Bird"
+
+    @classmethod
+    def _from_pkl(cls, members):
+        self = object.__new__(cls)
+        _set = object.__setattr__
+        _set(self, "exists", members["exists"])
+        _set(self, "name", members["name"])
+        _set(self, "flies", members["flies"])
+        return self
+
+
+@pkl.add_slots
+@dataclass(frozen=True)
+class Animal(pkl_python_lib1_pkl.Being):
+    name: str
+
+    _registered_identifier = "pkl.python.example.Poly#Animal"
+
+    @classmethod
+    def _from_pkl(cls, members):
+        self = object.__new__(cls)
+        _set = object.__setattr__
+        _set(self, "exists", members["exists"])
+        _set(self, "name", members["name"])
+        return self
+
+
+@pkl.add_slots
+@dataclass(frozen=True)
+class Dog(Animal):
+    barks: bool
+
+    hates: Optional[Animal]
+
+    _registered_identifier = "pkl.python.example.Poly#Dog"
+
+    @classmethod
+    def _from_pkl(cls, members):
+        self = object.__new__(cls)
+        _set = object.__setattr__
+        _set(self, "exists", members["exists"])
+        _set(self, "name", members["name"])
+        _set(self, "barks", members["barks"])
+        _set(self, "hates", members["hates"])
+        return self
+
+
+@pkl.add_slots
+@dataclass(frozen=True)
+class Poly:
+    beings: Tuple[pkl_python_lib1_pkl.Being, ...]
+
+    rex: Dog
+
+    moreBeings: Mapping[str, pkl_python_lib1_pkl.Being]
+
+    _registered_identifier = "pkl.python.example.Poly"
+
+    @classmethod
+    def _from_pkl(cls, members):
+        self = object.__new__(cls)
+        _set = object.__setattr__
+        _set(self, "beings", members["beings"])
+        _set(self, "rex", members["rex"])
+        _set(self, "moreBeings", members["moreBeings"])
+        return self
+
+    @classmethod
+    def load_pkl(cls, source):
+        # Load the Pkl module at the given source and evaluate it into `pkl_python_example_Poly.Module`.
+        # - Parameter source: The source of the Pkl module.
+        config = pkl.load(source, parser=pkl.Parser(namespace=globals(), frozen=True))
+        return config
@@ -0,0 +1,88 @@
+# Code generated from Pkl module `pkl.python.example.Poly`. DO NOT EDIT.
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import pkl
+
+from . import pkl_python_lib1_pkl
+
+
+@pkl.add_slots
+@dataclass
+class Bird(pkl_python_lib1_pkl.Being):
+    name: str
+
+    flies: bool
+
+    _registered_identifier = "pkl.python.example.Poly#Bird"
+
+    @classmethod
+    def _from_pkl(cls, members):
+        self = object.__new__(cls)
+        self.exists = members["exists"]
+        self.name = members["name"]
+        self.flies = members["flies"]
+        return self
+
+
+@pkl.add_slots
+@dataclass
+class Animal(pkl_python_lib1_pkl.Being):
+    name: str
+
+    _registered_identifier = "pkl.python.example.Poly#Animal"
+
+    @classmethod
+    def _from_pkl(cls, members):
+        self = object.__new__(cls)
+        self.exists = members["exists"]
+        self.name = members["name"]
+        return self
+
+
+@pkl.add_slots
+@dataclass
+class Dog(Animal):
+    barks: bool
+
+    hates: Optional[Animal]
+
+    _registered_identifier = "pkl.python.example.Poly#Dog"
+
+    @classmethod
+    def _from_pkl(cls, members):
+        self = object.__new__(cls)
+        self.exists = members["exists"]
+        self.name = members["name"]
+        self.barks = members["barks"]
+        self.hates = members["hates"]
+        return self
+
+
+@pkl.add_slots
+@dataclass
+class Poly:
+    beings: List[pkl_python_lib1_pkl.Being]
+
+    rex: Dog
+
+    moreBeings: Dict[str, pkl_python_lib1_pkl.Being]
+
+    _registered_identifier = "pkl.python.example.Poly"
+
+    @classmethod
+    def _from_pkl(cls, members):
+        self = object.__new__(cls)
+        self.beings = members["beings"]
+        self.rex = members["rex"]
+        self.moreBeings = members["moreBeings"]
+        return self
+
+    @classmethod
+    def load_pkl(cls, source):
+        # Load the Pkl module at the given source and evaluate it into `pkl_python_example_Poly.Module`.
+        # - Parameter source: The source of the Pkl module.
+        config = pkl.load(source, parser=pkl.Parser(namespace=globals()))
+        return config
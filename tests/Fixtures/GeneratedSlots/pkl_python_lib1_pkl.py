@@ -0,0 +1,38 @@
+# Code generated from Pkl module `pkl.python.lib1`. DO NOT EDIT.
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import pkl
+
+
+@pkl.add_slots
+@dataclass
+class Being:
+    exists: bool
+
+    _registered_identifier = "pkl.python.lib1#Being"
+
+    @classmethod
+    def _from_pkl(cls, members):
+        self = object.__new__(cls)
+        self.exists = members["exists"]
+        return self
+
+
+@pkl.add_slots
+@dataclass
+class lib1:
+    _registered_identifier = "pkl.python.lib1"
+
+    @classmethod
+    def _from_pkl(cls, members):
+        self = object.__new__(cls)
+        return self
+
+    @classmethod
+    def load_pkl(cls, source):
+        # Load the Pkl module at the given source and evaluate it into `pkl_python_lib1.Module`.
+        # - Parameter source: The source of the Pkl module.
+        config = pkl.load(source, parser=pkl.Parser(namespace=globals()))
+        return config
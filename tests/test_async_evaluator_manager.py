@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+
+from pkl import (
+    AsyncEvaluator,
+    AsyncEvaluatorManager,
+    ModuleSource,
+    PreconfiguredOptions,
+)
+
+
+def test_async_manager():
+    async def main():
+        async with AsyncEvaluatorManager() as manager:
+            evaluator = await manager.new_evaluator(PreconfiguredOptions())
+            source = ModuleSource.from_path("./tests/pkls/types.pkl")
+            return await evaluator.evaluate_module(source)
+
+    _ = asyncio.run(main())
+
+
+def test_async_concurrent():
+    async def main():
+        async with AsyncEvaluatorManager() as manager:
+            evaluator = await manager.new_evaluator(PreconfiguredOptions())
+            sources = [ModuleSource.from_text(f"a: Int = {i}") for i in range(10)]
+            return await asyncio.gather(*map(evaluator.evaluate_module, sources))
+
+    configs = asyncio.run(main())
+    assert [c.a for c in configs] == list(range(10))
+
+
+def test_async_evaluator_sync_with():
+    evaluator = AsyncEvaluator(1, 0, AsyncEvaluatorManager())
+    with pytest.raises(TypeError, match="async with"):
+        with evaluator:
+            pass
+    assert not evaluator.closed
@@ -0,0 +1,77 @@
+import msgpack
+import pytest
+
+from pkl import DataSize, Duration
+from pkl.columnar import DATASIZE, DURATION, VALUES, decode_columns
+
+
+def row(i, **extra):
+    members = [
+        [0x10, "name", f"host{i}"],
+        [0x10, "port", 8000 + i],
+        [0x10, "timeout", [0x07, 1.5, "s"]],
+        [0x10, "memory", [0x08, 2, "kib"]],
+        [0x10, "tags", [0x05, ["a", "b"]]],
+    ]
+    members += [[0x10, k, v] for k, v in extra.items()]
+    return [0x01, "Server", "file:///servers.pkl", members]
+
+
+def listing(*rows):
+    return msgpack.packb([0x05, list(rows)])
+
+
+def test_decode_columns():
+    columns = decode_columns(listing(row(0), row(1, weight=2), row(2)))
+    assert columns.rows == 3
+    assert list(columns.data) == ["name", "port", "timeout", "memory", "tags", "weight"]
+    assert columns.data["port"] == [8000, 8001, 8002]
+    assert columns.data["weight"] == [None, 2, None]
+    assert columns.data["timeout"] == [1.5e9] * 3
+    assert columns.data["memory"] == [2048] * 3
+    assert columns.data["tags"] == [["a", "b"]] * 3
+    assert columns.kinds["timeout"] == DURATION
+    assert columns.kinds["memory"] == DATASIZE
+    assert columns.kinds["weight"] == VALUES
+
+
+def test_decode_columns_mixed():
+    columns = decode_columns(
+        listing(row(0, limit=[0x07, 1, "s"]), row(1, limit=[0x08, 1, "b"]), row(2))
+    )
+    assert columns.kinds["limit"] == VALUES
+    assert columns.data["limit"] == [
+        Duration(1e9, "ns"),
+        DataSize(1, "b"),
+        None,
+    ]
+
+
+def test_decode_columns_rejects_other_values():
+    with pytest.raises(ValueError):
+        decode_columns(msgpack.packb([0x05, [1, 2]]))
+    with pytest.raises(ValueError):
+        decode_columns(msgpack.packb(row(0)))
+
+
+def test_to_dataframe():
+    pd = pytest.importorskip("pandas")
+    from pkl.columnar import to_dataframe
+
+    df = to_dataframe(listing(row(0), row(1, weight=2)))
+    assert list(df.columns) == ["name", "port", "timeout", "memory", "tags", "weight"]
+    assert df["timeout"].dtype == "timedelta64[ns]"
+    assert df["timeout"][0] == pd.Timedelta(seconds=1.5)
+    assert df["memory"].dtype == "Int64"
+    assert df["port"].tolist() == [8000, 8001]
+
+
+def test_to_arrow():
+    pa = pytest.importorskip("pyarrow")
+    from pkl.columnar import to_arrow
+
+    table = to_arrow(listing(row(0), row(1)))
+    assert table.num_rows == 2
+    assert table.schema.field("timeout").type == pa.duration("ns")
+    assert table.schema.field("memory").type == pa.int64()
+    assert table.column("tags").to_pylist() == [["a", "b"], ["a", "b"]]
@@ -1,4 +1,19 @@
-from pkl import EvaluatorManager, EvaluatorOptions, ModuleSource, PreconfiguredOptions
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pkl import (
+    EvaluatorManager,
+    EvaluatorOptions,
+    ModuleSource,
+    PklServerError,
+    PreconfiguredOptions,
+    RecyclePolicy,
+)
+from pkl.msgapi import EvaluateRequest
 
 
 def test_manager():
@@ -12,3 +27,92 @@ def test_multiple():
         evaluator = manager.new_evaluator(opts)
         source = ModuleSource.from_path("./tests/pkls/with_log.pkl")
         evaluator.evaluate_module(source)
+
+
+def test_threads_share_manager():
+    with EvaluatorManager() as manager:
+        evaluator = manager.new_evaluator(PreconfiguredOptions())
+        sources = [ModuleSource.from_text(f"a: Int = {i}") for i in range(10)]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            configs = list(executor.map(evaluator.evaluate_module, sources))
+    assert [c.a for c in configs] == list(range(10))
+
+
+def test_warm_up():
+    with EvaluatorManager() as manager:
+        elapsed = manager.warm_up()
+        assert elapsed > 0
+        assert manager.warm_up_seconds == elapsed
+
+
+def test_restart_after_crash():
+    with EvaluatorManager(restart=True) as manager:
+        evaluator = manager.new_evaluator(PreconfiguredOptions())
+        manager._server.process.kill()
+        config = evaluator.evaluate_module(ModuleSource.from_text("a: Int = 1 + 1"))
+        assert config.a == 2
+        assert manager.restarts == 1
+
+
+def test_close_during_restart():
+    manager = EvaluatorManager(restart=True)
+    manager.new_evaluator(PreconfiguredOptions())
+    start_server = manager._start_server
+    starting = threading.Event()
+
+    def slow_start():
+        starting.set()
+        time.sleep(0.5)
+        return start_server()
+
+    manager._start_server = slow_start
+    manager._server.process.kill()
+    assert starting.wait(10)
+    closer = threading.Thread(target=manager.close)
+    closer.start()
+    closer.join(10)
+    assert not closer.is_alive()
+    assert not manager._reader.is_alive()
+
+
+def test_crash_without_restart():
+    with EvaluatorManager() as manager:
+        evaluator = manager.new_evaluator(PreconfiguredOptions())
+        manager._server.process.kill()
+        with pytest.raises(PklServerError):
+            evaluator.evaluate_module(ModuleSource.from_text("a: Int = 1 + 1"))
+
+
+def test_timeout_without_restart():
+    hung = [sys.executable, "-c", "import time; time.sleep(30)"]
+    with EvaluatorManager(hung, request_timeout=0.2) as manager:
+        with pytest.raises(PklServerError, match="did not answer"):
+            manager.new_evaluator(PreconfiguredOptions())
+        # no second wait for the timeout
+        start = time.monotonic()
+        with pytest.raises(PklServerError, match="gone"):
+            manager.new_evaluator(PreconfiguredOptions())
+        assert time.monotonic() - start < 0.2
+
+
+def test_recycle():
+    policy = RecyclePolicy(max_evaluations=2)
+    with EvaluatorManager(recycle=policy) as manager:
+        evaluator = manager.new_evaluator(PreconfiguredOptions())
+        for i in range(5):
+            config = evaluator.evaluate_module(ModuleSource.from_text(f"a = {i}"))
+            assert config.a == i
+        assert manager.restarts == 2
+
+
+def test_send_receive_deprecated():
+    with EvaluatorManager() as manager:
+        evaluator = manager.new_evaluator(PreconfiguredOptions())
+        request = EvaluateRequest(
+            manager._next_requestId(), evaluator.evaluatorId, "repl:text", "a = 1"
+        )
+        manager.send(request)
+        with pytest.warns(DeprecationWarning):
+            response = manager.receive(request.requestId)
+        assert response.requestId == request.requestId
+        assert response.error is None
@@ -0,0 +1,163 @@
+import re
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+import pkl
+from pkl_gen_python import (
+    GeneratorSettings,
+    generate_incrementally,
+    module_hashes,
+    run_generator,
+)
+
+
+class FakeEvaluator:
+    """Renders one file per input module, slower for earlier inputs."""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.threads = set()
+
+    def evaluate_output_files(self, source):
+        self.threads.add(threading.get_ident())
+        text = Path(source.uri[len("file://") :]).read_text()
+        name = Path(re.search(r'import "(.*)" as theModule', text).group(1)).stem
+        time.sleep(self.delays.get(name, 0))
+        if name.startswith("bad"):
+            raise pkl.PklError(f"cannot generate {name}")
+        return {"shared_pkl.py": name, f"{name}_pkl.py": name}
+
+
+def settings(tmp_path, *names):
+    return GeneratorSettings(
+        inputs=[str(tmp_path / f"{name}.pkl") for name in names],
+        outputPath=str(tmp_path / "out"),
+        generateScript=str(tmp_path / "Generator.pkl"),
+    )
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_run_generator(tmp_path, capsys, jobs):
+    evaluator = FakeEvaluator({"a": 0.2, "b": 0.1})
+    run_generator(settings(tmp_path, "a", "b", "c"), lambda: evaluator, jobs)
+    out = tmp_path / "out"
+    # files are written in input order, whichever input is generated first
+    names = ["shared", "a", "shared", "b", "shared", "c"]
+    assert capsys.readouterr().out.split() == [
+        str(out / f"{name}_pkl.py") for name in names
+    ]
+    assert (out / "shared_pkl.py").read_text() == "c"
+    assert len(evaluator.threads) == min(jobs, 3)
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_run_generator_failure(tmp_path, jobs):
+    # bad2 fails first, but bad1 comes first
+    evaluator = FakeEvaluator({"bad1": 0.2})
+    with pytest.warns(UserWarning, match="bad1.pkl"):
+        with pytest.raises(SystemExit):
+            run_generator(
+                settings(tmp_path, "a", "bad1", "bad2"), lambda: evaluator, jobs
+            )
+    assert (tmp_path / "out" / "a_pkl.py").exists()
+
+
+def test_module_hashes(tmp_path):
+    (tmp_path / "lib").mkdir()
+    (tmp_path / "lib" / "a.pkl").write_text('import "pkl:math"\nimport "../b.pkl"')
+    (tmp_path / "lib" / "c.pkl").write_text("")
+    (tmp_path / "b.pkl").write_text('import "package://example.com/x@1#/x.pkl"')
+    (tmp_path / "main.pkl").write_text(
+        'amends "lib/a.pkl"\nimport* "lib/*.pkl" as libs\nimport "@dep/d.pkl"'
+    )
+    hashes = module_hashes(tmp_path / "main.pkl")
+    names = {str(Path(path).relative_to(tmp_path)) for path in hashes}
+    assert names == {"main.pkl", "lib/a.pkl", "lib/c.pkl", "b.pkl"}
+
+
+def test_generate_incrementally(tmp_path):
+    """Each fake input generates the files named on its `// file` lines."""
+
+    class Evaluator:
+        def evaluate_output_files(self, source):
+            text = Path(source.uri[len("file://") :]).read_text()
+            path = Path(re.search(r'import "(.*)" as theModule', text).group(1))
+            lines = path.read_text().splitlines()
+            return {
+                line[8:]: path.stem for line in lines if line.startswith("// file ")
+            }
+
+    generated = []
+
+    def generate(settings, on_generated):
+        generated.append([Path(m).stem for m in settings.inputs])
+        return run_generator(settings, Evaluator, on_generated=on_generated)
+
+    (tmp_path / "lib.pkl").write_text("// file lib_pkl.py")
+    (tmp_path / "a.pkl").write_text('import "lib.pkl"\n// file a_pkl.py')
+    (tmp_path / "b.pkl").write_text("// file b_pkl.py")
+    s = settings(tmp_path, "a", "b")
+    out = tmp_path / "out"
+
+    generate_incrementally(s, generate)
+    generate_incrementally(s, generate)
+    assert generated == [["a", "b"]]
+    assert sorted(path.name for path in out.iterdir()) == [
+        ".pkl-gen-python.json",
+        "a_pkl.py",
+        "b_pkl.py",
+    ]
+
+    # a local import changes
+    (tmp_path / "lib.pkl").write_text("// changed")
+    generate_incrementally(s, generate)
+    assert generated[-1] == ["a"]
+
+    # an output is edited, or an input generates other files
+    (out / "b_pkl.py").write_text("edited")
+    (tmp_path / "a.pkl").write_text('import "lib.pkl"\n// file a2_pkl.py')
+    generate_incrementally(s, generate)
+    assert generated[-1] == ["a", "b"]
+    assert (out / "b_pkl.py").read_text() == "b"
+    assert not (out / "a_pkl.py").exists() and (out / "a2_pkl.py").exists()
+
+    # a file that another input also generates is kept
+    (tmp_path / "b.pkl").write_text("// file b_pkl.py\n// file a2_pkl.py")
+    generate_incrementally(s, generate)
+    (tmp_path / "b.pkl").write_text("// file b_pkl.py")
+    generate_incrementally(s, generate)
+    assert (out / "a2_pkl.py").exists()
+
+    generate_incrementally(s, generate, force=True)
+    assert generated[-1] == ["a", "b"]
+
+    # an input that is no longer configured
+    generate_incrementally(settings(tmp_path, "a"), generate)
+    assert (out / "b_pkl.py").exists()
+    generate_incrementally(settings(tmp_path, "a"), generate, prune=True)
+    assert not (out / "b_pkl.py").exists() and (out / "a2_pkl.py").exists()
+    generate_incrementally(s, generate)
+    assert generated[-1] == ["b"]
+
+
+def test_generate_incrementally_failure(tmp_path):
+    (tmp_path / "a.pkl").write_text("")
+    (tmp_path / "bad.pkl").write_text("")
+    generated = []
+
+    def generate(settings, on_generated):
+        generated.append([Path(m).stem for m in settings.inputs])
+        return run_generator(settings, lambda: FakeEvaluator({}), 1, on_generated)
+
+    s = settings(tmp_path, "a", "bad")
+    with pytest.warns(UserWarning, match="bad.pkl"):
+        with pytest.raises(SystemExit):
+            generate_incrementally(s, generate)
+    # what was generated before the failure is recorded
+    with pytest.warns(UserWarning, match="bad.pkl"):
+        with pytest.raises(SystemExit):
+            generate_incrementally(s, generate)
+    assert generated == [["a", "bad"], ["bad"]]
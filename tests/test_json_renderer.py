@@ -0,0 +1,96 @@
+import json
+
+import msgpack
+import pytest
+
+from pkl import JsonRenderer, Parser
+
+
+def module(*members):
+    return msgpack.packb([1, "M", "file:///m.pkl", list(members)])
+
+
+def prop(name, value):
+    return [0x10, name, value]
+
+
+def test_render():
+    data = module(
+        prop("name", "é"),
+        prop("ports", [5, [80, 443]]),
+        prop("server", [1, "Server", "file:///m.pkl", [prop("timeout", [7, 5, "s"])]]),
+        prop("labels", [3, {"env": "prod", 1: [6, ["a"]]}]),
+        prop("hosts", [1, "Dynamic", "pkl:base", [[0x12, 0, "a"], [0x12, 1, "b"]]]),
+        prop("empty", [1, "Dynamic", "pkl:base", []]),
+        prop("pair", [9, 1, [1, "Dynamic", "pkl:base", [prop("x", 1.5)]]]),
+        prop("mixed", [4, [1, [2, {"a": True}], b"\x00"]]),
+        prop("size", [8, 2, "kib"]),
+        prop("seq", [10, 1, 5, 2]),
+        prop("re", [11, "a+"]),
+        prop("cls", [12]),
+    )
+    assert json.loads(JsonRenderer().render(data)) == {
+        "name": "é",
+        "ports": [80, 443],
+        "server": {"timeout": {"value": 5, "unit": "s"}},
+        "labels": {"env": "prod", "1": ["a"]},
+        "hosts": ["a", "b"],
+        "empty": {},
+        "pair": {"first": 1, "second": {"x": 1.5}},
+        "mixed": [1, {"a": True}, "AA=="],
+        "size": {"value": 2, "unit": "kib"},
+        "seq": {"start": 1, "end": 5, "step": 2},
+        "re": {"pattern": "a+"},
+        "cls": None,
+    }
+
+    renderer = JsonRenderer(
+        duration="seconds",
+        datasize="bytes",
+        pair="array",
+        intseq="array",
+        regex="string",
+        ensure_ascii=True,
+    )
+    rendered = renderer.render(data)
+    assert rendered.isascii()
+    result = json.loads(rendered)
+    assert result["server"]["timeout"] == 5.0
+    assert result["size"] == 2048
+    assert result["pair"] == [1, {"x": 1.5}]
+    assert result["seq"] == [1, 3, 5]
+    assert result["re"] == "a+"
+
+    renderer = JsonRenderer(duration=lambda d: str(d.to_timedelta()))
+    assert json.loads(renderer.render(data))["server"]["timeout"] == "0:00:05"
+
+
+def test_render_matches_parser():
+    people = [
+        [1, "Person", "file:///p.pkl", [prop("name", f"p{i}"), prop("age", i)]]
+        for i in range(3)
+    ]
+    data = module(prop("people", [5, people]))
+    expected = {"people": [{"name": f"p{i}", "age": i} for i in range(3)]}
+    assert json.loads(JsonRenderer().render(data)) == expected
+    rendered = json.dumps(
+        {"people": [vars(p) for p in Parser().parse_bytes(data).people]},
+        separators=(",", ":"),
+    )
+    assert JsonRenderer().render(data) == rendered.encode()
+
+
+def test_render_to_chunks():
+    items = [[1, "Item", "file:///i.pkl", [prop("id", i)]] for i in range(5000)]
+    chunks = []
+    JsonRenderer().render_to(msgpack.packb([5, items]), chunks.append)
+    assert len(chunks) > 1
+    assert json.loads(b"".join(chunks)) == [{"id": i} for i in range(5000)]
+
+
+def test_render_errors():
+    mixed = module([0x12, 0, "a"], prop("b", 1))
+    with pytest.raises(ValueError):
+        JsonRenderer().render(mixed)
+    with pytest.raises(ValueError):
+        JsonRenderer(duration="minutes")
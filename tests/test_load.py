@@ -1,3 +1,6 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import pkl
 
 
@@ -40,3 +43,83 @@ dynamic2 {
     assert config.dynamic1.a == "a"
     assert config.dynamic2.b == "b"
     assert config.dynamic2.c == "c"
+
+
+def test_loads_shared():
+    manager = pkl.enable_shared_manager()
+    try:
+        first = pkl.loads("a: Int = 1 + 1")
+        second = pkl.loads("a: Int = 2 + 2")
+        assert (first.a, second.a) == (2, 4)
+        assert len(manager._evaluators) == 1
+    finally:
+        pkl.disable_shared_manager()
+
+
+def test_load_shared_opt_out():
+    pkl.enable_shared_manager()
+    try:
+        config = pkl.loads("a: Int = 1 + 1", shared=False)
+        assert config.a == 2
+        assert pkl.get_shared_manager()._manager is None
+    finally:
+        pkl.disable_shared_manager()
+
+
+def test_warm_start():
+    try:
+        elapsed = pkl.warm_start().result()
+        assert pkl.get_shared_manager().warm_up_seconds == elapsed
+        config = pkl.loads("a: Int = 1 + 1")
+        assert config.a == 2
+    finally:
+        pkl.disable_shared_manager()
+
+
+def test_loads_shared_replaces_broken_manager():
+    manager = pkl.enable_shared_manager()
+    try:
+        assert pkl.loads("a: Int = 1").a == 1
+        broken = manager._manager
+        broken._broken = EOFError("pkl server closed its output stream")
+        assert pkl.loads("a: Int = 2").a == 2
+        assert manager._manager is not broken
+    finally:
+        pkl.disable_shared_manager()
+
+
+def test_shared_creates_evaluators_outside_lock(monkeypatch):
+    creating, release = threading.Event(), threading.Event()
+    created = []
+    new_evaluator = pkl.EvaluatorManager.new_evaluator
+
+    def blocking_new_evaluator(self, options, *args, **kwargs):
+        created.append(options)
+        if options.timeoutSeconds == 1:
+            creating.set()
+            assert release.wait(10)
+        return new_evaluator(self, options, *args, **kwargs)
+
+    monkeypatch.setattr(pkl.EvaluatorManager, "new_evaluator", blocking_new_evaluator)
+    manager = pkl.enable_shared_manager()
+
+    def borrow(options):
+        with manager.evaluator(options):
+            pass
+
+    try:
+        with ThreadPoolExecutor(3) as executor:
+            slow = pkl.PreconfiguredOptions(timeoutSeconds=1)
+            waiting = [executor.submit(borrow, slow) for _ in range(2)]
+            assert creating.wait(10)
+            try:
+                # not held up by the evaluator being created
+                executor.submit(borrow, pkl.PreconfiguredOptions()).result(10)
+            finally:
+                release.set()
+            for future in waiting:
+                future.result()
+        # the evaluator for `slow` is created once
+        assert len(created) == 2
+    finally:
+        pkl.disable_shared_manager()
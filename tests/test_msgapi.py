@@ -0,0 +1,61 @@
+import msgpack
+import pytest
+
+from pkl.evaluator_options import ClientResourceReader, Project
+from pkl.msgapi import (
+    CloseEvaluator,
+    CreateEvaluator,
+    EvaluateRequest,
+    EvaluatorListResourcesResponse,
+    IncomingMessage,
+    Log,
+)
+from pkl.reader import PathElement
+
+
+def test_to_json_omits_none():
+    msg = EvaluateRequest(requestId=1, evaluatorId=2, moduleUri="repl:text")
+    assert msg.to_json() == [
+        0x23,
+        {"requestId": 1, "evaluatorId": 2, "moduleUri": "repl:text"},
+    ]
+    assert CloseEvaluator(3).to_json() == [0x22, {"evaluatorId": 3}]
+
+
+def test_to_json_nested():
+    msg = CreateEvaluator(
+        requestId=1,
+        clientResourceReaders=[ClientResourceReader("foo", False, True)],
+        project=Project("file:///tmp/PklProject"),
+    )
+    assert msg.to_json() == [
+        0x20,
+        {
+            "requestId": 1,
+            "clientResourceReaders": [
+                {"scheme": "foo", "hasHierarchicalUris": False, "isGlobbable": True}
+            ],
+            "project": {
+                "projectFileUri": "file:///tmp/PklProject",
+                "type": "local",
+                "dependencies": {},
+            },
+        },
+    ]
+    msg = EvaluatorListResourcesResponse(1, 2, [PathElement("a", True)])
+    assert msg.to_json()[1]["pathElements"] == [{"name": "a", "isDirectory": True}]
+
+
+def test_decode_from_unpacker():
+    unpacker = msgpack.Unpacker(list_hook=IncomingMessage.decode)
+    unpacker.feed(
+        msgpack.packb(
+            [0x25, {"evaluatorId": 1, "level": 0, "message": "hi", "frameUri": "x"}]
+        )
+    )
+    (log,) = list(unpacker)
+    assert log == Log(evaluatorId=1, level=0, message="hi", frameUri="x")
+    assert not hasattr(log, "__dict__")
+
+    with pytest.raises(ValueError, match="Unknown code"):
+        IncomingMessage.decode([0x99, {}])
@@ -1,5 +1,12 @@
+import importlib
+import inspect
+import pickle
+import sys
+from dataclasses import FrozenInstanceError
+from datetime import timedelta
 from pathlib import Path
 
+import msgpack
 import pytest
 
 import pkl
@@ -56,3 +63,288 @@ def test_lib1():
 def test_types():
     file = Path("./tests/pkls") / "types.pkl"
     _ = pkl.load(file)
+
+
+def test_single_pass():
+    members = [
+        [0x10, "name", "a"],
+        [0x10, "tags", [5, ["x", "y"]]],
+        [0x10, "meta", [3, {"d": [7, 1.5, "s"], 2: [8, 3, "mb"]}]],
+        [0x10, "pair", [9, 1, "x"]],
+        [0x10, "seq", [0xA, 0, 10, 2]],
+        [0x10, "elems", [1, "Dynamic", "pkl:base", [[0x12, 0, [4, [1, 2]]]]]],
+        [0x10, "cls", [0xC]],
+    ]
+    data = msgpack.packb([1, "mod", "file:///mod.pkl", members])
+    expected = pkl.Parser().parse_bytes(data)
+    assert repr(pkl.Parser(single_pass=True).parse_bytes(data)) == repr(expected)
+    assert expected.meta["d"] == pkl.Duration(1.5, "s")
+
+
+def test_dynamic_classes_by_shape():
+    def dynamic(*names):
+        return [1, "Dynamic", "pkl:base", [[0x10, name, 1] for name in names]]
+
+    listing = [5, [dynamic("a"), dynamic("b", "c"), dynamic("a"), dynamic("b", "c")]]
+    first, second, third, fourth = pkl.Parser().parse_bytes(msgpack.packb(listing))
+    assert (first.a, second.b, second.c) == (1, 1, 1)
+    assert type(first) is type(third)
+    assert type(second) is type(fourth)
+    assert type(first) is not type(second)
+
+
+def test_classes_shared_across_parsers():
+    def person(uri, *names):
+        return [1, "Person", uri, [[0x10, name, 1] for name in names]]
+
+    first = pkl.Parser().parse_bytes(msgpack.packb(person("file:///a.pkl", "x")))
+    second = pkl.Parser().parse_bytes(msgpack.packb(person("file:///a.pkl", "x")))
+    assert type(first) is type(second)
+    assert first == second
+
+    # same name in another module, with other members
+    other = pkl.Parser().parse_bytes(msgpack.packb(person("file:///b.pkl", "y")))
+    assert type(other) is not type(first)
+    assert other.y == 1
+
+
+def test_class_registry_bounded():
+    registry = pkl.ClassRegistry(maxsize=2)
+    for key in "abc":
+        registry.get(key, lambda: type(key, (), {}))
+    assert len(registry) == 2
+    assert registry.get("c", lambda: None).__name__ == "c"
+
+
+@pytest.mark.parametrize("single_pass", [False, True])
+def test_result_types(single_pass):
+    data = msgpack.packb(
+        [
+            1,
+            "Job",
+            "file:///job.pkl",
+            [[0x10, "name", "a"], [0x10, "every", [7, 2, "min"]]],
+        ]
+    )
+
+    def parse(**kwargs):
+        return pkl.Parser(single_pass=single_pass, **kwargs).parse_bytes(data)
+
+    slotted = parse(slots=True)
+    assert slotted.name == "a" and not hasattr(slotted, "__dict__")
+
+    job = parse(object_type=pkl.ResultType.NAMEDTUPLE)
+    assert job == ("a", pkl.Duration(2, "min"))
+    assert job._fields == ("name", "every")
+
+    job = parse(
+        object_type=pkl.ResultType.DICTIONARY, duration_type=pkl.ResultType.TIMEDELTA
+    )
+    assert job == {"name": "a", "every": timedelta(minutes=2)}
+
+    with pytest.raises(ValueError):
+        parse(object_type=pkl.ResultType.RANGE)
+
+
+@pytest.mark.parametrize("single_pass", [False, True])
+def test_intern(single_pass):
+    def server(i):
+        limits = [[0x10, "cpu", 2.0], [0x10, "zero", 0.0 if i else -0.0]]
+        return [
+            1,
+            "Server",
+            "file:///s.pkl",
+            [
+                [0x10, "region", "eu-west-" + "1" * 70],
+                [0x10, "tags", [5, ["web"]]],
+                [0x10, "limits", [1, "Limits", "file:///s.pkl", limits]],
+            ],
+        ]
+
+    data = msgpack.packb([5, [server(0), server(1), server(2)]])
+
+    def parse(**kwargs):
+        return pkl.Parser(single_pass=single_pass, **kwargs).parse_bytes(data)
+
+    a, b, c = parse(object_type=pkl.ResultType.NAMEDTUPLE, intern=True)
+    assert [a, b, c] == parse(object_type=pkl.ResultType.NAMEDTUPLE)
+    assert a.region is b.region
+    assert a.tags[0] is b.tags[0]
+    assert a.tags is not b.tags  # lists are mutable
+    assert b.limits is c.limits
+    assert a.limits is not b.limits  # -0.0 and 0.0 are kept apart
+
+    a, b, _ = parse(object_type=pkl.ResultType.DICTIONARY, intern=True)
+    assert all(x is y for x, y in zip(a, b))
+    assert a["limits"] is not b["limits"]  # dicts are mutable
+    assert a["limits"]["cpu"] is b["limits"]["cpu"]
+
+
+@pytest.mark.parametrize("single_pass", [False, True])
+def test_frozen(single_pass):
+    def server(port):
+        return [
+            1,
+            "Server",
+            "file:///s.pkl",
+            [
+                [0x10, "port", port],
+                [0x10, "timeout", [7, 5, "s"]],
+                [0x10, "hosts", [5, ["a", "b"]]],
+                [0x10, "labels", [3, {"env": [6, ["prod"]]}]],
+            ],
+        ]
+
+    data = msgpack.packb([5, [server(80), server(80), server(443)]])
+    a, b, c = pkl.Parser(single_pass=single_pass, frozen=True).parse_bytes(data)
+    assert a == b and a != c
+    assert hash(a) == hash(b)
+    assert a.hosts == ("a", "b")
+    assert a.labels == {"env": frozenset({"prod"})}
+    assert isinstance(a.labels, pkl.FrozenDict)
+    assert len({a, b, c}) == 2
+    assert pickle.loads(pickle.dumps(a)) == a
+    with pytest.raises(FrozenInstanceError):
+        a.port = 8080
+    with pytest.raises(TypeError):
+        a.labels["env"] = None
+    with pytest.raises(FrozenInstanceError):
+        a.timeout.value = 1
+    assert a.timeout == pkl.Duration(5, "s") and isinstance(a.timeout, pkl.Duration)
+    assert pickle.loads(pickle.dumps(a.timeout)) == a.timeout
+
+    # value classes stay mutable by default
+    timeout = pkl.Parser(single_pass=single_pass).parse_bytes(
+        msgpack.packb([7, 5, "s"])
+    )
+    assert type(timeout) is pkl.Duration
+    timeout.value = 1
+
+    a, b, _ = pkl.Parser(single_pass=single_pass, frozen=True, intern=True).parse_bytes(
+        data
+    )
+    assert a is b
+
+
+def test_deeply_nested():
+    value = 0
+    for _ in range(80):
+        value = [1, "Dynamic", "pkl:base", [[0x10, "child", [5, [value]]]]]
+    data = msgpack.packb(value)
+    limit = sys.getrecursionlimit()
+    # far less than recursing through 80 objects and listings takes
+    sys.setrecursionlimit(len(inspect.stack()) + 60)
+    try:
+        for parser in [pkl.Parser(), pkl.Parser(single_pass=True)]:
+            result = parser.parse_bytes(data)
+            for _ in range(80):
+                (result,) = result.child
+            assert result == 0
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+def test_lazy():
+    person = [
+        1,
+        "Person",
+        "file:///p.pkl",
+        [
+            [0x10, "name", "a"],
+            [0x10, "tags", [5, ["x", "y"]]],
+            [0x10, "limits", [3, {"cpu": 2}]],
+            [0x10, "timeout", [7, 1.5, "s"]],
+        ],
+    ]
+    data = msgpack.packb(
+        [1, "mod", "file:///mod.pkl", [[0x10, "people", [5, [person] * 3]]]]
+    )
+
+    config = pkl.Parser(lazy=True).parse_bytes(data)
+    assert isinstance(config, pkl.LazyObject)
+    assert isinstance(config.people, pkl.LazyList)
+    assert len(config.people) == 3
+    assert config.people[-1].name == "a"
+    assert list(config.people[0].tags) == ["x", "y"]
+    assert dict(config.people[0].limits) == {"cpu": 2}
+    assert config.people[0].timeout == pkl.Duration(1.5, "s")
+    assert config.people[0] is config.people[0]
+    with pytest.raises(AttributeError):
+        config.missing
+    assert repr(config.materialize()) == repr(pkl.Parser().parse_bytes(data))
+
+
+@pytest.mark.parametrize("single_pass", [False, True])
+def test_numpy_arrays(single_pass):
+    np = pytest.importorskip("numpy")
+    members = [
+        [0x10, "ints", [5, [1, 2, 3]]],
+        [0x10, "floats", [4, [1, 2.5]]],
+        [0x10, "flags", [5, [True, False]]],
+        [0x10, "mixed", [5, [1, "a"]]],
+        [0x10, "huge", [5, [2**64 - 1]]],
+        [0x10, "empty", [5, []]],
+    ]
+    data = msgpack.packb([1, "mod", "file:///mod.pkl", members])
+
+    parser = pkl.Parser(single_pass=single_pass, numpy_arrays=True)
+    config = parser.parse_bytes(data)
+    assert config.ints.dtype == np.int64 and config.ints.tolist() == [1, 2, 3]
+    assert config.floats.dtype == np.float64
+    assert config.flags.dtype == np.bool_
+    assert config.mixed == [1, "a"]
+    assert config.huge == [2**64 - 1]
+    assert config.empty == []
+
+    parser = pkl.Parser(
+        single_pass=single_pass, numpy_arrays=True, numpy_dtype="float32"
+    )
+    config = parser.parse_bytes(data)
+    assert config.ints.dtype == np.float32
+    assert config.floats.dtype == np.float32
+
+    parser = pkl.Parser(single_pass=single_pass, numpy_arrays=True, numpy_dtype="int8")
+    config = parser.parse_bytes(data)
+    assert config.ints.dtype == np.int8 and config.ints.tolist() == [1, 2, 3]
+    assert config.floats == [1, 2.5]
+
+    # out of the dtype's range
+    members = [[0x10, "ints", [5, [300, 70000]]], [0x10, "floats", [5, [1e300]]]]
+    data = msgpack.packb([1, "mod", "file:///mod.pkl", members])
+    config = parser.parse_bytes(data)
+    assert config.ints == [300, 70000]
+    parser = pkl.Parser(
+        single_pass=single_pass, numpy_arrays=True, numpy_dtype="float32"
+    )
+    assert parser.parse_bytes(data).floats == [1e300]
+
+
+@pytest.mark.parametrize("generated", ["GeneratedSlots", "GeneratedFrozen"])
+def test_generated_from_pkl(generated):
+    module = importlib.import_module(
+        f"tests.Fixtures.{generated}.pkl_python_example_Poly_pkl"
+    )
+    frozen = generated == "GeneratedFrozen"
+
+    def obj(class_name, *members):
+        return [1, f"pkl.python.example.Poly#{class_name}", "file:///Poly.pkl", members]
+
+    # properties by name, whatever their order
+    cat = obj("Animal", [0x10, "name", "cat"], [0x10, "exists", True])
+    dog = obj(
+        "Dog",
+        [0x10, "exists", True],
+        [0x10, "name", "Rex"],
+        [0x10, "barks", False],
+        [0x10, "hates", cat],
+    )
+    data = msgpack.packb([5, [dog, dog]])
+    a, b = pkl.Parser(namespace=vars(module), frozen=frozen).parse_bytes(data)
+    assert a == module.Dog(True, "Rex", False, module.Animal(True, "cat"))
+    assert not hasattr(a, "__dict__")
+    assert module.Dog.__slots__ == ("barks", "hates")
+    assert pickle.loads(pickle.dumps(a)) == a
+    if frozen:
+        assert hash(a) == hash(b)
+        with pytest.raises(FrozenInstanceError):
+            a.name = "Max"
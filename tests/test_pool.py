@@ -0,0 +1,74 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from pkl import EvaluatorManager, ModuleSource, PKLServerPool, PreconfiguredOptions
+
+
+def test_pool():
+    with PKLServerPool(max_servers=2) as pool:
+        evaluator = pool.new_evaluator(PreconfiguredOptions())
+        config = evaluator.evaluate_module(ModuleSource.from_text("a: Int = 1 + 1"))
+    assert config.a == 2
+
+
+def test_pool_grows():
+    with PKLServerPool(max_servers=2, grow_threshold=1) as pool:
+        evaluator = pool.new_evaluator(PreconfiguredOptions())
+        sources = [ModuleSource.from_text(f"a: Int = {i}") for i in range(8)]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            configs = list(executor.map(evaluator.evaluate_module, sources))
+        assert 1 <= pool.size <= 2
+    assert [c.a for c in configs] == list(range(8))
+
+
+def test_pool_shrinks():
+    with PKLServerPool(max_servers=2, grow_threshold=1, idle_timeout=0) as pool:
+        evaluator = pool.new_evaluator(PreconfiguredOptions())
+        sources = [ModuleSource.from_text(f"a: Int = {i}") for i in range(8)]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(evaluator.evaluate_module, sources))
+        # idle servers are shut down on the next evaluation, and forgotten
+        config = evaluator.evaluate_module(ModuleSource.from_text("a: Int = 1"))
+        assert config.a == 1
+        assert pool.size == 1
+        assert len(evaluator._evaluators) == 1
+
+
+def test_pool_replaces_dead_server():
+    with PKLServerPool(min_servers=2, max_servers=2) as pool:
+        evaluator = pool.new_evaluator(PreconfiguredOptions())
+        dead = pool._members[0].manager
+        dead._server.process.kill()
+        dead._reader.join(timeout=10)
+        for i in range(4):
+            source = ModuleSource.from_text(f"a: Int = {i}")
+            assert evaluator.evaluate_module(source).a == i
+        assert pool.size == 2
+        assert all(member.manager is not dead for member in pool._members)
+
+
+def test_pool_creates_evaluators_outside_lock(monkeypatch):
+    with PKLServerPool(min_servers=2, max_servers=2) as pool:
+        evaluator = pool.new_evaluator(PreconfiguredOptions())
+        first, second = pool._members
+        # created again on `second` on its next use
+        evaluator._forget(second)
+        creating, release = threading.Event(), threading.Event()
+        new_evaluator = EvaluatorManager.new_evaluator
+
+        def blocking_new_evaluator(self, *args, **kwargs):
+            creating.set()
+            assert release.wait(10)
+            return new_evaluator(self, *args, **kwargs)
+
+        monkeypatch.setattr(EvaluatorManager, "new_evaluator", blocking_new_evaluator)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            waiting = executor.submit(evaluator._evaluator_for, second)
+            assert creating.wait(10)
+            try:
+                # not held up by the evaluator being created on `second`
+                executor.submit(evaluator._evaluator_for, first).result(10)
+            finally:
+                release.set()
+            waiting.result()
+        assert len(evaluator._evaluators) == 2
@@ -0,0 +1,110 @@
+from collections import namedtuple
+
+import msgpack
+import pytest
+
+import pkl
+from pkl.schema import _Compiler
+from tests.Fixtures.Generated import Collections_pkl, pkl_python_example_Poly_pkl
+from tests.Fixtures.Generated.pkl_python_example_Poly_pkl import Animal, Bird, Dog
+from tests.Fixtures.GeneratedFrozen import (
+    pkl_python_example_Poly_pkl as frozen_Poly_pkl,
+)
+
+
+def obj(class_name, **properties):
+    members = [[0x10, k, v] for k, v in properties.items()]
+    return [1, class_name, "file:///Poly.pkl", members]
+
+
+def poly_data():
+    cat = obj("pkl.python.example.Poly#Animal", exists=True, name="cat")
+    dog = obj(
+        "pkl.python.example.Poly#Dog", exists=True, name="Rex", barks=True, hates=cat
+    )
+    bird = obj("pkl.python.example.Poly#Bird", exists=False, name="b", flies=True)
+    return msgpack.packb(
+        obj(
+            "pkl.python.example.Poly",
+            beings=[5, [dog, bird]],
+            rex=dog,
+            moreBeings=[3, {"b": bird}],
+        )
+    )
+
+
+@pytest.mark.parametrize("frozen", [False, True])
+def test_compiled(frozen):
+    namespace = vars(pkl_python_example_Poly_pkl)
+    data = poly_data()
+    parser = pkl.Parser(namespace=namespace, compiled=True, frozen=frozen)
+    result = parser.parse_bytes(data)
+    assert result == pkl.Parser(namespace=namespace, frozen=frozen).parse_bytes(data)
+    dog = Dog(exists=True, name="Rex", barks=True, hates=Animal(True, "cat"))
+    assert result.rex == dog
+    assert list(result.beings) == [dog, Bird(exists=False, name="b", flies=True)]
+    assert isinstance(result.beings, tuple if frozen else list)
+
+
+def test_compiled_collections():
+    namespace = vars(Collections_pkl)
+    data = msgpack.packb(
+        obj(
+            "Collections",
+            res1=[5, [1, 2]],
+            res2=[4, []],
+            res3=[5, [[5, [1]], [5, []]]],
+            res4=[4, []],
+            res5=[3, {1: True}],
+            res6=[3, {1: [3, {2: False}]}],
+            res7=[2, {}],
+            res8=[2, {3: [2, {}]}],
+            res9=[6, ["a"]],
+            res10=[6, [1, 2]],
+        )
+    )
+    result = pkl.Parser(namespace=namespace, compiled=True).parse_bytes(data)
+    assert result == pkl.Parser(namespace=namespace).parse_bytes(data)
+    assert result.res3 == [[1], []]
+    assert result.res6 == {1: {2: False}}
+    assert result.res10 == {1, 2}
+
+
+def test_compiled_property_order():
+    namespace = vars(pkl_python_example_Poly_pkl)
+    dog = obj(
+        "pkl.python.example.Poly#Dog", hates=None, barks=False, name="Rex", exists=True
+    )
+    result = pkl.Parser(namespace=namespace, compiled=True).parse_bytes(
+        msgpack.packb(dog)
+    )
+    assert result == Dog(exists=True, name="Rex", barks=False, hates=None)
+
+    # anything else is left to the parser
+    Point = namedtuple("Point", "x y")
+    point = [1, "Point", "file:///p.pkl", [[0x10, "x", 1], [0x10, "y", 2]]]
+    result = pkl.Parser(namespace={"Point": Point}, compiled=True).parse_bytes(
+        msgpack.packb(point)
+    )
+    assert result == Point(1, 2)
+    with pytest.raises(TypeError):
+        pkl.Parser(namespace=namespace, compiled=True).parse_bytes(
+            msgpack.packb(obj("pkl.python.example.Poly#Dog", exists=True, name="Rex"))
+        )
+
+
+def test_compiled_frozen_annotations():
+    # pkl-gen-python annotates frozen classes with Tuple[X, ...] and Mapping
+    namespace = vars(frozen_Poly_pkl)
+    compiler = _Compiler(frozen_Poly_pkl.Poly, frozen=True, numpy_arrays=False)
+    types = compiler._field_types()
+    for name in ("beings", "moreBeings"):
+        assert "_walk" not in compiler._convert(types[name], "value")
+
+    data = poly_data()
+    result = pkl.Parser(namespace=namespace, compiled=True, frozen=True).parse_bytes(
+        data
+    )
+    assert result == pkl.Parser(namespace=namespace, frozen=True).parse_bytes(data)
+    assert isinstance(result.beings, tuple)
+    assert isinstance(result.moreBeings, pkl.FrozenDict)
@@ -1,6 +1,50 @@
+import sys
+import time
+
+import msgpack
+import pytest
+
 from pkl.server import PKLServer
 
 
 def test_server():
     server = PKLServer()
     server.terminate()
+
+
+def test_server_small_buffer():
+    # a tiny read buffer forces responses to be reassembled from many reads
+    server = PKLServer(buffer_size=4, pipe_size=None)
+    server.send(msgpack.packb([0x20, {"requestId": 1, "allowedModules": ["pkl:"]}]))
+    code, msg = server.receive()
+    assert code == 0x21
+    assert msg["requestId"] == 1
+    server.terminate()
+
+
+def test_server_stderr_log():
+    server = PKLServer()
+    server.stderr_log.feed(b"first\nsec")
+    server.stderr_log.feed(b"ond\n")
+    assert server.stderr_log.tail(2) == ["first", "second"]
+    server.terminate()
+
+
+def test_server_receive_timeout():
+    server = PKLServer([sys.executable, "-c", "import time; time.sleep(30)"])
+    with pytest.raises(TimeoutError):
+        server.receive(timeout=0.1)
+    server.terminate()
+
+
+def test_server_receive_err(capsys):
+    script = "import sys, time; sys.stderr.write('first\\nsecond\\n'); time.sleep(30)"
+    server = PKLServer([sys.executable, "-c", script])
+    deadline = time.monotonic() + 10
+    while server.stderr_log.count < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    server.receive_err()
+    server.receive_err()
+    assert capsys.readouterr().out == "first\nsecond\n"
+    assert server.stderr_tail(1) == "second"
+    server.terminate()